@@ -0,0 +1,127 @@
+import csv
+import gzip
+from pathlib import Path
+
+import database
+import tracing
+from tracing import traced
+
+# Типи колонок експорту (у порядку database._HISTORY_COLUMNS). Рядки
+# Parquet сам кодує словником; у файлі Arrow IPC словник мав би бути один
+# на всі пакети, тому mode/source там — звичайні рядки під zstd
+HISTORY_SCHEMA = (
+    ("id", "int64"),
+    ("origin", "string"),
+    ("destination", "string"),
+    ("mode", "string"),
+    ("time_min", "int32"),
+    ("price", "float64"),
+    ("transfers", "int16"),
+    ("score", "float64"),
+    ("distance_km", "float64"),
+    ("source", "string"),
+    ("start_lon", "float64"),
+    ("start_lat", "float64"),
+    ("end_lon", "float64"),
+    ("end_lat", "float64"),
+)
+
+# Рядків на один пакет запису (Arrow record batch / Parquet row group)
+CHUNK_ROWS = 50_000
+
+# Закінчення імені файлу -> формат; інші стиснені файли (.parquet.gz) не підтримуються
+FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".csv.gz": "csv.gz"}
+
+
+def _export_format(path):
+    """Export format for a file name, or None if the ending is not in FORMATS."""
+    name = Path(path).name.lower()
+    return next((fmt for ending, fmt in FORMATS.items() if name.endswith(ending)), None)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _arrow_schema(pa):
+    types = {
+        "int64": pa.int64(),
+        "int32": pa.int32(),
+        "int16": pa.int16(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in HISTORY_SCHEMA])
+
+
+def _arrow_batch(pa, schema, rows):
+    arrays = [pa.array(values, field.type) for field, values in zip(schema, zip(*rows))]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_arrow(pa, path, fmt, chunks):
+    schema = _arrow_schema(pa)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema, compression="zstd")
+    else:
+        import pyarrow.ipc as ipc
+        writer = ipc.new_file(path, schema, options=ipc.IpcWriteOptions(compression="zstd"))
+
+    rows = last_id = 0
+    try:
+        for chunk in chunks:
+            writer.write_batch(_arrow_batch(pa, schema, chunk))
+            rows += len(chunk)
+            last_id = chunk[-1][0]
+    finally:
+        writer.close()
+    return rows, last_id
+
+
+def _write_csv_gz(path, chunks):
+    rows = last_id = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(name for name, _ in HISTORY_SCHEMA)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows += len(chunk)
+            last_id = chunk[-1][0]
+    return rows, last_id
+
+
+@traced()
+def export_history(path, since_id=0, chunk_rows=CHUNK_ROWS):
+    """
+    Stream the routes history (rows with id > since_id) to `path` chunk by
+    chunk. The format follows the extension: .parquet, .arrow/.feather
+    (need pyarrow) or .csv.gz. Without pyarrow a columnar path is written
+    as .csv.gz next to it instead, and "fallback" in the result is True.
+    Returns {"path", "format", "rows", "last_id", "fallback"}; pass last_id
+    as since_id next time to export only what was added.
+    """
+    path = Path(path)
+    fmt = _export_format(path)
+    if fmt is None:
+        raise ValueError(f"Невідомий формат експорту: {path.name} (.parquet, .arrow, .csv.gz)")
+
+    pa = _pyarrow() if fmt != "csv.gz" else None
+    fallback = fmt != "csv.gz" and pa is None
+    if fallback:
+        path = path.with_suffix(".csv.gz")
+        tracing.incr("history_export_fallbacks")
+        fmt = "csv.gz"
+
+    chunks = database.iter_route_chunks(chunk_rows, since_id)
+    if fmt == "csv.gz":
+        rows, last_id = _write_csv_gz(path, chunks)
+    else:
+        rows, last_id = _write_arrow(pa, path, fmt, chunks)
+    tracing.incr("history_rows_exported", rows)
+    return {"path": str(path), "format": fmt, "rows": rows, "last_id": last_id or since_id,
+            "fallback": fallback}
@@ -1,88 +1,510 @@
+import atexit
+import json
 import os
-import requests
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
 from pathlib import Path
-from dotenv import load_dotenv
+
+import memcache
+import tracing
+from backends import Backend, BackendPool, load_config
+from geometry import decode_polyline
+from providers import ORS_PROFILES
+from records import Mode
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson необов'язковий
+    _loads = json.loads
 
 ROOT_DIR = Path(__file__).resolve().parent
 ENV_PATH = ROOT_DIR / ".env"
 
-print("ENV PATH:", ENV_PATH)
-print("ENV EXISTS:", ENV_PATH.exists())
+# Ключ читається з .env лише під час першого запиту, а не під час імпорту
+API_KEY = None
+_env_loaded = False
+
+DEFAULT_BASE = "https://api.openrouteservice.org"
+BASE = DEFAULT_BASE
+
+# Повтори для тимчасових збоїв мережі / перевантаження ORS
+MAX_RETRIES = 2
+RETRY_BACKOFF_S = 0.5
+RETRY_STATUSES = {429, 502, 503, 504}
+# Ключ відкликано або вичерпав ліміт: бекенд непридатний, як і при 5xx
+AUTH_FAILURE_STATUSES = {401, 403}
+
+# Максимум клітинок в одному запиті матриці (ліміт публічного ORS)
+MATRIX_MAX_CELLS = 3500
+
+# Час у дорозі залежить від часу відправлення лише для цих профілів ORS
+# (дані про трафік); кеш маршрутів для них ділиться на кошики такої тривалості
+TIME_DEPENDENT_PROFILES = {"driving-car", "driving-hgv"}
+DEPARTURE_BUCKET_S = int(os.getenv("MANDRUY_DEPARTURE_BUCKET_S", "3600"))
+# Скільки останніх запитів з часом відправлення пам'ятати для departure_hit_rates
+DEPARTURE_LOG_SIZE = 10_000
+
+# Формат геометрії маршруту: "encodedpolyline" (компактно, endpoint /json)
+# або "geojson" (повний FeatureCollection, як раніше)
+ROUTE_GEOMETRY_FORMAT = "encodedpolyline"
+
+# Лише те, що використовується: без покрокових інструкцій і висот
+DIRECTIONS_OPTIONS = {
+    "instructions": False,
+    "elevation": False,
+    "geometry_simplify": False,
+}
+
+_json_decoder = json.JSONDecoder()
+# Ключ "features" у самому JSON (лапки всередині рядкових значень екрановані)
+_FEATURES_RE = re.compile(r'"features"\s*:\s*\[\s*')
 
-load_dotenv(dotenv_path=ENV_PATH)
+# Кеші в пам'яті процесу: назва місця -> (lon, lat, label),
+# (start, end, profile) -> результат get_route / get_route_summary.
+# Обмежені за розміром у байтах (memcache.CACHE_BUDGETS)
+_cache_lock = threading.Lock()
+_geocode_cache = memcache.BoundedCache("geocode")
+_route_cache = memcache.BoundedCache("directions")
+_summary_cache = memcache.BoundedCache("summaries")
 
-API_KEY = os.getenv("ORS_API_KEY")
-print("Loaded ORS key:", "OK" if API_KEY else "NOT FOUND")
+# (start, end, profile, час відправлення) запитів маршрутів, що залежать від часу
+_departure_log = deque(maxlen=DEPARTURE_LOG_SIZE)
 
-BASE = "https://api.openrouteservice.org"
+# HTTP-сесія (пул з'єднань keep-alive) на потік; у дочірньому процесі — нова
+_http = threading.local()
+
+# Пул бекендів ORS: з ORS_BACKENDS_FILE або один ORS_BASE_URL + ORS_API_KEY
+_pool = None
+_pool_lock = threading.Lock()
 
 PROFILES = {
-    "Car": "driving-car",
-    "Bicycle": "cycling-regular",
-    "Walking": "foot-walking",
+    "Car": ORS_PROFILES[Mode.CAR],
+    "Bicycle": ORS_PROFILES[Mode.BIKE],
+    "Walking": ORS_PROFILES[Mode.WALK],
 }
 
+def _load_env():
+    global API_KEY, BASE, _env_loaded
+    if _env_loaded:
+        return
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path=ENV_PATH)
+    except ImportError:
+        pass
+    API_KEY = os.getenv("ORS_API_KEY")
+    # ORS_BASE_URL дозволяє підключити власний ORS або локальну заглушку
+    BASE = os.getenv("ORS_BASE_URL", DEFAULT_BASE).rstrip("/")
+    _env_loaded = True
+
+def clear_caches():
+    with _cache_lock:
+        _geocode_cache.clear()
+        _route_cache.clear()
+        _summary_cache.clear()
+
+def cache_snapshot():
+    """Copy of the in-process caches (picklable) for worker processes."""
+    with _cache_lock:
+        return {
+            "geocode": dict(_geocode_cache.items()),
+            "route": dict(_route_cache.items()),
+            "summary": dict(_summary_cache.items()),
+        }
+
+def load_cache_snapshot(snapshot):
+    with _cache_lock:
+        _geocode_cache.update(snapshot.get("geocode", {}))
+        _route_cache.update(snapshot.get("route", {}))
+        _summary_cache.update(snapshot.get("summary", {}))
+
+def cached_places():
+    """Labels of every geocoded place in this process (for autocomplete)."""
+    with _cache_lock:
+        return [label for _, _, label in _geocode_cache.values()]
+
+def cached_locations():
+    """(lon, lat, label) of every geocoded place in this process."""
+    with _cache_lock:
+        return _geocode_cache.values()
+
 def _require_key():
+    _load_env()
     if not API_KEY:
         raise RuntimeError("ORS_API_KEY not found. Check your .env file (ORS_API_KEY=...).")
 
+def backend_pool():
+    global _pool
+    _load_env()
+    with _pool_lock:
+        if _pool is None:
+            path = os.getenv("ORS_BACKENDS_FILE")
+            if path:
+                _pool = BackendPool(load_config(path))
+            else:
+                _require_key()
+                _pool = BackendPool([Backend("default", BASE, API_KEY)])
+            # Активна перевірка стану — лише якщо в конфігурації є health_path
+            _pool.start_health_checks()
+        return _pool
+
+def set_backend_pool(pool):
+    """Use this pool for all ORS requests (None: rebuild from the environment)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool is not pool:
+            _pool.stop_health_checks()
+        _pool = pool
+
+@atexit.register
+def _stop_health_checks():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.stop_health_checks()
+
+def _session():
+    import requests
+
+    if getattr(_http, "pid", None) != os.getpid():
+        _http.session = requests.Session()
+        _http.pid = os.getpid()
+    return _http.session
+
+
+def _request(method, path, params=None, json=None, timeout=30):
+    """
+    ORS request through the backend pool. A failed attempt (connection
+    error, RETRY_STATUSES, any 5xx or AUTH_FAILURE_STATUSES) counts against
+    the backend's health and is retried on another backend when there is
+    one, with backoff only when it has to go to the same backend again
+    (auth failures are not repeated on the same backend).
+    """
+    import requests
+
+    pool = backend_pool()
+    session = _session()
+    tried = []
+    for attempt in range(MAX_RETRIES + 1):
+        backend = pool.acquire(exclude=tried)
+        headers = {"Content-Type": "application/json"} if json is not None else {}
+        query = dict(params or {})
+        if backend.api_key:
+            headers["Authorization"] = backend.api_key
+            if method == "GET":
+                query["api_key"] = backend.api_key
+        r = None
+        try:
+            r = session.request(method, backend.url + path, params=query or None,
+                                json=json, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            pool.release(backend, ok=False)
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            tracing.incr("bytes_received", len(r.content))
+            ok = not _backend_failed(r.status_code)
+            pool.release(backend, ok=ok)
+            if ok or attempt == MAX_RETRIES:
+                return r
+        tried.append(backend)
+        if all(b in tried for b in pool.backends):
+            if r is not None and r.status_code in AUTH_FAILURE_STATUSES:
+                return r  # інший ключ спробувати ніде, а той самий не запрацює
+            time.sleep(RETRY_BACKOFF_S * 2 ** attempt)
+        tracing.incr("retries")
+
+
+def _backend_failed(status):
+    return status in RETRY_STATUSES or status >= 500 or status in AUTH_FAILURE_STATUSES
+
+
+def _route_key(start_lonlat, end_lonlat, profile, bucket=None):
+    return (
+        round(float(start_lonlat[0]), 5), round(float(start_lonlat[1]), 5),
+        round(float(end_lonlat[0]), 5), round(float(end_lonlat[1]), 5),
+        profile, bucket,
+    )
+
+
+def departure_bucket(departure, profile):
+    """Cache bucket of a departure time (None: the profile ignores time)."""
+    if departure is None or profile not in TIME_DEPENDENT_PROFILES:
+        return None
+    return int(departure.timestamp() // DEPARTURE_BUCKET_S)
+
+
+def _bucket_departure(bucket):
+    # Усі відправлення кошика рахуються на його середину: один запис кешу на кошик
+    return datetime.fromtimestamp((bucket + 0.5) * DEPARTURE_BUCKET_S).isoformat(timespec="minutes")
+
+
+def _log_departure(start_lonlat, end_lonlat, profile, departure):
+    key = _route_key(start_lonlat, end_lonlat, profile)
+    with _cache_lock:
+        _departure_log.append((key, departure.timestamp()))
+
+
+def departure_hit_rates(bucket_sizes_s=(900, 1800, 3600, 7200, 10800)):
+    """
+    Replay the recent departure-aware route lookups for each bucket size:
+    {bucket_s: (lookups, hit rate)} of a cache that starts empty, for
+    tuning DEPARTURE_BUCKET_S.
+    """
+    with _cache_lock:
+        log = list(_departure_log)
+    rates = {}
+    for bucket_s in bucket_sizes_s:
+        seen = set()
+        hits = 0
+        for key, timestamp in log:
+            entry = (key, int(timestamp // bucket_s))
+            hits += entry in seen
+            seen.add(entry)
+        rates[bucket_s] = (len(log), hits / len(log) if log else 0.0)
+    return rates
+
+
 def geocode(place: str):
-    _require_key()
+    key = place.strip().lower()
+    with _cache_lock:
+        cached = _geocode_cache.get(key)
+    if cached is not None:
+        tracing.incr("geocode_cache_hits")
+        return cached
+
+    tracing.incr("geocode_cache_misses")
+    with tracing.span("geocode", place=place):
+        result = _geocode_remote(place)
+
+    with _cache_lock:
+        _geocode_cache[key] = result
+    return result
+
 
-    url = f"{BASE}/geocode/search"
+def _geocode_remote(place):
     params = {
-        "api_key": API_KEY,
         "text": place,
         "size": 1,
         "layers": "locality" 
     }
 
-    r = requests.get(url, params=params, timeout=30)
-    data = r.json()
-
-    features = data.get("features", [])
-    if not features:
+    r = _request("GET", "/geocode/search", params=params, timeout=30)
+    feature = _first_feature(r.content)
+    if feature is None:
         raise ValueError(f"Місто не знайдено: {place}")
 
-    lon, lat = features[0]["geometry"]["coordinates"]
-    label = features[0]["properties"].get("label", place)
+    lon, lat = feature["geometry"]["coordinates"][:2]
+    label = feature["properties"].get("label", place)
 
     return lon, lat, label
 
 
-def get_route(start_lonlat, end_lonlat, profile: str):
+def _first_feature(content):
+    # Розбирається лише перший об'єкт масиву "features", а не вся колекція
+    text = content.decode("utf-8") if isinstance(content, bytes) else content
+    match = _FEATURES_RE.search(text)
+    if match:
+        i = match.end()
+        if text[i:i + 1] == "]":
+            return None
+        try:
+            return _json_decoder.raw_decode(text, i)[0]
+        except ValueError:
+            pass
+
+    data = _loads(content)
+    features = data.get("features") if isinstance(data, dict) else None
+    return features[0] if features else None
+
+
+def cached_route(start_lonlat, end_lonlat, profile, departure=None):
+    """Cached get_route/get_route_summary result (geometry may be missing) or None."""
+    key = _route_key(start_lonlat, end_lonlat, profile, departure_bucket(departure, profile))
+    with _cache_lock:
+        return _route_cache.peek(key) or _summary_cache.peek(key)
+
+
+def get_route(start_lonlat, end_lonlat, profile: str, departure=None):
     """
     start_lonlat: (lon, lat)
     end_lonlat: (lon, lat)
     profile: 'driving-car', 'cycling-regular', 'foot-walking', ...
+    departure: datetime (local time) or None; passed to ORS for
+    TIME_DEPENDENT_PROFILES, rounded down to its DEPARTURE_BUCKET_S bucket
     Returns dict with distance_m, duration_s, geometry (GeoJSON LineString)
     """
-    _require_key()
+    bucket = departure_bucket(departure, profile)
+    if bucket is not None:
+        _log_departure(start_lonlat, end_lonlat, profile, departure)
+    key = _route_key(start_lonlat, end_lonlat, profile, bucket)
+    with _cache_lock:
+        cached = _route_cache.get(key)
+    if cached is not None:
+        tracing.incr("directions_cache_hits")
+        return cached
+
+    tracing.incr("directions_cache_misses")
+    with tracing.span("get_route", profile=profile):
+        result = _get_route_remote(start_lonlat, end_lonlat, profile, bucket)
+
+    with _cache_lock:
+        _route_cache[key] = result
+    return result
 
-    url = f"{BASE}/v2/directions/{profile}/geojson"
-    headers = {"Authorization": API_KEY, "Content-Type": "application/json"}
+
+def _get_route_remote(start_lonlat, end_lonlat, profile, bucket=None, geometry=True):
+    encoded = ROUTE_GEOMETRY_FORMAT == "encodedpolyline" or not geometry
+    endpoint = "json" if encoded else "geojson"
 
     body = {
         "coordinates": [
             [float(start_lonlat[0]), float(start_lonlat[1])],
             [float(end_lonlat[0]), float(end_lonlat[1])],
-        ]
+        ],
+        **DIRECTIONS_OPTIONS,
     }
+    if bucket is not None:
+        body["departure"] = _bucket_departure(bucket)
+    if not geometry:
+        body["geometry"] = False
+
+    r = _request("POST", f"/v2/directions/{profile}/{endpoint}", json=body, timeout=60)
+    with tracing.span("parse_directions"):
+        return _parse_directions(r.content, encoded, bool(body.get("elevation")))
 
-    r = requests.post(url, json=body, headers=headers, timeout=60)
-    data = r.json()
+
+def _parse_directions(content, encoded, with_elevation):
+    data = _loads(content)
 
     if isinstance(data, dict) and "error" in data:
         raise RuntimeError(f"Directions ORS error: {data['error']}")
-    if "features" not in data or not data["features"]:
-        raise RuntimeError(f"Unexpected ORS response (no features): {data}")
 
-    feature = data["features"][0]
-    summary = feature["properties"]["summary"]
-    geometry = feature["geometry"]  
+    if encoded:
+        if not data.get("routes"):
+            raise RuntimeError(f"Unexpected ORS response (no routes): {data}")
+        route = data["routes"][0]
+        summary = route["summary"]
+        geometry = {
+            "type": "LineString",
+            "coordinates": decode_polyline(route["geometry"], with_elevation=with_elevation),
+        } if "geometry" in route else None
+    else:
+        if "features" not in data or not data["features"]:
+            raise RuntimeError(f"Unexpected ORS response (no features): {data}")
+        feature = data["features"][0]
+        summary = feature["properties"]["summary"]
+        geometry = feature["geometry"]
 
     return {
         "distance_m": float(summary["distance"]),
         "duration_s": float(summary["duration"]),
         "geometry": geometry,
     }
+
+
+def get_matrix(locations, profile: str, sources=None, destinations=None):
+    """
+    locations: [(lon, lat), ...]
+    Returns dict with "durations" (s) and "distances" (m) matrices of
+    sources x destinations (all locations by default). Unreachable pairs
+    are None.
+    """
+    body = {
+        "locations": [[float(lon), float(lat)] for lon, lat, *_ in locations],
+        "metrics": ["duration", "distance"],
+    }
+    if sources is not None:
+        body["sources"] = list(sources)
+    if destinations is not None:
+        body["destinations"] = list(destinations)
+
+    with tracing.span("get_matrix", profile=profile, size=len(locations)):
+        r = _request("POST", f"/v2/matrix/{profile}", json=body, timeout=60)
+        data = _loads(r.content)
+
+    if isinstance(data, dict) and "error" in data:
+        raise RuntimeError(f"Matrix ORS error: {data['error']}")
+    if "durations" not in data:
+        raise RuntimeError(f"Unexpected ORS response (no durations): {data}")
+
+    return {"durations": data["durations"], "distances": data.get("distances")}
+
+
+def get_route_summary(start_lonlat, end_lonlat, profile: str, departure=None):
+    """
+    Same as get_route, but distance and duration only (one matrix cell,
+    no geometry download). Reuses a cached full route when there is one.
+    The matrix API ignores departure times, so a time-dependent summary
+    is a directions request without geometry.
+    """
+    bucket = departure_bucket(departure, profile)
+    if bucket is not None:
+        _log_departure(start_lonlat, end_lonlat, profile, departure)
+    key = _route_key(start_lonlat, end_lonlat, profile, bucket)
+    with _cache_lock:
+        cached = _route_cache.get(key) or _summary_cache.get(key)
+    if cached is not None:
+        tracing.incr("summary_cache_hits")
+        return {"distance_m": cached["distance_m"], "duration_s": cached["duration_s"]}
+
+    tracing.incr("summary_cache_misses")
+    if bucket is not None:
+        with tracing.span("get_route_summary", profile=profile):
+            summary = _get_route_remote(start_lonlat, end_lonlat, profile, bucket, geometry=False)
+        result = {"distance_m": summary["distance_m"], "duration_s": summary["duration_s"]}
+        with _cache_lock:
+            _summary_cache[key] = result
+        return result
+
+    matrix = get_matrix([start_lonlat, end_lonlat], profile, sources=[0], destinations=[1])
+    duration = matrix["durations"][0][0]
+    distance = (matrix["distances"] or [[None]])[0][0]
+    if duration is None or distance is None:
+        raise RuntimeError(f"ORS: маршрут {profile} не знайдено")
+
+    result = {"distance_m": float(distance), "duration_s": float(duration)}
+    with _cache_lock:
+        _summary_cache[key] = result
+    return result
+
+
+def get_route_summaries(start_lonlat, ends, profile: str):
+    """
+    get_route_summary from one start to many ends: cached pairs are reused,
+    the rest come from one 1×N matrix request (split only past
+    MATRIX_MAX_CELLS). Returns a list aligned with `ends`; None where ORS
+    found no route.
+    """
+    keys = [_route_key(start_lonlat, end, profile) for end in ends]
+    results = [None] * len(ends)
+    missing = []
+    with _cache_lock:
+        for i, key in enumerate(keys):
+            cached = _route_cache.get(key) or _summary_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                results[i] = {"distance_m": cached["distance_m"], "duration_s": cached["duration_s"]}
+    tracing.incr("summary_cache_hits", len(ends) - len(missing))
+    tracing.incr("summary_cache_misses", len(missing))
+
+    for lo in range(0, len(missing), MATRIX_MAX_CELLS):
+        chunk = missing[lo:lo + MATRIX_MAX_CELLS]
+        matrix = get_matrix([start_lonlat] + [ends[i] for i in chunk], profile,
+                            sources=[0], destinations=range(1, len(chunk) + 1))
+        durations = matrix["durations"][0]
+        distances = (matrix["distances"] or [[None] * len(chunk)])[0]
+        fetched = {}
+        for i, duration, distance in zip(chunk, durations, distances):
+            if duration is not None and distance is not None:
+                fetched[keys[i]] = results[i] = {
+                    "distance_m": float(distance), "duration_s": float(duration),
+                }
+        with _cache_lock:
+            _summary_cache.update(fetched)
+    return results
+
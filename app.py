@@ -1,11 +1,26 @@
-from database import init_db, save_routes
+from database import save_routes
+import argparse
+import os
 import customtkinter as ctk
 import threading
+import time
 import webbrowser
-from pathlib import Path
 
-from route_engine import build_all_routes, rank_routes
-from map_utils import build_route_map_html
+import profiling
+import tracing
+
+from api import geocode
+from autocomplete import Autocomplete, PlaceIndex
+from estimator import TravelTimeEstimator
+from route_engine import (
+    build_all_routes, confirm_in_background, confirm_route, ensure_geometry, has_map,
+    needs_confirmation, rank_routes,
+)
+from map_utils import comparison_map_file, route_map_file
+from route_list import VirtualRouteList
+
+# Скільки пошук чекає на попереднє завантаження тієї ж пари міст
+PREFETCH_WAIT_S = 10
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -21,6 +36,14 @@ def format_distance(km: float) -> str:
     return f"{km:.1f} км"
 
 
+def format_pruned(pruned) -> str:
+    parts = []
+    for p in pruned:
+        action = "орієнтовно" if p["action"] == "approximate" else "пропущено"
+        parts.append(f"{p['mode']} — {action} ({p['reason']})")
+    return "; ".join(parts)
+
+
 class MandruyApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -29,8 +52,14 @@ class MandruyApp(ctk.CTk):
         self.geometry("820x600")
         self.minsize(800, 800)
 
-        self.last_map_html = None
+        self.last_map_file = None
+        self.comparison_map_file = None
+        self.current_routes = []
         self.selected_route = None
+        # Час авто/вело/пішки за історією; ORS підтверджує обраний маршрут
+        self.estimator = TravelTimeEstimator()
+        # Пара міст -> Event: маршрути вже будуються у фоні після введення міст
+        self._prefetching = {}
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
@@ -60,16 +89,33 @@ class MandruyApp(ctk.CTk):
         self.from_entry.grid(row=0, column=0, padx=14, pady=(14, 8), sticky="ew")
         self.to_entry.grid(row=0, column=1, padx=14, pady=(14, 8), sticky="ew")
 
+        # Підказки з історії та кешу геокодування; індекс читається у фоні
+        self.places = PlaceIndex()
+        threading.Thread(target=self.places.load, daemon=True).start()
+        Autocomplete(self.from_entry, self.places, on_commit=self._prefetch_place)
+        Autocomplete(self.to_entry, self.places, on_commit=self._prefetch_place)
+
         self.btn = ctk.CTkButton(body, text="Побудувати маршрути", command=self.on_get_routes)
         self.btn.grid(row=1, column=1, padx=14, pady=(0, 10), sticky="e")
 
+        self.debug_btn = ctk.CTkButton(
+            body,
+            text="Діагностика",
+            fg_color="gray40",
+            command=self.open_debug_panel
+        )
+        self.debug_btn.grid(row=1, column=0, padx=14, pady=(0, 10), sticky="w")
+        self.debug_window = None
+
         self.log_box = ctk.CTkTextbox(body, corner_radius=16, height=80)
         self.log_box.grid(row=2, column=0, columnspan=2, padx=14, pady=(0, 10), sticky="nsew")
         self.log_box.insert("end", "Готово. Введіть міста та натисніть «Побудувати маршрути».\n")
         self.log_box.configure(state="disabled")
 
-        self.routes_frame = ctk.CTkScrollableFrame(
+        self.routes_frame = VirtualRouteList(
             body,
+            format_row=self.format_route_row,
+            on_select=self.select_route,
             label_text="Доступні маршрути (відсортовані)",
             height=390
         )
@@ -86,6 +132,14 @@ class MandruyApp(ctk.CTk):
         )
         self.map_btn.grid(row=4, column=0, padx=14, pady=(0, 14), sticky="w")
 
+        self.compare_btn = ctk.CTkButton(
+            body,
+            text="Порівняти на карті",
+            state="disabled",
+            command=self.open_comparison_map
+        )
+        self.compare_btn.grid(row=4, column=1, padx=14, pady=(0, 14), sticky="e")
+
     def _log(self, msg: str):
         self.log_box.configure(state="normal")
         self.log_box.insert("end", msg + "\n")
@@ -102,18 +156,42 @@ class MandruyApp(ctk.CTk):
 
         self.btn.configure(state="disabled")
         self.map_btn.configure(state="disabled")
+        self.compare_btn.configure(state="disabled")
+        self.comparison_map_file = None
         self._log(f"🔎 Пошук маршрутів: {origin} → {destination}")
 
+        trace = tracing.begin(f"{origin} → {destination}")
+
+        self.places.add(origin)
+        self.places.add(destination)
+        pending = self._prefetching.get(self._pair_key(origin, destination))
+
         def worker():
             try:
-                routes = build_all_routes(origin, destination)
-                ranked = rank_routes(routes)
+                if pending is not None:
+                    pending.wait(PREFETCH_WAIT_S)  # не дублюємо запити, що вже в дорозі
+                # Для списку достатньо часу/відстані; геометрія — лише для карти
+                with profiling.profile_search(f"{origin}-{destination}"):
+                    self.estimator.refresh(background=True)
+                    routes = build_all_routes(
+                        origin, destination, with_geometry=False, estimator=self.estimator
+                    )
+                    ranked = rank_routes(routes)
+
+                if routes.pruned:
+                    pruned_msg = "✂️ Без запиту до ORS: " + format_pruned(routes.pruned)
+                    self.after(0, lambda: self._log(pruned_msg))
 
                 save_routes(origin, destination, ranked)
 
                 self.after(0, lambda: self.show_routes(ranked))
                 self.after(0, lambda: self._log("📊 Маршрути збережено та відсортовано"))
+                self.after(0, lambda: self.compare_btn.configure(state="normal"))
 
+                # Дорожні маршрути, взяті зі зворотного напрямку, уточнюються у фоні
+                confirm_in_background(ranked, on_done=lambda failed: self.after(
+                    0, lambda: self._reverse_confirmed(failed)))
+                self._prefetch_geometry(ranked)
 
             except Exception as e:
 
@@ -123,68 +201,244 @@ class MandruyApp(ctk.CTk):
 
             finally:
                 self.after(0, lambda: self.btn.configure(state="normal"))
+                self.after(0, lambda: self._finish_trace(trace))
 
         threading.Thread(target=worker, daemon=True).start()
 
-    def show_routes(self, routes):
-        for w in self.routes_frame.winfo_children():
-            w.destroy()
+    def load_snapshot(self, path):
+        # Кеш прогрівається у фоні, поки користувач вводить міста
+        def worker():
+            try:
+                import snapshot
+                counts = snapshot.import_snapshot(path)
+                self.places.add_cached_places()
+                msg = (f"♨️ Знімок кешу завантажено: {counts['geocode']} міст, "
+                       f"{counts['route'] + counts['summary']} маршрутів, "
+                       f"{counts['precomputed']} готових пар")
+            except Exception as e:
+                msg = f"❌ Знімок кешу не завантажено: {e}"
+            self.after(0, lambda: self._log(msg))
 
-        for i, r in enumerate(routes):
-            card = ctk.CTkFrame(self.routes_frame, corner_radius=12)
-            card.pack(fill="x", padx=8, pady=6)
+        threading.Thread(target=worker, daemon=True).start()
 
-            title = f"{i + 1}. {r['mode']} — {r['description']}"
-            ctk.CTkLabel(card, text=title, font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=10)
+    @staticmethod
+    def _pair_key(origin, destination):
+        return origin.strip().lower(), destination.strip().lower()
 
-            info = (
-                f"⏱ {format_duration(r['time_min'])} | "
-                f"💰 {r['price']} € | "
-                f"🔁 {r['transfers']} пересад."
-            )
-            ctk.CTkLabel(card, text=info).pack(anchor="w", padx=10)
+    def _prefetch_place(self, place):
+        # Поле втратило фокус: геокодуємо місто, а якщо є обидва — будуємо маршрути
+        origin = self.from_entry.get().strip()
+        destination = self.to_entry.get().strip()
+        key = self._pair_key(origin, destination)
+        both = origin and destination and key not in self._prefetching
+        done = threading.Event()
+        if both:
+            self._prefetching[key] = done
 
-            ctk.CTkButton(
-                card,
-                text="Обрати маршрут",
-                command=lambda route=r: self.select_route(route)
-            ).pack(anchor="e", padx=10, pady=6)
+        def worker():
+            try:
+                geocode(place)
+                if both:
+                    tracing.incr("route_prefetches")
+                    self.estimator.refresh(background=True)
+                    build_all_routes(
+                        origin, destination, with_geometry=False, estimator=self.estimator
+                    )
+            except Exception:
+                pass  # помилку покаже звичайний пошук
+            finally:
+                done.set()
+                # Пошук, що вже чекає, тримає свою подію; далі пару можна
+                # попередньо завантажити знову (після редагування полів)
+                if both and self._prefetching.get(key) is done:
+                    del self._prefetching[key]
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    @staticmethod
+    def format_route_row(i, r):
+        title = f"{i + 1}. {r['mode']} — {r['description']}"
+        if r.get("time_range"):
+            low, high = r["time_range"]
+            duration = f"≈ {format_duration(r['time_min'])} ({format_duration(low)}–{format_duration(high)})"
+        else:
+            duration = format_duration(r["time_min"])
+        info = (
+            f"⏱ {duration} | "
+            f"💰 {r['price']} € | "
+            f"🔁 {r['transfers']} пересад."
+        )
+        return title, info
+
+    def _reverse_confirmed(self, failed):
+        self.routes_frame.refresh()
+        for route, error in failed:
+            self._log(f"⚠️ Зворотний маршрут не уточнено: {route['description']} ({error})")
+
+    def _prefetch_geometry(self, ranked):
+        # Карту найкращого варіанта найімовірніше відкриють — вантажимо заздалегідь
+        top = next((r for r in ranked if has_map(r)), None)
+        if top is None:
+            return
+
+        def prefetch():
+            try:
+                if needs_confirmation(top):
+                    confirm_route(top, self.estimator)
+                    self.after(0, self.routes_frame.refresh)
+                ensure_geometry(top)
+            except Exception:
+                pass  # не критично: геометрію буде завантажено при виборі
+
+        threading.Thread(target=prefetch, daemon=True).start()
+
+    def show_routes(self, routes):
+        self.current_routes = routes
+        # Віджети створюються лише для видимих рядків і перевикористовуються
+        t0 = time.perf_counter()
+        with tracing.span("show_routes", count=len(routes)):
+            self.routes_frame.set_items(routes)
+            self.update_idletasks()
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        self._log(f"⏱ Список оновлено за {elapsed_ms:.1f} мс ({len(routes)} маршрутів)")
+
+    def _finish_trace(self, trace):
+        tracing.end(trace)
+        if self.debug_window is not None and self.debug_window.winfo_exists():
+            self._refresh_debug_panel()
+
+    def open_debug_panel(self):
+        if self.debug_window is not None and self.debug_window.winfo_exists():
+            self.debug_window.focus()
+            self._refresh_debug_panel()
+            return
+
+        self.debug_window = ctk.CTkToplevel(self)
+        self.debug_window.title("MandruyUA — Діагностика останнього пошуку")
+        self.debug_window.geometry("900x420")
+
+        self.debug_box = ctk.CTkTextbox(
+            self.debug_window,
+            font=ctk.CTkFont(family="Courier", size=12),
+            wrap="none"
+        )
+        self.debug_box.pack(fill="both", expand=True, padx=10, pady=10)
+        self._refresh_debug_panel()
+
+    def _refresh_debug_panel(self):
+        self.debug_box.configure(state="normal")
+        self.debug_box.delete("1.0", "end")
+        self.debug_box.insert("end", tracing.format_waterfall())
+        self.debug_box.configure(state="disabled")
 
     def select_route(self, route):
         self.selected_route = route
         self._log(f"✅ Обрано маршрут: {route['mode']} ({route['time_min']} хв)")
 
+        self.last_map_file = None
+        self.map_btn.configure(state="disabled")
+
         if route.get("geometry"):
-            self.last_map_html = build_route_map_html(
-                route["start"],
-                route["end"],
-                route["geometry"]
-            )
-            self.map_btn.configure(state="normal")
+            self._show_route_map(route)
+        elif has_map(route):
+            estimated = needs_confirmation(route)
+            self._log("⏳ Уточнення маршруту в ORS…" if estimated else "⏳ Завантаження карти маршруту…")
+
+            def worker():
+                try:
+                    if estimated:
+                        confirm_route(route, self.estimator)
+                        msg = f"✔️ {route['mode']}: за ORS {format_duration(route['time_min'])}"
+                        self.after(0, lambda: self._log(msg))
+                        self.after(0, self.routes_frame.refresh)
+                    ensure_geometry(route)
+                    self.after(0, lambda: self._show_route_map(route))
+                except Exception as e:
+                    err = str(e)
+                    self.after(0, lambda: self._log(f"❌ Помилка карти: {err}"))
+
+            threading.Thread(target=worker, daemon=True).start()
         else:
-            self.last_map_html = None
-            self.map_btn.configure(state="disabled")
             self._log("ℹ️ Для цього маршруту карта недоступна")
 
+    def _show_route_map(self, route):
+        if route is not self.selected_route:
+            return  # користувач уже обрав інший маршрут
+        self.last_map_file = route_map_file(
+            route["start"],
+            route["end"],
+            route["geometry"]
+        )
+        self.map_btn.configure(state="normal")
+
     def open_map_window(self):
-        if not self.last_map_html:
+        if not self.last_map_file:
             self._log("ℹ️ Карта ще не створена.")
             return
 
-        maps_dir = Path("maps")
-        maps_dir.mkdir(exist_ok=True)
+        webbrowser.open(self.last_map_file.resolve().as_uri())
+        self._log("🗺️ Карту відкрито в браузері")
+
+    def open_comparison_map(self):
+        if self.comparison_map_file:
+            webbrowser.open(self.comparison_map_file.resolve().as_uri())
+            self._log("🗺️ Карту порівняння відкрито в браузері")
+            return
+
+        if not self.current_routes:
+            self._log("ℹ️ Карта порівняння ще не створена.")
+            return
+
+        routes = self.current_routes
+        self.compare_btn.configure(state="disabled")
+        self._log("⏳ Побудова карти порівняння…")
+
+        def worker():
+            try:
+                # Одна карта на пошук: усі маршрути окремими шарами
+                for r in routes:
+                    confirm_route(r, self.estimator)
+                    ensure_geometry(r)
+                self.after(0, self.routes_frame.refresh)
+                with tracing.span("comparison_map"):
+                    path = comparison_map_file(routes)
+                if routes is self.current_routes:
+                    self.comparison_map_file = path
+                    self.after(0, self.open_comparison_map)
+            except Exception as e:
+                err = str(e)
+                self.after(0, lambda: self._log(f"❌ Помилка карти: {err}"))
+            finally:
+                self.after(0, lambda: self.compare_btn.configure(state="normal"))
+
+        threading.Thread(target=worker, daemon=True).start()
 
-        map_file = maps_dir / "route_map.html"
-        map_file.write_text(self.last_map_html, encoding="utf-8")
 
-        webbrowser.open(map_file.resolve().as_uri())
-        self._log("🗺️ Карту відкрито в браузері")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="MandruyUA — планування подорожей")
+    parser.add_argument("--profile", action="store_true",
+                        help="профілювати кожен пошук і стежити за зависаннями UI (profiles/)")
+    parser.add_argument("--precompute", action="store_true",
+                        help="оновлювати маршрути популярних пар у фоні (квота ORS-запитів)")
+    parser.add_argument("--snapshot", default=os.getenv("MANDRUY_SNAPSHOT"),
+                        help="знімок кешів (cli.py snapshot export), що вантажиться у фоні під час старту")
+    parser.add_argument("--stall-ms", type=float, default=profiling.DEFAULT_STALL_MS,
+                        help="поріг зависання головного циклу Tk, мс")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    init_db()
+    args = parse_args()
+    if args.profile:
+        profiling.enable()
+        profiling.StallDetector(args.stall_ms).install()
+    if args.precompute:
+        import precompute
+        precompute.RefreshScheduler().start()
     app = MandruyApp()
+    if args.snapshot:
+        app.load_snapshot(args.snapshot)
     app.mainloop()
 
@@ -5,17 +5,14 @@ from pathlib import Path
 
 from api import geocode, get_route
 from map_utils import build_route_map_html
+from providers import ORS_PROFILES
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
 
 # 🔹 Профілі транспорту (UI → ORS)
-TRANSPORT_PROFILES = {
-    "Авто": "driving-car",
-    "Велосипед": "cycling-regular",
-    "Пішки": "foot-walking",
-}
+TRANSPORT_PROFILES = {str(mode): profile for mode, profile in ORS_PROFILES.items()}
 
 
 def format_duration(seconds: float) -> str:
@@ -0,0 +1,152 @@
+import bisect
+import threading
+
+import customtkinter as ctk
+
+import api
+import database
+
+# Пауза після останнього натискання, перш ніж шукати підказки
+DEBOUNCE_MS = 150
+MAX_SUGGESTIONS = 6
+# Скільки ключів з тим самим префіксом переглядати (далі — найпопулярніші з них)
+MAX_SCAN = 500
+# Затримка ховання підказок після втрати фокуса, щоб клік по підказці спрацював
+HIDE_DELAY_MS = 200
+
+
+class PlaceIndex:
+    """
+    Sorted prefix index of known places: cities from the routes history
+    (weighted by how often they were searched) and geocoded labels.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._names = {}
+        self._weights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add_many(self, places):
+        """places: iterable of (name, weight)."""
+        with self._lock:
+            new = False
+            for name, weight in places:
+                key = database.place_key(name)
+                if not key:
+                    continue
+                if key not in self._names:
+                    self._names[key] = name.strip()
+                    new = True
+                self._weights[key] = self._weights.get(key, 0) + weight
+            if new:
+                self._keys = sorted(self._names)
+
+    def add(self, name, weight=1):
+        self.add_many([(name, weight)])
+
+    def load(self):
+        """Fill from mandruy.db and the geocode cache (call off the UI thread)."""
+        self.add_many(database.get_known_places())
+        self.add_cached_places()
+        return self
+
+    def add_cached_places(self):
+        # "Kyiv, Ukraine" -> "Kyiv": підказуємо назву міста, як її вводять
+        self.add_many((label.split(",")[0], 0) for label in api.cached_places())
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        key = database.place_key(prefix)
+        if not key:
+            return []
+        keys = self._keys
+        i = bisect.bisect_left(keys, key)
+        matches = []
+        while i < len(keys) and len(matches) < MAX_SCAN and keys[i].startswith(key):
+            if keys[i] != key:
+                matches.append(keys[i])
+            i += 1
+        matches.sort(key=lambda k: (-self._weights.get(k, 0), k))
+        return [self._names[k] for k in matches[:limit]]
+
+
+class Autocomplete:
+    """
+    Debounced suggestion list under a CTkEntry. on_commit(text) is called
+    when a suggestion is chosen or the entry loses focus with a new value.
+    """
+
+    def __init__(self, entry, index, on_commit=None, debounce_ms=DEBOUNCE_MS):
+        self.entry = entry
+        self.index = index
+        self.on_commit = on_commit
+        self.debounce_ms = debounce_ms
+
+        self._after_id = None
+        self._popup = None
+        self._buttons = []
+        self._committed = None
+
+        entry.bind("<KeyRelease>", self._on_key, add="+")
+        entry.bind("<FocusOut>", self._on_focus_out, add="+")
+
+    def _on_key(self, event):
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+            self._after_id = None
+        if event.keysym in ("Escape", "Return", "Tab"):
+            self._hide()
+            return
+        self._after_id = self.entry.after(self.debounce_ms, self._update)
+
+    def _update(self):
+        self._after_id = None
+        self._show(self.index.suggest(self.entry.get()))
+
+    def _show(self, names):
+        if not names:
+            self._hide()
+            return
+        if self._popup is None:
+            self._popup = ctk.CTkFrame(self.entry.winfo_toplevel(), corner_radius=8)
+        while len(self._buttons) < len(names):
+            button = ctk.CTkButton(self._popup, text="", anchor="w", height=26,
+                                   fg_color="transparent", text_color=("gray10", "gray90"))
+            button.pack(fill="x", padx=4, pady=1)
+            self._buttons.append(button)
+
+        # Кнопки перевикористовуються: зайві лише ховаються
+        for i, button in enumerate(self._buttons):
+            if i < len(names):
+                button.configure(text=names[i], command=lambda n=names[i]: self._choose(n))
+                button.pack(fill="x", padx=4, pady=1)
+            else:
+                button.pack_forget()
+
+        self._popup.place(in_=self.entry, relx=0, rely=1, relwidth=1, y=2)
+        self._popup.lift()
+
+    def _hide(self):
+        if self._popup is not None:
+            self._popup.place_forget()
+
+    def _choose(self, name):
+        self.entry.delete(0, "end")
+        self.entry.insert(0, name)
+        self._hide()
+        self._commit(name)
+
+    def _on_focus_out(self, event):
+        self.entry.after(HIDE_DELAY_MS, self._hide)
+        self._commit(self.entry.get())
+
+    def _commit(self, text):
+        text = text.strip()
+        if not text or text == self._committed:
+            return
+        self._committed = text
+        if self.on_commit is not None:
+            self.on_commit(text)
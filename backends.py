@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import tracing
+
+# Стільки помилок поспіль — і бекенд виводиться з пулу...
+FAIL_THRESHOLD = 3
+# ...на стільки секунд, після чого отримує пробний запит
+COOLDOWN_S = 30.0
+HEALTH_TIMEOUT_S = 5.0
+
+
+class NoBackendAvailable(RuntimeError):
+    pass
+
+
+@dataclass
+class Backend:
+    """One ORS endpoint (public API key or self-hosted instance)."""
+
+    name: str
+    url: str
+    api_key: str = None
+    weight: float = 1.0
+    quota_per_minute: int = None
+    quota_per_day: int = None
+    # Шлях перевірки стану відносно url ("/v2/health" для власного ORS);
+    # None — лише пасивна перевірка за помилками запитів
+    health_path: str = None
+
+    outstanding: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    down_until: float = 0.0
+    _minute: deque = field(default_factory=deque, repr=False)
+    _day: tuple = (None, 0)
+
+    def healthy(self, now):
+        return now >= self.down_until
+
+    def under_quota(self, now):
+        while self._minute and now - self._minute[0] >= 60:
+            self._minute.popleft()
+        if self.quota_per_minute is not None and len(self._minute) >= self.quota_per_minute:
+            return False
+        day, count = self._day
+        if self.quota_per_day is not None and day == time.strftime("%Y-%m-%d") \
+                and count >= self.quota_per_day:
+            return False
+        return True
+
+    def _count_request(self, now):
+        self._minute.append(now)
+        today = time.strftime("%Y-%m-%d")
+        day, count = self._day
+        self._day = (today, count + 1 if day == today else 1)
+        self.requests += 1
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "up": self.healthy(time.monotonic()),
+        }
+
+
+class BackendPool:
+    """
+    Least-outstanding-requests routing over weighted backends: a request
+    goes to the healthy backend under quota with the fewest in-flight
+    requests per unit of weight, ties going to the one with the fewest
+    requests so far per unit of weight. FAIL_THRESHOLD failures in a row take a
+    backend out for COOLDOWN_S; an optional health check (health_path)
+    takes it out or brings it back sooner.
+    """
+
+    def __init__(self, backends):
+        if not backends:
+            raise ValueError("Backend pool needs at least one backend")
+        self.backends = list(backends)
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self.backends)
+
+    def acquire(self, exclude=()):
+        """Pick a backend and count the request as outstanding on it."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [
+                b for b in self.backends
+                if b.healthy(now) and b.under_quota(now) and b not in exclude
+            ]
+            if not candidates and exclude:
+                # Усі інші недоступні: повтор на тому ж бекенді краще, ніж нічого
+                candidates = [b for b in self.backends if b.healthy(now) and b.under_quota(now)]
+            if not candidates:
+                raise NoBackendAvailable(
+                    "ORS: немає доступного бекенда (усі недоступні або вичерпали квоту)"
+                )
+            # За рівного навантаження (напр., послідовні запити) — той, що обслужив
+            # менше запитів на одиницю ваги: трафік ділиться пропорційно вагам
+            backend = min(candidates, key=lambda b: (b.outstanding / b.weight,
+                                                     b.requests / b.weight))
+            backend.outstanding += 1
+            backend._count_request(now)
+        return backend
+
+    def release(self, backend, ok):
+        with self._lock:
+            backend.outstanding -= 1
+            if ok:
+                backend.consecutive_failures = 0
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= FAIL_THRESHOLD:
+                backend.down_until = time.monotonic() + COOLDOWN_S
+                backend.consecutive_failures = 0
+                tracing.incr("backends_taken_out")
+
+    # ===== HEALTH CHECKS =====
+    def check_health(self):
+        """Probe every backend with a health_path; returns {name: up}."""
+        import requests
+
+        result = {}
+        for backend in self.backends:
+            if not backend.health_path:
+                continue
+            try:
+                r = requests.get(backend.url + backend.health_path, timeout=HEALTH_TIMEOUT_S)
+                up = r.status_code == 200
+            except requests.RequestException:
+                up = False
+            with self._lock:
+                if up:
+                    backend.down_until = 0.0
+                    backend.consecutive_failures = 0
+                elif backend.healthy(time.monotonic()):
+                    backend.down_until = time.monotonic() + COOLDOWN_S
+                    tracing.incr("backends_taken_out")
+            result[backend.name] = up
+        return result
+
+    def start_health_checks(self, interval_s=COOLDOWN_S):
+        if self._health_thread is None and any(b.health_path for b in self.backends):
+            self._stop.clear()
+
+            def run():
+                while not self._stop.wait(interval_s):
+                    self.check_health()
+
+            self._health_thread = threading.Thread(target=run, name="ors-health", daemon=True)
+            self._health_thread.start()
+        return self
+
+    def stop_health_checks(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(HEALTH_TIMEOUT_S)
+            self._health_thread = None
+
+    def stats(self):
+        with self._lock:
+            return {b.name: b.stats() for b in self.backends}
+
+
+def load_config(path):
+    """
+    JSON list of backends:
+
+        [{"name": "self-hosted", "url": "http://ors:8080/ors", "weight": 3,
+          "health_path": "/v2/health"},
+         {"name": "public", "url": "https://api.openrouteservice.org",
+          "api_key_env": "ORS_API_KEY", "quota_per_minute": 40, "quota_per_day": 2000}]
+
+    api_key_env reads the key from the environment (.env) instead of the file.
+    Weights must be positive.
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    backends = []
+    for i, entry in enumerate(entries):
+        weight = float(entry.get("weight", 1.0))
+        if not weight > 0:
+            raise ValueError(f"{path}: вага бекенда {entry.get('name', i)} має бути > 0")
+        api_key = entry.get("api_key")
+        if entry.get("api_key_env"):
+            api_key = os.getenv(entry["api_key_env"])
+        backends.append(Backend(
+            name=entry.get("name", f"backend{i}"),
+            url=entry["url"].rstrip("/"),
+            api_key=api_key,
+            weight=weight,
+            quota_per_minute=entry.get("quota_per_minute"),
+            quota_per_day=entry.get("quota_per_day"),
+            health_path=entry.get("health_path"),
+        ))
+    return backends
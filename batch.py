@@ -0,0 +1,150 @@
+import csv
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass, field
+
+import api
+import database
+
+# Пар на одне завдання пулу: менше обмінів між процесами
+DEFAULT_CHUNK_SIZE = 16
+# Записувач комітить не частіше, ніж раз на стільки пошуків (або коли черга порожня)
+WRITE_BATCH = 200
+
+# Лише те, що пише database.save_routes: без геометрії та ділянок
+_ROW_FIELDS = (
+    "mode", "time_min", "price", "transfers", "score",
+    "distance_km", "source", "start", "end",
+)
+
+# Черга до процесу-записувача (задається в кожному процесі-працівнику)
+_writer_queue = None
+
+
+@dataclass
+class BatchResult:
+    planned: int = 0
+    failed: list = field(default_factory=list)
+    elapsed_s: float = 0.0
+    workers: int = 1
+
+    @property
+    def pairs_per_s(self):
+        return self.planned / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def read_pairs(path):
+    """(origin, destination) per CSV line; blank lines and # comments skipped."""
+    pairs = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            if len(row) < 2:
+                raise ValueError(f"Очікується 'звідки,куди': {','.join(row)}")
+            pairs.append((row[0].strip(), row[1].strip()))
+    return pairs
+
+
+def _init_worker(snapshot, writer_queue, db_name):
+    global _writer_queue
+    _writer_queue = writer_queue
+    database.DB_NAME = db_name
+    database.ensure_db()
+    # Кеш батьківського процесу — лише для читання: нове лишається в працівнику
+    api.load_cache_snapshot(snapshot)
+
+
+def _plan_chunk(pairs, with_itineraries):
+    from route_engine import build_all_routes, rank_routes
+
+    rows = []
+    failed = []
+    for origin, destination in pairs:
+        try:
+            plan = build_all_routes(
+                origin, destination, with_geometry=False, with_itineraries=with_itineraries,
+                reuse_reverse=False,
+            )
+            ranked = rank_routes(plan)
+        except Exception as e:
+            failed.append((origin, destination, str(e)))
+            continue
+        rows.append((origin, destination, [
+            {name: r.get(name) for name in _ROW_FIELDS} for r in ranked
+        ]))
+
+    if _writer_queue is not None and rows:
+        _writer_queue.put(rows)
+    return len(rows), failed
+
+
+def _writer(queue, db_name):
+    # Єдиний процес, що пише в SQLite: без блокувань між працівниками
+    database.DB_NAME = db_name
+    conn = database.get_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
+    pending = []
+    while True:
+        item = queue.get()
+        if item is None:
+            break
+        pending.extend(item)
+        if len(pending) >= WRITE_BATCH or queue.empty():
+            database.save_routes_many(pending, conn)
+            pending.clear()
+    if pending:
+        database.save_routes_many(pending, conn)
+    conn.close()
+
+
+def plan_batch(pairs, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, save=True,
+               with_itineraries=True, progress=None):
+    """
+    Plan many (origin, destination) pairs on a process pool.
+
+    Each worker gets a copy of this process's geocode/directions caches
+    and its own HTTP session; ranked routes go to one writer process
+    that saves them to mandruy.db. progress(done, total) is called as
+    chunks finish.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    pairs = list(pairs)
+    workers = workers or os.cpu_count() or 1
+    database.ensure_db()
+
+    ctx = multiprocessing.get_context()
+    queue = ctx.Queue() if save else None
+    writer = None
+    if save:
+        writer = ctx.Process(target=_writer, args=(queue, database.DB_NAME), name="batch-writer")
+        writer.start()
+
+    result = BatchResult(workers=workers)
+    t0 = time.perf_counter()
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(api.cache_snapshot(), queue, database.DB_NAME),
+        ) as pool:
+            futures = [pool.submit(_plan_chunk, chunk, with_itineraries) for chunk in chunks]
+            done = 0
+            for future in as_completed(futures):
+                planned, failed = future.result()
+                result.planned += planned
+                result.failed.extend(failed)
+                done += planned + len(failed)
+                if progress is not None:
+                    progress(done, len(pairs))
+    finally:
+        if writer is not None:
+            queue.put(None)
+            writer.join()
+
+    result.elapsed_s = time.perf_counter() - t0
+    return result
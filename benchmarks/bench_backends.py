@@ -0,0 +1,131 @@
+"""
+Backend pool (backends.py) against three local ORS stubs: traffic split by
+weight, failover away from a failing backend, spill-over and exhaustion
+of per-minute quotas, and the active health check of a stopped backend.
+
+    python benchmarks/bench_backends.py [--requests 300]
+
+Prints the share of requests per backend for each scenario and exits with
+status 1 if one of them does not behave as expected.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import api  # noqa: E402
+from backends import Backend, BackendPool, NoBackendAvailable  # noqa: E402
+from ors_stub import OrsStub  # noqa: E402
+
+# Допустиме відхилення частки запитів від частки ваги
+SHARE_TOLERANCE = 0.05
+
+
+def run_requests(pool, n, prefix):
+    api.set_backend_pool(pool)
+    api.clear_caches()
+    errors = 0
+    for i in range(n):
+        try:
+            api.geocode(f"{prefix} {i}")
+        except (RuntimeError, OSError):
+            errors += 1
+    return errors
+
+
+def shares(pool):
+    total = sum(b.requests for b in pool.backends) or 1
+    return {b.name: b.requests / total for b in pool.backends}
+
+
+def report(title, pool, errors, ok):
+    split = ", ".join(f"{name} {share:.0%}" for name, share in shares(pool).items())
+    print(f"{'OK  ' if ok else 'FAIL'} {title}: {split}; помилок {errors}")
+    return ok
+
+
+def weighting(stubs, n):
+    weights = (1, 2, 3)
+    pool = BackendPool([Backend(f"w{w}", s.url, "stub", weight=w) for s, w in zip(stubs, weights)])
+    errors = run_requests(pool, n, "weights")
+    expected = [w / sum(weights) for w in weights]
+    ok = errors == 0 and all(
+        abs(share - want) <= SHARE_TOLERANCE for share, want in zip(shares(pool).values(), expected)
+    )
+    return report("ваги 1:2:3", pool, errors, ok)
+
+
+def failover(stubs, broken, n):
+    pool = BackendPool([
+        Backend("broken", broken.url, "stub", weight=5),
+        Backend("a", stubs[0].url, "stub"),
+        Backend("b", stubs[1].url, "stub"),
+    ])
+    errors = run_requests(pool, n, "failover")
+    down = not pool.backends[0].healthy(time.monotonic())
+    ok = errors == 0 and down and pool.backends[0].requests < n * 0.1
+    return report("збійний бекенд (503) виводиться з пулу", pool, errors, ok)
+
+
+def quota(stubs, n):
+    quotas = (n // 4, n // 4)
+    pool = BackendPool([
+        Backend(f"q{i}", s.url, "stub", quota_per_minute=q)
+        for i, (s, q) in enumerate(zip(stubs, quotas))
+    ])
+    errors = run_requests(pool, n, "quota")
+    served = sum(b.requests for b in pool.backends)
+    ok = served == sum(quotas) and errors == n - sum(quotas)
+    # Після вичерпання всіх квот пул відмовляє одразу, без запиту до ORS
+    try:
+        pool.acquire()
+        ok = False
+    except NoBackendAvailable:
+        pass
+    return report(f"квоти {quotas[0]}+{quotas[1]}/хв на {n} запитів", pool, errors, ok)
+
+
+def health(stubs):
+    victim = OrsStub().start()
+    pool = BackendPool([
+        Backend("victim", victim.url, "stub", health_path="/v2/health"),
+        Backend("a", stubs[0].url, "stub", health_path="/v2/health"),
+    ])
+    first = pool.check_health()
+    victim.stop()
+    second = pool.check_health()
+    ok = first == {"victim": True, "a": True} and second == {"victim": False, "a": True}
+    print(f"{'OK  ' if ok else 'FAIL'} перевірка стану: до зупинки {first}, після {second}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    with OrsStub() as s1, OrsStub() as s2, OrsStub() as s3, \
+            OrsStub(error_rate=1.0) as broken, tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        api.RETRY_BACKOFF_S = 0  # повтори на тому ж бекенді без очікування
+        stubs = (s1, s2, s3)
+        results = [
+            weighting(stubs, args.requests),
+            failover(stubs, broken, args.requests),
+            quota(stubs, args.requests),
+            health(stubs),
+        ]
+        api.set_backend_pool(None)
+
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
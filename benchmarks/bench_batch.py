@@ -0,0 +1,76 @@
+"""
+Throughput of the batch planner (batch.py) for 1, 2, 4, ... worker
+processes against the local ORS stub, with and without a warm cache
+snapshot. Speed-up is relative to one worker.
+
+    python benchmarks/bench_batch.py [--pairs 256] [--max-workers 32] [--latency-ms 5]
+
+Cold runs are bound by the stub (one process, one GIL); warm runs
+(every pair already in the parent's cache) show the CPU scaling.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ors_stub import OrsStub  # noqa: E402
+
+
+def worker_counts(max_workers):
+    n = 1
+    while n < max_workers:
+        yield n
+        n *= 2
+    yield max_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=256)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stub latency")
+    parser.add_argument("--chunk-size", type=int, default=16)
+    args = parser.parse_args()
+
+    with OrsStub(latency_ms=args.latency_ms) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["ORS_BASE_URL"] = stub.url
+        os.environ["ORS_API_KEY"] = "stub"
+        os.chdir(tmp)
+
+        import api
+        import batch
+        import database
+        from route_engine import build_all_routes
+
+        database.DB_NAME = str(Path(tmp) / "batch.db")
+        cities = [f"City{i}" for i in range(32)]
+        pairs = [(cities[i % 32], cities[(i * 7 + 1) % 32]) for i in range(args.pairs)]
+        pairs = [(a, b) for a, b in pairs if a != b]
+
+        print(f"{len(pairs)} pairs, stub latency {args.latency_ms:.0f} ms, "
+              f"{os.cpu_count()} CPUs")
+        print(f"{'cache':<6}{'workers':>8}{'pairs/s':>10}{'speed-up':>10}")
+        for label in ("cold", "warm"):
+            if label == "warm":
+                # Прогрів кешу батьківського процесу: працівники отримують його знімок
+                for a, b in pairs:
+                    build_all_routes(a, b, with_geometry=False, use_precomputed=False)
+            base = None
+            for workers in worker_counts(args.max_workers):
+                if label == "cold":
+                    api.clear_caches()
+                result = batch.plan_batch(pairs, workers=workers, chunk_size=args.chunk_size)
+                if result.failed:
+                    print(f"  {len(result.failed)} failed: {result.failed[0]}")
+                base = base or result.pairs_per_s
+                print(f"{label:<6}{workers:>8}{result.pairs_per_s:>10.1f}"
+                      f"{result.pairs_per_s / base:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
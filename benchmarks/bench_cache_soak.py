@@ -0,0 +1,89 @@
+"""
+Soak run of the in-memory caches: many distinct car routes with full
+geometry through api.get_route against the local ORS stub, checking that
+peak RSS stays under a cap while the directions cache evicts by bytes.
+
+    python benchmarks/bench_cache_soak.py [--requests 3000] [--pairs 3000]
+        [--budget-mb 32] [--max-rss-mb 200] [--unbounded]
+
+--unbounded gives the directions cache a huge budget, to compare. Exits
+with status 1 if peak RSS goes over --max-rss-mb.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ors_stub import OrsStub, synthetic_place  # noqa: E402
+
+
+def rss_mb():
+    # Поточний RSS з /proc; де його немає — пік
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--pairs", type=int, default=3000, help="кількість різних пар міст")
+    parser.add_argument("--budget-mb", type=float, default=32, help="бюджет кешу directions")
+    parser.add_argument("--max-rss-mb", type=float, default=200)
+    parser.add_argument("--unbounded", action="store_true")
+    args = parser.parse_args()
+
+    budget = 1_000_000 if args.unbounded else args.budget_mb
+    os.environ["MANDRUY_CACHE_BUDGETS"] = f"directions={budget}"
+
+    with OrsStub() as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["ORS_BASE_URL"] = stub.url
+        os.environ["ORS_API_KEY"] = "stub"
+        os.chdir(tmp)
+
+        import api
+        import memcache
+
+        # Популярність пар за законом Ципфа: довгий хвіст рідкісних маршрутів
+        rng = random.Random(1)
+        pairs = [(synthetic_place(f"City{i}"), synthetic_place(f"City{i}-to"))
+                 for i in range(args.pairs)]
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(args.pairs)]
+        start_rss = rss_mb()
+        print(f"directions budget {budget:g} MB, RSS at start {start_rss:.0f} MB")
+        print(f"{'requests':>9}{'RSS, MB':>9}{'cache, MB':>11}{'entries':>9}{'hit rate':>10}"
+              f"{'evicted':>9}")
+
+        step = max(1, args.requests // 10)
+        for n in range(1, args.requests + 1):
+            start, end = rng.choices(pairs, weights)[0]
+            api.get_route(start, end, "driving-car")
+            if n % step == 0:
+                s = memcache.stats()["directions"]
+                print(f"{n:>9}{rss_mb():>9.0f}{s['bytes'] / 2 ** 20:>11.1f}{s['entries']:>9}"
+                      f"{s['hit_rate']:>10.0%}{s['evictions']:>9}")
+
+        peak = peak_rss_mb()
+        print(f"peak RSS {peak:.0f} MB (cap {args.max_rss_mb:g} MB), "
+              f"{stub.requests} directions requests")
+        if peak > args.max_rss_mb:
+            print("FAIL: peak RSS over the cap")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Directions cache hit rate and time error for each departure bucket size
+(api.DEPARTURE_BUCKET_S), on a synthetic day of car searches against the
+local ORS stub with rush-hour traffic.
+
+    python benchmarks/bench_departure_buckets.py [--searches 2000] [--pairs 40]
+
+Error is relative to the duration ORS returns for the exact departure
+time: larger buckets hit the cache more often and drift further from it.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ors_stub import OrsStub, _route_parts, synthetic_place  # noqa: E402
+
+BUCKET_MINUTES = (5, 15, 30, 60, 120, 180)
+
+
+def workload(searches, pairs, seed=1):
+    # Популярність пар за законом Ципфа; відправлення протягом доби,
+    # частіше вранці та ввечері
+    rng = random.Random(seed)
+    pair_list = [(f"City{i}", f"City{i}-to") for i in range(pairs)]
+    weights = [1 / (rank + 1) for rank in range(pairs)]
+    day = datetime(2026, 10, 19)
+    result = []
+    for _ in range(searches):
+        origin, destination = rng.choices(pair_list, weights)[0]
+        hour = rng.choice((rng.gauss(8, 1.5), rng.gauss(17.5, 1.5), rng.uniform(0, 24)))
+        result.append((origin, destination, day + timedelta(hours=min(max(hour, 0), 23.99))))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=2000)
+    parser.add_argument("--pairs", type=int, default=50, help="кількість різних пар міст")
+    args = parser.parse_args()
+
+    with OrsStub() as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["ORS_BASE_URL"] = stub.url
+        os.environ["ORS_API_KEY"] = "stub"
+        os.chdir(tmp)
+
+        import api
+
+        searches = [
+            (synthetic_place(o), synthetic_place(d), departure)
+            for o, d, departure in workload(args.searches, args.pairs)
+        ]
+        exact = [
+            _route_parts("driving-car", [start, end], instructions=False, with_line=False,
+                         departure=departure.isoformat(timespec="minutes"))[0]["summary"]["duration"]
+            for start, end, departure in searches
+        ]
+
+        print(f"{len(searches)} car searches over {args.pairs} city pairs")
+        print(f"{'bucket':>8}{'hit rate':>10}{'requests':>10}{'mean err':>10}{'max err':>10}")
+        for minutes in BUCKET_MINUTES:
+            api.DEPARTURE_BUCKET_S = minutes * 60
+            api.clear_caches()
+            before = stub.requests
+            errors = []
+            for (start, end, departure), true_s in zip(searches, exact):
+                summary = api.get_route_summary(start, end, "driving-car", departure)
+                errors.append(abs(summary["duration_s"] - true_s) / true_s)
+            requests = stub.requests - before
+            print(f"{minutes:>6} хв{1 - requests / len(searches):>10.1%}{requests:>10}"
+                  f"{sum(errors) / len(errors):>10.2%}{max(errors):>10.2%}")
+
+
+if __name__ == "__main__":
+    main()
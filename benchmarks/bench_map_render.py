@@ -0,0 +1,65 @@
+"""
+Rendered map size and render time with and without geometry simplification.
+
+    python benchmarks/bench_map_render.py [--points 50000]
+"""
+import argparse
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from map_utils import build_route_map_html, render_route_map_template  # noqa: E402
+
+
+def synthetic_route(n_points, start=(30.52, 50.45), end=(2.35, 48.86), seed=42):
+    # Довгий «дорожній» маршрут: пряма з дрібним шумом, як у відповідях ORS
+    rnd = random.Random(seed)
+    coords = []
+    for i in range(n_points):
+        t = i / (n_points - 1)
+        lon = start[0] + (end[0] - start[0]) * t + 0.02 * math.sin(t * 400)
+        lat = start[1] + (end[1] - start[1]) * t + 0.02 * math.cos(t * 300)
+        coords.append([lon + rnd.uniform(-1e-4, 1e-4), lat + rnd.uniform(-1e-4, 1e-4)])
+    return {"type": "LineString", "coordinates": coords}
+
+
+def measure(geometry, repeat, render=build_route_map_html, **kwargs):
+    coords = geometry["coordinates"]
+    best = float("inf")
+    html = ""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        html = render(coords[0], coords[-1], geometry, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best, len(html.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--points", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    geometry = synthetic_route(args.points)
+
+    cases = [
+        ("raw", {"simplify": False}),
+        ("zoom 14", {"simplify_zoom": 14}),
+        ("zoom 12 (default)", {}),
+        ("zoom 10", {"simplify_zoom": 10}),
+        ("template, zoom 12", {"render": render_route_map_template}),
+    ]
+
+    print(f"points: {args.points}")
+    print(f"{'case':<20}{'time, s':>10}{'size, KB':>12}")
+    for name, kwargs in cases:
+        seconds, size = measure(geometry, args.repeat, **kwargs)
+        print(f"{name:<20}{seconds:>10.3f}{size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Memory per 1M routes for plain dicts, Route records and RouteBatch.
+
+    python benchmarks/bench_memory.py [--routes 200000]
+
+Measured with tracemalloc for --routes candidates and scaled to 1M.
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from records import Mode, Route, RouteBatch, Source  # noqa: E402
+
+MODES = list(Mode)
+SOURCES = [Source.ORS, Source.ORS, Source.ORS, Source.RAIL, Source.BUS, Source.AVIATION]
+
+
+def as_dict(i):
+    # Так маршрути виглядали раніше: окремий dict на кожен, рядки-значення
+    return {
+        "mode": str(MODES[i % 6]),
+        "time_min": 30 + i % 900,
+        "price": float(i % 300) * 0.7,
+        "distance_km": 10.0 + i % 1000,
+        "transfers": i % 3,
+        "description": "Маршрут з пересадкою",
+        "geometry": None,
+        "start": (30.52, 50.45),
+        "end": (24.03, 49.84),
+        "source": str(SOURCES[i % 6]),
+        "score": 0.5,
+    }
+
+
+def as_record(i):
+    return Route(
+        mode=MODES[i % 6], time_min=30 + i % 900, price=float(i % 300) * 0.7,
+        distance_km=10.0 + i % 1000, transfers=i % 3, description="Маршрут з пересадкою",
+        source=SOURCES[i % 6], start=(30.52, 50.45), end=(24.03, 49.84), score=0.5,
+    )
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.routes
+    scale = 1_000_000 / n
+
+    cases = [
+        ("list of dicts", lambda: [as_dict(i) for i in range(n)]),
+        ("list of Route", lambda: [as_record(i) for i in range(n)]),
+        ("RouteBatch", lambda: RouteBatch.from_routes(as_record(i) for i in range(n))),
+    ]
+
+    print(f"{'container':<16}{'MB per 1M routes':>18}{'bytes/route':>14}")
+    for name, build in cases:
+        size = measure(build)
+        print(f"{name:<16}{size * scale / 2 ** 20:>18.1f}{size / n:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
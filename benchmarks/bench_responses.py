@@ -0,0 +1,68 @@
+"""
+Bytes on the wire, time and client-side parse time per ORS call for the legacy full
+GeoJSON directions response vs the slimmed request (no instructions,
+encoded polyline geometry), measured against the local ORS stub.
+
+    python benchmarks/bench_responses.py [--calls 20]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import api  # noqa: E402
+import tracing  # noqa: E402
+from ors_stub import OrsStub  # noqa: E402
+
+PAIRS = [((30.52, 50.45), (24.03, 49.84)), ((30.52, 50.45), (2.35, 48.86)),
+         ((24.03, 49.84), (21.01, 52.23)), ((13.40, 52.52), (2.35, 48.86))]
+
+CASES = [
+    ("geojson + instructions", "geojson", {"instructions": True}),
+    ("geojson, slim", "geojson", {}),
+    ("encoded polyline, slim", "encodedpolyline", {}),
+]
+
+
+def run_case(geometry_format, overrides, calls):
+    api.ROUTE_GEOMETRY_FORMAT = geometry_format
+    saved_options = dict(api.DIRECTIONS_OPTIONS)
+    api.DIRECTIONS_OPTIONS.update(overrides)
+    try:
+        bytes_before = tracing.counters.get("bytes_received", 0)
+        parse_before = tracing.span_totals.get("parse_directions", [0, 0.0])[1]
+        t0 = time.perf_counter()
+        for i in range(calls):
+            start, end = PAIRS[i % len(PAIRS)]
+            api._get_route_remote(start, end, "driving-car")
+        elapsed = time.perf_counter() - t0
+        received = tracing.counters.get("bytes_received", 0) - bytes_before
+        parse = tracing.span_totals["parse_directions"][1] - parse_before
+    finally:
+        api.DIRECTIONS_OPTIONS.clear()
+        api.DIRECTIONS_OPTIONS.update(saved_options)
+    return received / calls, elapsed / calls, parse / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    with OrsStub() as stub:
+        os.environ["ORS_BASE_URL"] = stub.url
+        os.environ["ORS_API_KEY"] = "stub"
+
+        # ms/call включає роботу заглушки; parse ms — лише розбір на клієнті
+        print(f"{'case':<26}{'KB/call':>10}{'ms/call':>10}{'parse ms':>10}")
+        for name, geometry_format, overrides in CASES:
+            size, seconds, parse = run_case(geometry_format, overrides, args.calls)
+            print(f"{name:<26}{size / 1024:>10.1f}{seconds * 1000:>10.2f}{parse * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Cold-start import budget for the GUI, measured with `python -X importtime`.
+
+    python benchmarks/bench_startup.py [--budget-ms 150]
+
+Exits with status 1 if importing `app` takes longer than the budget or
+pulls in modules that must stay lazy (folium and its dependency tree).
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_BUDGET_MS = 150
+# Модулі, які мають завантажуватися лише при відкритті карти / першому запиті
+LAZY_MODULES = ("folium", "branca", "jinja2", "dotenv", "numpy", "requests")
+
+
+def import_profile(module="app"):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    # import time: <self us> | <cumulative us> | <2 пробіли на рівень вкладеності><module>
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_part, cumulative_part, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_part), int(cumulative_part)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    best_total = None
+    best_rows = None
+    for _ in range(args.repeat):
+        rows = import_profile()
+        total = next(cum for name, _, _, cum in reversed(rows) if name == "app")
+        if best_total is None or total < best_total:
+            best_total, best_rows = total, rows
+
+    print(f"import app: {best_total / 1000:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports:")
+    top_level = sorted((r for r in best_rows if r[1] <= 1), key=lambda r: r[3], reverse=True)
+    for name, _, _, cum in top_level[:args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+
+    loaded = {name.split(".")[0] for name, *_ in best_rows}
+    eager = sorted(loaded.intersection(LAZY_MODULES))
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if best_total / 1000 > args.budget_ms:
+        print("FAIL: startup import budget exceeded")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Local stand-in for the OpenRouteService endpoints used by MandruyUA.
+
+Serves synthetic (or recorded) responses for
+    GET  /geocode/search
+    POST /v2/directions/<profile>/geojson
+    POST /v2/directions/<profile>/json   (encoded polyline geometry)
+    POST /v2/matrix/<profile>
+    GET  /v2/health
+with configurable latency, jitter and error rate. Directions requests
+with a "departure" get car durations scaled by synthetic rush hours.
+
+    python benchmarks/ors_stub.py --port 8089 --latency-ms 80 --jitter-ms 20
+
+Point the app at it with ORS_BASE_URL=http://127.0.0.1:8089 ORS_API_KEY=stub.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from geometry import encode_polyline  # noqa: E402
+
+# Середня швидкість (км/год) і коефіцієнт звивистості дороги для профілів
+PROFILE_SPEED_KMH = {
+    "driving-car": 75.0,
+    "cycling-regular": 16.0,
+    "foot-walking": 5.0,
+}
+DETOUR = 1.25
+POINTS_PER_KM = 4
+# Профілі, для яких "departure" у запиті маршруту змінює час (трафік)
+TRAFFIC_PROFILES = {"driving-car", "driving-hgv"}
+
+
+def _haversine_km(lon1, lat1, lon2, lat2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+def synthetic_place(text):
+    # Детерміновані координати в межах Європи для будь-якої назви
+    digest = hashlib.sha1(text.strip().lower().encode("utf-8")).digest()
+    lon = -9.0 + 49.0 * int.from_bytes(digest[0:2], "big") / 65535
+    lat = 36.0 + 24.0 * int.from_bytes(digest[2:4], "big") / 65535
+    return round(lon, 6), round(lat, 6)
+
+
+def geocode_response(text):
+    lon, lat = synthetic_place(text)
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {"label": text.strip().title(), "layer": "locality"},
+        }],
+    }
+
+
+def traffic_factor(departure):
+    """
+    Synthetic rush hours: duration multiplier for an ISO departure time,
+    up to +40% around 8:00 and 17:30, -10% at night.
+    """
+    hour = int(departure[11:13]) + int(departure[14:16]) / 60
+    return (0.9
+            + 0.5 * math.exp(-((hour - 8.0) ** 2) / 2)
+            + 0.5 * math.exp(-((hour - 17.5) ** 2) / 2)
+            + 0.1 * (6 <= hour < 22))
+
+
+def _line(start, end, dist_km, seed):
+    rnd = random.Random(seed)
+    n = max(2, min(int(dist_km * POINTS_PER_KM), 20000))
+    coords = []
+    for i in range(n):
+        t = i / (n - 1)
+        wobble = 0.0 if i in (0, n - 1) else rnd.uniform(-0.002, 0.002)
+        coords.append([
+            round(start[0] + (end[0] - start[0]) * t + wobble, 6),
+            round(start[1] + (end[1] - start[1]) * t - wobble, 6),
+        ])
+    return coords
+
+
+def _route_parts(profile, coordinates, instructions=True, departure=None, with_line=True):
+    start, end = coordinates[0], coordinates[-1]
+    dist_km = _haversine_km(start[0], start[1], end[0], end[1]) * DETOUR
+    speed = PROFILE_SPEED_KMH.get(profile, 50.0)
+    distance_m = round(dist_km * 1000, 1)
+    duration_s = dist_km / speed * 3600
+    if departure and profile in TRAFFIC_PROFILES:
+        duration_s *= traffic_factor(departure)
+    duration_s = round(duration_s, 1)
+
+    properties = {
+        "summary": {"distance": distance_m, "duration": duration_s},
+        "way_points": [0, 1],
+    }
+    if instructions:
+        # Інструкції, як у справжній відповіді ORS, щоб розмір був реалістичним
+        steps = [{
+            "distance": round(distance_m / 20, 1),
+            "duration": round(duration_s / 20, 1),
+            "type": 1,
+            "instruction": f"Continue for step {i}",
+            "name": "-",
+            "way_points": [i, i + 1],
+        } for i in range(20)]
+        properties["segments"] = [{"distance": distance_m, "duration": duration_s,
+                                   "steps": steps}]
+
+    bbox = [min(start[0], end[0]), min(start[1], end[1]),
+            max(start[0], end[0]), max(start[1], end[1])]
+    line = _line(start, end, dist_km, f"{profile}{start}{end}") if with_line else None
+    return properties, bbox, line
+
+
+def directions_response(profile, coordinates, instructions=True, departure=None):
+    properties, bbox, line = _route_parts(profile, coordinates, instructions, departure)
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "bbox": bbox,
+            "properties": properties,
+            "geometry": {"type": "LineString", "coordinates": line},
+        }],
+        "metadata": {"query": {"coordinates": coordinates, "profile": profile}},
+    }
+
+
+def directions_json_response(profile, coordinates, instructions=True, departure=None,
+                             geometry=True):
+    properties, bbox, line = _route_parts(profile, coordinates, instructions, departure,
+                                          with_line=geometry)
+    route = {**properties, "bbox": bbox}
+    if geometry:
+        route["geometry"] = encode_polyline(line)
+    return {
+        "routes": [route],
+        "metadata": {"query": {"coordinates": coordinates, "profile": profile}},
+    }
+
+
+def matrix_response(profile, locations, sources=None, destinations=None):
+    sources = sources if sources is not None else list(range(len(locations)))
+    destinations = destinations if destinations is not None else list(range(len(locations)))
+    speed = PROFILE_SPEED_KMH.get(profile, 50.0)
+
+    durations, distances = [], []
+    for s in sources:
+        drow, mrow = [], []
+        for d in destinations:
+            a, b = locations[s], locations[d]
+            km = _haversine_km(a[0], a[1], b[0], b[1]) * DETOUR
+            drow.append(round(km / speed * 3600, 1))
+            mrow.append(round(km * 1000, 1))
+        durations.append(drow)
+        distances.append(mrow)
+    return {"durations": durations, "distances": distances}
+
+
+class OrsStub:
+    """
+    Threaded stub server. Use as a context manager:
+
+        with OrsStub(latency_ms=50) as stub:
+            os.environ["ORS_BASE_URL"] = stub.url
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, recordings=None, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.recordings = recordings or {}
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub._handle(self, "GET")
+
+            def do_POST(self):
+                stub._handle(self, "POST")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def recording_key(method, path, params):
+        return f"{method} {path} {json.dumps(params, sort_keys=True)}"
+
+    def _delay_and_fail(self):
+        with self._lock:
+            delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self.random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return fail
+
+    def _respond(self, handler, status, payload):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += len(body)
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle(self, handler, method):
+        parsed = urlparse(handler.path)
+        path = parsed.path.rstrip("/")
+
+        if method == "GET":
+            params = {k: v[0] for k, v in parse_qs(parsed.query).items() if k != "api_key"}
+        else:
+            length = int(handler.headers.get("Content-Length") or 0)
+            params = json.loads(handler.rfile.read(length) or b"{}")
+
+        if self._delay_and_fail():
+            self._respond(handler, 503, {"error": {"code": 503, "message": "stub: injected error"}})
+            return
+
+        recorded = self.recordings.get(self.recording_key(method, path, params))
+        if recorded is not None:
+            self._respond(handler, 200, recorded)
+            return
+
+        parts = path.strip("/").split("/")
+        if method == "GET" and path == "/v2/health":
+            self._respond(handler, 200, {"status": "ready"})
+        elif method == "GET" and path == "/geocode/search":
+            self._respond(handler, 200, geocode_response(params.get("text", "")))
+        elif method == "POST" and parts[:2] == ["v2", "directions"] and len(parts) >= 3:
+            instructions = params.get("instructions", True)
+            departure = params.get("departure")
+            if len(parts) == 4 and parts[3] == "json":
+                payload = directions_json_response(parts[2], params["coordinates"], instructions,
+                                                   departure, params.get("geometry", True))
+            else:
+                payload = directions_response(parts[2], params["coordinates"], instructions,
+                                              departure)
+            self._respond(handler, 200, payload)
+        elif method == "POST" and parts[:2] == ["v2", "matrix"] and len(parts) == 3:
+            self._respond(handler, 200, matrix_response(
+                parts[2], params["locations"], params.get("sources"), params.get("destinations")
+            ))
+        else:
+            self._respond(handler, 404, {"error": {"code": 404, "message": f"stub: {path}"}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--recordings", help="JSON file: recording key -> response")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    recordings = None
+    if args.recordings:
+        with open(args.recordings, encoding="utf-8") as f:
+            recordings = json.load(f)
+
+    stub = OrsStub(args.host, args.port, args.latency_ms, args.jitter_ms,
+                   args.error_rate, recordings, args.seed)
+    print(f"ORS stub listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Benchmark suite for the planning pipeline, run against the local ORS stub.
+
+    python benchmarks/run_benchmarks.py                  # run and compare with baseline
+    python benchmarks/run_benchmarks.py --save-baseline  # record a new baseline
+    python benchmarks/run_benchmarks.py -k map           # only benchmarks matching "map"
+
+Each benchmark reports the best and median time per call. A benchmark
+regresses when its best time is more than --threshold times the baseline
+best time (the minimum is far less noisy than the median). Both times
+are scaled by a fixed pure-Python calibration loop timed right before the
+benchmark, so a host that is slower as a whole (CPU steal, frequency
+scaling) does not look like a regression. A benchmark over the threshold is measured once more and counts only if it is still
+over, so a burst of load on the host does not fail the run; the script
+then exits with status 1. Benchmarks skipped in this environment (e.g.
+route_list_layout without a display) are not in the committed baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ors_stub import OrsStub  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 1.3
+# Повторний замір бенчмарку, що перевищив поріг: регресія має повторитися
+CONFIRM_RUNS = 1
+
+BENCHMARKS = {}
+
+
+def benchmark(number=1, repeat=9, threshold=None):
+    # threshold перекриває --threshold для шумних (дискових, мережевих, коротких) замірів
+    def decorator(fn):
+        BENCHMARKS[fn.__name__.removeprefix("bench_")] = (fn, number, repeat, threshold)
+        return fn
+    return decorator
+
+
+def _synthetic_routes(n):
+    modes = ["Авто", "Велосипед", "Пішки", "Потяг", "Автобус", "Літак"]
+    return [{
+        "mode": modes[i % len(modes)],
+        "time_min": 30 + (i * 37) % 900,
+        "price": round((i * 13) % 300 * 0.7, 2),
+        "distance_km": 10.0 + i % 1000,
+        "transfers": i % 3,
+        "description": "bench",
+        "geometry": None,
+        "source": "bench",
+    } for i in range(n)]
+
+
+# ===== BENCHMARKS =====
+@benchmark(number=3, threshold=1.5)
+def bench_build_all_routes(ctx):
+    import api
+    from route_engine import build_all_routes
+
+    def run():
+        api.clear_caches()
+        build_all_routes("Kyiv", "Lviv", with_itineraries=False)
+    return run
+
+
+@benchmark(number=3, threshold=1.5)
+def bench_build_all_routes_summary(ctx):
+    import api
+    from route_engine import build_all_routes
+
+    def run():
+        api.clear_caches()
+        build_all_routes("Kyiv", "Lviv", with_geometry=False, with_itineraries=False)
+    return run
+
+
+@benchmark(number=10, threshold=3.0)
+def bench_build_all_routes_precomputed(ctx):
+    import api
+    import precompute
+    from route_engine import build_all_routes
+
+    precompute.precompute_pair("Kyiv", "Odesa")
+
+    def run():
+        api.clear_caches()
+        build_all_routes("Kyiv", "Odesa", with_geometry=False)
+    return run
+
+
+@benchmark(number=10)
+def bench_find_itineraries(ctx):
+    from itinerary import find_itineraries
+    from route_engine import bus_route, plane_route, train_route
+
+    # Реальні координати: Київ → Париж, усі вузли hubs.json у грі
+    start, end = (30.5234, 50.4501), (2.3522, 48.8566)
+    direct = [plane_route(start, end), train_route(start, end), bus_route(start, end)]
+    return lambda: find_itineraries("Kyiv", "Paris", start, end, direct=direct)
+
+
+@benchmark(number=3, threshold=1.5)
+def bench_reachability_10k(ctx):
+    import random
+
+    import api
+    from reachability import Place, reachable
+
+    rng = random.Random(1)
+    places = [Place(f"P{i}", rng.uniform(-10, 40), rng.uniform(36, 60)) for i in range(10_000)]
+
+    def run():
+        # Холодний кеш: одна матриця ORS на кожен дорожній профіль
+        api.clear_caches()
+        reachable("Kyiv", max_time_min=5 * 60, max_price=50, places=places)
+    return run
+
+
+@benchmark(number=20, threshold=1.5)
+def bench_rank_routes_10k(ctx):
+    from route_engine import rank_routes
+    routes = _synthetic_routes(10_000)
+    return lambda: rank_routes(routes)
+
+
+@benchmark(number=3, threshold=3.0)
+def bench_save_routes_1k(ctx):
+    import database
+    database.DB_NAME = str(Path(ctx["tmp"]) / "bench.db")
+    database.init_db()
+    routes = _synthetic_routes(1000)
+    for r in routes:
+        r["score"] = 0.5
+    return lambda: database.save_routes("Kyiv", "Lviv", routes)
+
+
+@benchmark(number=3)
+def bench_route_map_folium(ctx):
+    from map_utils import build_route_map_html
+    route = ctx["route"]
+    return lambda: build_route_map_html(route["start"], route["end"], route["geometry"])
+
+
+@benchmark(number=10, threshold=1.5)
+def bench_route_map_template(ctx):
+    from map_utils import render_route_map_template
+    route = ctx["route"]
+    return lambda: render_route_map_template(route["start"], route["end"], route["geometry"])
+
+
+@benchmark(number=3)
+def bench_comparison_map(ctx):
+    from map_utils import build_comparison_map_html
+    routes = ctx["routes"]
+    return lambda: build_comparison_map_html(routes)
+
+
+@benchmark(number=20)
+def bench_route_list_layout(ctx):
+    # Також перевірка, що список маршрутів узагалі розкладається (потрібен дисплей)
+    import tkinter
+
+    import customtkinter as ctk
+    from app import MandruyApp
+    from route_list import VirtualRouteList
+
+    try:
+        root = ctk.CTk()
+    except tkinter.TclError:
+        return None
+    root.withdraw()
+    routes = _synthetic_routes(1000)
+    view = VirtualRouteList(root, MandruyApp.format_route_row, lambda r: None, height=390)
+    view.pack(fill="both", expand=True)
+    root.update_idletasks()
+
+    def run():
+        view.set_items(routes)
+        for offset in range(0, 5000, 250):
+            view._scroll_to(offset)
+        root.update_idletasks()
+    return run
+
+
+# ===== RUNNER =====
+def _calibration_loop():
+    # Незмінне навантаження: словники, списки, рядки — як у решті коду
+    rows = [{"mode": i % 7, "time_min": i * 37 % 900, "key": str(i)} for i in range(2000)]
+    rows.sort(key=lambda r: (r["time_min"], r["key"]))
+    return sum(r["mode"] for r in rows)
+
+
+def calibrate(repeat=5):
+    """Best time of the calibration loop, s: the speed of the host right now."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _calibration_loop()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def ratio(result, base):
+    """Best time against the baseline, corrected for the host speed when both were calibrated."""
+    value = result["min"] / base["min"]
+    if result.get("calibration") and base.get("calibration"):
+        value /= result["calibration"] / base["calibration"]
+    return value
+
+
+def run_one(fn, number, repeat, ctx):
+    call = fn(ctx)
+    if call is None:
+        return None  # середовище не підтримує (напр., немає дисплея)
+    call()  # прогрів: імпорти, кеші шаблонів
+    calibration = calibrate()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            call()
+        times.append((time.perf_counter() - t0) / number)
+    return {"min": min(times), "median": statistics.median(times), "calibration": calibration}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", default="", help="run benchmarks containing this")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stub latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="stub jitter")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, help="also write results as JSON")
+    args = parser.parse_args()
+
+    with OrsStub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms) as stub, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ["ORS_BASE_URL"] = stub.url
+        os.environ["ORS_API_KEY"] = "stub"
+        os.chdir(tmp)
+
+        from route_engine import build_all_routes, rank_routes
+        routes = rank_routes(build_all_routes("Kyiv", "Paris"))
+        ctx = {
+            "tmp": tmp,
+            "stub": stub,
+            "routes": routes,
+            "route": next(r for r in routes if r.get("geometry")),
+        }
+
+        baseline = {}
+        if args.baseline.exists() and not args.save_baseline:
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+        results = {}
+        regressions = []
+        for name, (fn, number, repeat, threshold) in BENCHMARKS.items():
+            if args.pattern not in name:
+                continue
+            result = run_one(fn, number, repeat, ctx)
+            if result is None:
+                print(f"{name}: пропущено (немає дисплея)")
+                continue
+            base = baseline.get(name)
+            limit = threshold or args.threshold
+            for _ in range(CONFIRM_RUNS if base else 0):
+                if ratio(result, base) <= limit:
+                    break
+                again = run_one(fn, number, repeat, ctx)
+                result = min(result, again, key=lambda r: ratio(r, base))
+            if base and ratio(result, base) > limit:
+                regressions.append(name)
+            results[name] = result
+
+    print(f"{'benchmark':<34}{'min, ms':>10}{'median, ms':>12}{'base min, ms':>14}{'ratio':>8}")
+    for name, res in results.items():
+        base = baseline.get(name)
+        line = f"{name:<34}{res['min'] * 1000:>10.2f}{res['median'] * 1000:>12.2f}"
+        if base:
+            line += f"{base['min'] * 1000:>14.2f}{ratio(res, base):>8.2f}"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.save_baseline:
+        merged = {}
+        if args.baseline.exists():
+            merged = json.loads(args.baseline.read_text(encoding="utf-8"))
+        merged.update(results)
+        args.baseline.write_text(json.dumps(merged, indent=2, sort_keys=True) + "\n",
+                                 encoding="utf-8")
+        print(f"baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"FAIL: {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import profiling
+import tracing
+from records import Mode
+
+
+def cmd_plan(args):
+    from database import save_routes
+    from route_engine import build_all_routes, rank_routes
+
+    trace = tracing.begin(f"{args.origin} → {args.destination}")
+    with profiling.profile_search(f"{args.origin}-{args.destination}"):
+        routes = build_all_routes(args.origin, args.destination, with_geometry=False,
+                                  departure=args.depart)
+        ranked = rank_routes(routes)
+    if args.save:
+        save_routes(args.origin, args.destination, ranked)
+    tracing.end(trace)
+
+    if args.json:
+        fields = ("mode", "time_min", "wait_min", "price", "distance_km", "transfers", "score",
+                  "source")
+        print(json.dumps([{k: r.get(k) for k in fields} for r in ranked], ensure_ascii=False, indent=2))
+    else:
+        for i, r in enumerate(ranked, 1):
+            wait = f"  (+{r['wait_min']} хв очікування)" if r.get("wait_min") else ""
+            print(f"{i}. {r['mode']:<10} {r['time_min']:>6} хв  {r['price']:>8} €  "
+                  f"{r['transfers']} пересад.{wait}")
+    for p in routes.pruned:
+        print(f"pruned: {p['mode']} ({p['action']}: {p['reason']})", file=sys.stderr)
+    if args.trace:
+        print(tracing.format_waterfall(trace), file=sys.stderr)
+        import memcache
+        print(memcache.format_stats(), file=sys.stderr)
+        if args.depart:
+            import api
+            for bucket_s, (lookups, rate) in api.departure_hit_rates().items():
+                print(f"departure bucket {bucket_s // 60} хв: {rate:.0%} з {lookups}", file=sys.stderr)
+
+
+def parse_departure(text):
+    """ISO date and time, or HH:MM for today (local time)."""
+    try:
+        if len(text) <= 5:
+            hour, minute = map(int, text.split(":"))
+            return datetime.now().replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"очікується ГГ:ХХ або РРРР-ММ-ДДTГГ:ХХ: {text}") from None
+
+
+def cmd_learn_pruning(args):
+    import pruning
+
+    learned = pruning.learn_from_history(min_samples=args.min_samples)
+    if not learned:
+        print("Недостатньо збережених маршрутів для навчання порогів.")
+        return
+    rules = {str(mode): {"max_km": max_km, "action": args.action} for mode, max_km in learned.items()}
+    text = json.dumps(rules, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+def cmd_precompute(args):
+    import precompute
+
+    if args.list:
+        for origin, destination in precompute.due_pairs(args.limit):
+            print(f"{origin} → {destination}")
+        return
+    done, left = precompute.refresh(limit=args.limit, quota=args.quota)
+    print(f"Оновлено пар: {done}; залишилось: {left}")
+
+
+def cmd_batch(args):
+    import batch
+
+    pairs = batch.read_pairs(args.pairs)
+    if args.snapshot:
+        import snapshot
+        snapshot.import_snapshot(args.snapshot)
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end="", file=sys.stderr, flush=True)
+
+    result = batch.plan_batch(
+        pairs,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        save=not args.no_save,
+        with_itineraries=not args.no_itineraries,
+        progress=progress,
+    )
+    print(file=sys.stderr)
+    for origin, destination, err in result.failed:
+        print(f"failed: {origin} → {destination}: {err}", file=sys.stderr)
+    print(f"Пар: {result.planned} за {result.elapsed_s:.1f} с "
+          f"({result.pairs_per_s:.1f}/с, процесів: {result.workers}); помилок: {len(result.failed)}")
+
+
+def cmd_snapshot(args):
+    import snapshot
+
+    if args.action == "export":
+        if args.warm:
+            import database
+            from route_engine import build_all_routes
+
+            # Кеші живуть у пам'яті процесу: прогріваємо їх популярними парами
+            for origin, destination, _ in database.get_popular_pairs(args.warm):
+                try:
+                    build_all_routes(origin, destination, with_geometry=args.geometry,
+                                     use_precomputed=False)
+                except Exception as e:
+                    print(f"skipped: {origin} → {destination}: {e}", file=sys.stderr)
+        counts = snapshot.export_snapshot(args.path, include_precomputed=not args.no_precomputed)
+    else:
+        counts = snapshot.import_snapshot(args.path, include_precomputed=not args.no_precomputed)
+    print(", ".join(f"{name}: {n}" for name, n in counts.items()))
+
+
+def cmd_reach(args):
+    import reachability
+
+    places = reachability.load_places(args.places) if args.places else None
+    modes = [Mode(m) for m in args.modes] if args.modes else None
+    result = reachability.reachable(
+        args.origin,
+        max_time_min=args.hours * 60 if args.hours is not None else None,
+        max_price=args.budget,
+        places=places,
+        modes=modes,
+        limit=args.limit,
+        use_ors=not args.no_ors,
+    )
+    for profile, error in result.ors_errors.items():
+        print(f"ORS {profile} недоступний, оцінка по прямій ({error})", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps([
+            {"place": r.place.name, "mode": r.mode, "time_min": r.time_min, "price": r.price,
+             "distance_km": r.distance_km, "estimated": r.estimated}
+            for r in result
+        ], ensure_ascii=False, indent=2))
+        return
+    for i, r in enumerate(result, 1):
+        mark = " ≈" if r.estimated else ""
+        print(f"{i}. {r.place.name:<20} {r.mode:<10} {r.time_min:>6} хв{mark}  {r.price:>8} €")
+    if not result:
+        print("Жодне місто не вкладається в бюджет.")
+
+
+def cmd_history(args):
+    import database
+
+    if args.action == "export":
+        import analytics
+
+        if not args.path:
+            raise SystemExit("history export: вкажіть файл (.parquet, .arrow або .csv.gz)")
+        result = analytics.export_history(args.path, since_id=args.since_id)
+        if result["fallback"]:
+            print(f"pyarrow не встановлено: історія експортується в {result['path']}",
+                  file=sys.stderr)
+        print(f"{result['rows']} рядків → {result['path']} ({result['format']}); "
+              f"наступного разу: --since-id {result['last_id']}")
+        return
+
+    if args.rebuild:
+        database.rebuild_aggregates()
+    print("Популярні пари:")
+    for origin, destination, searches in database.get_popular_pairs(args.pairs):
+        print(f"  {origin} → {destination}: {searches}")
+    print("Режими:")
+    for mode, routes, avg_time, avg_price, win_rate in database.get_mode_stats():
+        wins = f"{win_rate:.0%}" if win_rate is not None else "—"
+        print(f"  {mode:<13} маршрутів {routes:>7}  ⌀ {avg_time:>6.0f} хв  "
+              f"⌀ {avg_price:>7.2f} €  перемог {wins}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="MandruyUA без графічного інтерфейсу")
+    parser.add_argument("--profile", action="store_true",
+                        help="профілювати кожен пошук (profiles/*.prof, *.collapsed)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan = sub.add_parser("plan", help="побудувати та відсортувати маршрути")
+    plan.add_argument("origin")
+    plan.add_argument("destination")
+    plan.add_argument("--json", action="store_true", help="вивести результат як JSON")
+    plan.add_argument("--save", action="store_true", help="зберегти маршрути в mandruy.db")
+    plan.add_argument("--trace", action="store_true", help="показати розклад часу в stderr")
+    plan.add_argument("--depart", type=parse_departure,
+                      help="час відправлення: ГГ:ХХ сьогодні або РРРР-ММ-ДДTГГ:ХХ")
+    plan.set_defaults(func=cmd_plan)
+
+    learn = sub.add_parser("learn-pruning",
+                           help="вивести пороги відстані для режимів з історії маршрутів")
+    learn.add_argument("--min-samples", type=int, default=20)
+    learn.add_argument("--action", choices=("drop", "approximate"), default="drop")
+    learn.add_argument("--output", help="записати JSON для MANDRUY_PRUNING_FILE")
+    learn.set_defaults(func=cmd_learn_pruning)
+
+    pre = sub.add_parser("precompute",
+                         help="перерахувати маршрути популярних пар міст у mandruy.db")
+    pre.add_argument("--limit", type=int, default=300, help="скільки найпопулярніших пар тримати")
+    pre.add_argument("--quota", type=int, default=200, help="максимум ORS-запитів за запуск")
+    pre.add_argument("--list", action="store_true", help="лише показати пари, що потребують оновлення")
+    pre.set_defaults(func=cmd_precompute)
+
+    bat = sub.add_parser("batch", help="спланувати багато пар міст на кількох процесах")
+    bat.add_argument("pairs", help="CSV: звідки,куди в кожному рядку")
+    bat.add_argument("--workers", type=int, help="кількість процесів (типово — кількість ядер)")
+    bat.add_argument("--chunk-size", type=int, default=16, help="пар на одне завдання процесу")
+    bat.add_argument("--no-save", action="store_true", help="не записувати маршрути в mandruy.db")
+    bat.add_argument("--no-itineraries", action="store_true", help="без комбінованих маршрутів")
+    bat.add_argument("--snapshot", help="спершу завантажити знімок кешу (cli.py snapshot export)")
+    bat.set_defaults(func=cmd_batch)
+
+    snap = sub.add_parser("snapshot", help="експорт/імпорт знімка кешів для швидкого старту")
+    snap.add_argument("action", choices=("export", "import"))
+    snap.add_argument("path")
+    snap.add_argument("--warm", type=int, default=0,
+                      help="перед експортом побудувати N найпопулярніших пар з історії")
+    snap.add_argument("--geometry", action="store_true", help="прогрівати і геометрію маршрутів")
+    snap.add_argument("--no-precomputed", action="store_true",
+                      help="без таблиці готових маршрутів популярних пар")
+    snap.set_defaults(func=cmd_snapshot)
+
+    reach = sub.add_parser("reach", help="куди можна дістатися за заданий час і гроші")
+    reach.add_argument("origin")
+    reach.add_argument("--hours", type=float, help="максимум годин у дорозі")
+    reach.add_argument("--budget", type=float, help="максимум ціни, €")
+    reach.add_argument("--places", help="CSV назва,lon,lat (типово — places.csv)")
+    reach.add_argument("--modes", nargs="+", choices=[m.value for m in Mode if m != Mode.MULTI],
+                       help="лише ці види транспорту")
+    reach.add_argument("--limit", type=int, default=30)
+    reach.add_argument("--no-ors", action="store_true",
+                       help="дорожні режими — оцінкою по прямій, без запитів до ORS")
+    reach.add_argument("--json", action="store_true")
+    reach.set_defaults(func=cmd_reach)
+
+    hist = sub.add_parser("history", help="аналітика історії маршрутів")
+    hist.add_argument("action", choices=("export", "stats"))
+    hist.add_argument("path", nargs="?", help="export: файл .parquet, .arrow або .csv.gz")
+    hist.add_argument("--since-id", type=int, default=0,
+                      help="export: лише рядки з id більшим за цей")
+    hist.add_argument("--pairs", type=int, default=10, help="stats: скільки пар показати")
+    hist.add_argument("--rebuild", action="store_true", help="stats: перерахувати агрегати")
+    hist.set_defaults(func=cmd_history)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        profiling.enable()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 import sqlite3
+import threading
+
+from records import Mode, Source
+from tracing import traced
 
 DB_NAME = "mandruy.db"
 
+_init_lock = threading.Lock()
+_initialized = False
+
 def get_connection():
     return sqlite3.connect(DB_NAME)
 
@@ -18,30 +25,468 @@ def init_db():
         time_min INTEGER,
         price REAL,
         transfers INTEGER,
-        score REAL
+        score REAL,
+        distance_km REAL,
+        source TEXT,
+        start_lon REAL,
+        start_lat REAL,
+        end_lon REAL,
+        end_lat REAL
+    )
+    """)
+    _add_missing_columns(cur, "routes", {
+        "distance_km": "REAL",
+        "source": "TEXT",
+        "start_lon": "REAL",
+        "start_lat": "REAL",
+        "end_lon": "REAL",
+        "end_lat": "REAL",
+    })
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS estimate_errors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        mode TEXT,
+        straight_km REAL,
+        est_time_min REAL,
+        actual_time_min REAL,
+        est_distance_km REAL,
+        actual_distance_km REAL,
+        in_interval INTEGER,
+        start_lon REAL,
+        start_lat REAL,
+        end_lon REAL,
+        end_lat REAL
+    )
+    """)
+
+    # Готові відсортовані маршрути популярних пар (precompute.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS precomputed_routes (
+        origin_key TEXT NOT NULL,
+        destination_key TEXT NOT NULL,
+        origin TEXT,
+        destination TEXT,
+        payload TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (origin_key, destination_key)
     )
     """)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_precomputed_updated
+    ON precomputed_routes (updated_at)
+    """)
+
+    # Агрегати для аналітики, що оновлюються разом із кожним записом маршрутів
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS pair_stats (
+        origin_key TEXT NOT NULL,
+        destination_key TEXT NOT NULL,
+        origin TEXT,
+        destination TEXT,
+        searches INTEGER NOT NULL DEFAULT 0,
+        routes INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (origin_key, destination_key)
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS mode_stats (
+        mode TEXT PRIMARY KEY,
+        routes INTEGER NOT NULL DEFAULT 0,
+        total_time_min REAL NOT NULL DEFAULT 0,
+        total_price REAL NOT NULL DEFAULT 0,
+        ranked_searches INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    if cur.execute("SELECT NOT EXISTS (SELECT 1 FROM mode_stats)").fetchone()[0]:
+        _backfill_aggregates(cur)
 
     conn.commit()
     conn.close()
 
+def _backfill_aggregates(cur):
+    # База зі старішої версії: агрегати рахуються з історії один раз.
+    # Межі пошуків у старих рядках невідомі, тож пошуки пари — як у
+    # get_popular_pairs, а перемоги режимів рахуються лише для нових записів
+    cur.execute("""
+    INSERT INTO pair_stats (origin_key, destination_key, origin, destination, searches, routes)
+    SELECT LOWER(TRIM(origin)), LOWER(TRIM(destination)), MIN(origin), MIN(destination),
+           CAST(ROUND(SUM(mode != ?) * 1.0 / MAX(COUNT(DISTINCT NULLIF(mode, ?)), 1)) AS INTEGER),
+           COUNT(*)
+    FROM routes
+    WHERE origin IS NOT NULL AND destination IS NOT NULL
+    GROUP BY LOWER(TRIM(origin)), LOWER(TRIM(destination))
+    """, (Mode.MULTI, Mode.MULTI))
+    cur.execute("""
+    INSERT INTO mode_stats (mode, routes, total_time_min, total_price)
+    SELECT mode, COUNT(*), TOTAL(time_min), TOTAL(price)
+    FROM routes
+    WHERE mode IS NOT NULL
+    GROUP BY mode
+    """)
+
+def place_key(place):
+    # Той самий ключ, що й у кеші геокодування api.py
+    return place.strip().lower()
+
+def _add_missing_columns(cur, table, columns):
+    # Міграція баз, створених старішою версією схеми
+    existing = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+    for name, col_type in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+def ensure_db():
+    # Схема створюється під час першого запису, а не перед показом вікна
+    global _initialized
+    with _init_lock:
+        if not _initialized:
+            init_db()
+            _initialized = True
+
+_INSERT_ROUTE = """
+INSERT INTO routes (
+    origin, destination, mode, time_min, price, transfers, score,
+    distance_km, source, start_lon, start_lat, end_lon, end_lat
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _route_row(origin, destination, r):
+    start = r.get("start") or (None, None)
+    end = r.get("end") or (None, None)
+    return (
+        origin,
+        destination,
+        r["mode"],
+        r["time_min"],
+        r["price"],
+        r["transfers"],
+        r["score"],
+        r.get("distance_km"),
+        r.get("source"),
+        start[0],
+        start[1],
+        end[0],
+        end[1]
+    )
+
+def _update_aggregates(conn, searches):
+    """Add searches [(origin, destination, routes)] to pair_stats and mode_stats."""
+    pairs = {}
+    modes = {}
+    for origin, destination, routes in searches:
+        if not routes:
+            continue
+        key = (place_key(origin), place_key(destination))
+        searches_n, routes_n, _, _ = pairs.get(key, (0, 0, origin, destination))
+        pairs[key] = (searches_n + 1, routes_n + len(routes), origin, destination)
+
+        # Переможець — найкращий (найменший) бал; без балів пошук не ранжовано
+        scored = [r for r in routes if r.get("score") is not None]
+        winner = min(scored, key=lambda r: r["score"])["mode"] if scored else None
+        for mode in {str(r["mode"]) for r in scored}:
+            stats = modes.setdefault(mode, [0, 0.0, 0.0, 0, 0])
+            stats[3] += 1
+            stats[4] += mode == str(winner)
+        for r in routes:
+            stats = modes.setdefault(str(r["mode"]), [0, 0.0, 0.0, 0, 0])
+            stats[0] += 1
+            stats[1] += r["time_min"] or 0
+            stats[2] += r["price"] or 0
+
+    conn.executemany("""
+    INSERT INTO pair_stats (origin_key, destination_key, origin, destination, searches, routes)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (origin_key, destination_key) DO UPDATE SET
+        searches = searches + excluded.searches,
+        routes = routes + excluded.routes
+    """, [(o_key, d_key, o, d, n, r) for (o_key, d_key), (n, r, o, d) in pairs.items()])
+    conn.executemany("""
+    INSERT INTO mode_stats (mode, routes, total_time_min, total_price, ranked_searches, wins)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (mode) DO UPDATE SET
+        routes = routes + excluded.routes,
+        total_time_min = total_time_min + excluded.total_time_min,
+        total_price = total_price + excluded.total_price,
+        ranked_searches = ranked_searches + excluded.ranked_searches,
+        wins = wins + excluded.wins
+    """, [(mode, *stats) for mode, stats in modes.items()])
+
+@traced()
 def save_routes(origin, destination, routes):
+    ensure_db()
+    conn = get_connection()
+    conn.executemany(_INSERT_ROUTE, [_route_row(origin, destination, r) for r in routes])
+    _update_aggregates(conn, [(origin, destination, routes)])
+    conn.commit()
+    conn.close()
+
+def save_routes_many(searches, conn=None):
+    """
+    searches: iterable of (origin, destination, routes); one transaction.
+    With `conn` the caller (batch.py writer) keeps the connection open.
+    """
+    ensure_db()
+    own = conn is None
+    if own:
+        conn = get_connection()
+    searches = list(searches)
+    conn.executemany(_INSERT_ROUTE, [
+        _route_row(origin, destination, r)
+        for origin, destination, routes in searches
+        for r in routes
+    ])
+    _update_aggregates(conn, searches)
+    conn.commit()
+    if own:
+        conn.close()
+
+# Оцінки (і маршрути, взяті зі зворотного напрямку до підтвердження ORS)
+# не є спостереженнями: на них не можна вчитися
+_NOT_OBSERVED = (Source.ESTIMATE, Source.REVERSE)
+
+def get_mode_distance_samples(mode=None):
+    """(mode, distance_km, time_min) of saved routes that have a distance."""
+    ensure_db()
+    conn = get_connection()
+    cur = conn.cursor()
+
+    query = """
+    SELECT mode, distance_km, time_min
+    FROM routes
+    WHERE distance_km IS NOT NULL AND distance_km > 0
+      AND (source IS NULL OR source NOT IN (?, ?))
+    """
+    params = _NOT_OBSERVED
+    if mode is not None:
+        query += " AND mode = ?"
+        params += (str(mode),)
+
+    rows = cur.execute(query, params).fetchall()
+    conn.close()
+    return rows
+
+def get_training_rows():
+    """
+    (mode, time_min, distance_km, start_lon, start_lat, end_lon, end_lat)
+    of observed (not estimated) routes with known endpoints, including
+    ORS confirmations of estimates.
+    """
+    ensure_db()
     conn = get_connection()
     cur = conn.cursor()
 
-    for r in routes:
-        cur.execute("""
-        INSERT INTO routes (origin, destination, mode, time_min, price, transfers, score)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            origin,
-            destination,
-            r["mode"],
-            r["time_min"],
-            r["price"],
-            r["transfers"],
-            r["score"]
-        ))
+    rows = cur.execute("""
+    SELECT mode, time_min, distance_km, start_lon, start_lat, end_lon, end_lat
+    FROM routes
+    WHERE start_lon IS NOT NULL AND end_lon IS NOT NULL
+      AND distance_km IS NOT NULL
+      AND (source IS NULL OR source NOT IN (?, ?))
+    UNION ALL
+    SELECT mode, actual_time_min, actual_distance_km, start_lon, start_lat, end_lon, end_lat
+    FROM estimate_errors
+    WHERE start_lon IS NOT NULL AND end_lon IS NOT NULL
+    """, _NOT_OBSERVED).fetchall()
+
+    conn.close()
+    return rows
+
+def training_marker():
+    """
+    Cheap change marker for refitting: (count, max id) of the rows
+    get_training_rows() returns. Estimated and reverse routes saved by every
+    search do not change it.
+    """
+    ensure_db()
+    conn = get_connection()
+    marker = conn.execute("""
+    SELECT COUNT(*), MAX(id)
+    FROM routes
+    WHERE start_lon IS NOT NULL AND end_lon IS NOT NULL
+      AND distance_km IS NOT NULL
+      AND (source IS NULL OR source NOT IN (?, ?))
+    """, _NOT_OBSERVED).fetchone() + conn.execute("""
+    SELECT COUNT(*), MAX(id)
+    FROM estimate_errors
+    WHERE start_lon IS NOT NULL AND end_lon IS NOT NULL
+    """).fetchone()
+    conn.close()
+    return marker
+
+def save_estimate_error(mode, straight_km, est_time_min, actual_time_min,
+                        est_distance_km, actual_distance_km, in_interval,
+                        start=(None, None), end=(None, None)):
+    ensure_db()
+    conn = get_connection()
+    conn.execute("""
+    INSERT INTO estimate_errors (
+        mode, straight_km, est_time_min, actual_time_min,
+        est_distance_km, actual_distance_km, in_interval,
+        start_lon, start_lat, end_lon, end_lat
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (str(mode), straight_km, est_time_min, actual_time_min,
+          est_distance_km, actual_distance_km, int(bool(in_interval)),
+          start[0], start[1], end[0], end[1]))
+    conn.commit()
+    conn.close()
+
+def get_estimate_error_stats():
+    """mode -> (count, mean abs time error min, mean abs % error, interval coverage)."""
+    ensure_db()
+    conn = get_connection()
+    rows = conn.execute("""
+    SELECT mode,
+           COUNT(*),
+           AVG(ABS(est_time_min - actual_time_min)),
+           AVG(ABS(est_time_min - actual_time_min) / MAX(actual_time_min, 1)),
+           AVG(in_interval)
+    FROM estimate_errors
+    GROUP BY mode
+    """).fetchall()
+    conn.close()
+    return {mode: (count, mae, mape, coverage) for mode, count, mae, mape, coverage in rows}
+
+def get_known_places(limit=5000):
+    """[(place, times searched)] of origins and destinations in history."""
+    ensure_db()
+    conn = get_connection()
+    rows = conn.execute("""
+    SELECT MIN(place), COUNT(*) AS n
+    FROM (SELECT origin AS place FROM routes UNION ALL SELECT destination FROM routes)
+    WHERE place IS NOT NULL AND TRIM(place) != ''
+    GROUP BY LOWER(TRIM(place))
+    ORDER BY n DESC
+    LIMIT ?
+    """, (limit,)).fetchall()
+    conn.close()
+    return rows
+
+def get_popular_pairs(limit=300):
+    """[(origin, destination, searches)] most searched first (case-insensitive)."""
+    ensure_db()
+    conn = get_connection()
+    rows = conn.execute("""
+    SELECT origin, destination, searches
+    FROM pair_stats
+    ORDER BY searches DESC
+    LIMIT ?
+    """, (limit,)).fetchall()
+    conn.close()
+    return rows
 
+def get_mode_stats():
+    """
+    [(mode, routes, avg time_min, avg price, win rate)] from mode_stats;
+    win rate is the share of ranked searches with this mode it came first in.
+    """
+    ensure_db()
+    conn = get_connection()
+    rows = conn.execute("""
+    SELECT mode, routes, total_time_min / MAX(routes, 1), total_price / MAX(routes, 1),
+           CASE WHEN ranked_searches > 0 THEN wins * 1.0 / ranked_searches END
+    FROM mode_stats
+    ORDER BY routes DESC
+    """).fetchall()
+    conn.close()
+    return rows
+
+def rebuild_aggregates():
+    """
+    Recount pair_stats and mode_stats from the routes table (search
+    boundaries are not stored, so win counts start from zero again).
+    """
+    ensure_db()
+    conn = get_connection()
+    conn.execute("DELETE FROM pair_stats")
+    conn.execute("DELETE FROM mode_stats")
+    _backfill_aggregates(conn.cursor())
+    conn.commit()
+    conn.close()
+
+_HISTORY_COLUMNS = (
+    "id, origin, destination, mode, time_min, price, transfers, score, "
+    "distance_km, source, start_lon, start_lat, end_lon, end_lat"
+)
+
+def iter_route_chunks(chunk_rows=50_000, since_id=0):
+    """
+    Routes history in id order as lists of at most chunk_rows tuples
+    (columns as in _HISTORY_COLUMNS), without loading the whole table.
+    """
+    ensure_db()
+    conn = get_connection()
+    try:
+        cur = conn.execute(
+            f"SELECT {_HISTORY_COLUMNS} FROM routes WHERE id > ? ORDER BY id", (since_id,)
+        )
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def get_precomputed(origin, destination):
+    """(payload, updated_at) for a pair or None."""
+    ensure_db()
+    conn = get_connection()
+    row = conn.execute("""
+    SELECT payload, updated_at FROM precomputed_routes
+    WHERE origin_key = ? AND destination_key = ?
+    """, (place_key(origin), place_key(destination))).fetchone()
+    conn.close()
+    return row
+
+def get_precomputed_ages():
+    """{(origin_key, destination_key): updated_at} of every stored pair."""
+    ensure_db()
+    conn = get_connection()
+    rows = conn.execute("""
+    SELECT origin_key, destination_key, updated_at FROM precomputed_routes
+    """).fetchall()
+    conn.close()
+    return {(o, d): updated_at for o, d, updated_at in rows}
+
+def get_precomputed_rows():
+    """Every stored pair as (origin_key, destination_key, origin, destination, payload, updated_at)."""
+    ensure_db()
+    conn = get_connection()
+    rows = conn.execute("""
+    SELECT origin_key, destination_key, origin, destination, payload, updated_at
+    FROM precomputed_routes
+    """).fetchall()
+    conn.close()
+    return rows
+
+def merge_precomputed_rows(rows):
+    """Bulk upsert of get_precomputed_rows() output; older entries never win."""
+    ensure_db()
+    conn = get_connection()
+    conn.executemany("""
+    INSERT INTO precomputed_routes
+        (origin_key, destination_key, origin, destination, payload, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (origin_key, destination_key) DO UPDATE SET
+        origin = excluded.origin,
+        destination = excluded.destination,
+        payload = excluded.payload,
+        updated_at = excluded.updated_at
+    WHERE excluded.updated_at > precomputed_routes.updated_at
+    """, rows)
+    conn.commit()
+    conn.close()
+
+def save_precomputed(origin, destination, payload, updated_at):
+    ensure_db()
+    conn = get_connection()
+    conn.execute("""
+    INSERT OR REPLACE INTO precomputed_routes
+        (origin_key, destination_key, origin, destination, payload, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """, (place_key(origin), place_key(destination), origin, destination, payload, updated_at))
     conn.commit()
     conn.close()
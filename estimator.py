@@ -0,0 +1,195 @@
+import math
+import threading
+from dataclasses import dataclass
+
+import database
+import tracing
+from records import Mode
+from route_engine import haversine_km
+
+# Менше спостережень — модель режиму (чи регіону) не використовується
+MIN_SAMPLES = 10
+
+# Розмір регіонального кошика в градусах (None — без регіонів)
+REGION_DEG = 5.0
+
+# 95% інтервал (нормальне наближення)
+Z_95 = 1.96
+
+
+def region_of(lonlat, region_deg=REGION_DEG):
+    """Grid cell of the origin, e.g. (6, 10) for Kyiv at 5°."""
+    if lonlat is None or not region_deg:
+        return None
+    lon, lat = lonlat[:2]
+    return int(lon // region_deg), int(lat // region_deg)
+
+
+@dataclass(slots=True)
+class LinearFit:
+    """Least-squares line y = intercept + slope * x with residual spread."""
+
+    intercept: float
+    slope: float
+    n: int
+    mean_x: float
+    sxx: float
+    resid_std: float
+
+    def predict(self, x):
+        """(value, half-width of the 95% prediction interval)."""
+        value = self.intercept + self.slope * x
+        spread = math.sqrt(1 + 1 / self.n + (x - self.mean_x) ** 2 / self.sxx)
+        return value, Z_95 * self.resid_std * spread
+
+
+def fit_linear(xs, ys):
+    n = len(xs)
+    if n < 3:
+        return None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx <= 0:
+        return None
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    sse = sum((y - intercept - slope * x) ** 2 for x, y in zip(xs, ys))
+    return LinearFit(intercept, slope, n, mean_x, sxx, math.sqrt(sse / (n - 2)))
+
+
+@dataclass(slots=True)
+class Estimate:
+    time_min: int
+    distance_km: float
+    time_low: int
+    time_high: int
+    samples: int
+    region: tuple = None
+
+
+class TravelTimeEstimator:
+    """
+    Per-mode (and optionally per-region) linear models of route duration
+    and distance against the straight-line distance, fitted on observed
+    routes in mandruy.db. Estimates are instant; ORS confirms the choice.
+    """
+
+    def __init__(self, min_samples=MIN_SAMPLES, region_deg=REGION_DEG):
+        self.min_samples = min_samples
+        self.region_deg = region_deg
+        self._models = {}
+        self._fitted_marker = None
+        self._lock = threading.Lock()
+
+    def fit(self, rows):
+        """rows: (mode, time_min, distance_km, start_lon, start_lat, end_lon, end_lat)."""
+        groups = {}
+        for mode, time_min, distance_km, slon, slat, elon, elat in rows:
+            try:
+                mode = Mode(mode)
+            except ValueError:
+                continue
+            straight = haversine_km(slon, slat, elon, elat)
+            keys = [(mode, None)]
+            region = region_of((slon, slat), self.region_deg)
+            if region is not None:
+                keys.append((mode, region))
+            for key in keys:
+                xs, times, dists = groups.setdefault(key, ([], [], []))
+                xs.append(straight)
+                times.append(time_min)
+                dists.append(distance_km)
+
+        models = {}
+        for key, (xs, times, dists) in groups.items():
+            if len(xs) < self.min_samples:
+                continue
+            time_fit = fit_linear(xs, times)
+            dist_fit = fit_linear(xs, dists)
+            if time_fit and dist_fit:
+                models[key] = (time_fit, dist_fit)
+
+        self._models = models
+        return self
+
+    def refresh(self, background=False):
+        """
+        Refit from history if observed routes were saved since the last fit.
+        With background=True a refit runs in a daemon thread and estimates
+        keep using the previous models until it finishes (the first fit is
+        always done in place, so the first search already has a model).
+        """
+        marker = database.training_marker()
+        if marker == self._fitted_marker:
+            return False
+        if background and self._fitted_marker is not None:
+            if not self._lock.acquire(blocking=False):
+                return False  # попередній перерахунок ще триває
+            threading.Thread(
+                target=self._refit, args=(marker, True), name="fit-estimator", daemon=True
+            ).start()
+            return True
+        with self._lock:
+            if marker == self._fitted_marker:
+                return False
+            self._refit(marker)
+        return True
+
+    def _refit(self, marker, release=False):
+        try:
+            with tracing.span("fit_estimator", rows=marker[0] + marker[2]):
+                self.fit(database.get_training_rows())
+            self._fitted_marker = marker
+        finally:
+            if release:
+                self._lock.release()
+
+    def has_model(self, mode):
+        return (Mode(mode), None) in self._models
+
+    def estimate(self, mode, start, end):
+        """Estimate for a mode between two (lon, lat) points, or None without a model."""
+        mode = Mode(mode)
+        region = region_of(start, self.region_deg)
+        models = self._models
+        model = models.get((mode, region)) or models.get((mode, None))
+        if model is None:
+            return None
+
+        straight = haversine_km(*start[:2], *end[:2])
+        time_fit, dist_fit = model
+        time_min, half = time_fit.predict(straight)
+        distance_km, _ = dist_fit.predict(straight)
+        time_min = max(time_min, 1)
+
+        return Estimate(
+            time_min=int(time_min),
+            distance_km=round(max(distance_km, straight), 1),
+            time_low=int(max(time_min - half, 1)),
+            time_high=int(time_min + half),
+            samples=time_fit.n,
+            region=region if (mode, region) in models else None,
+        )
+
+    def record_error(self, estimated, actual):
+        """Store how far an estimated route was from the ORS-confirmed one."""
+        straight = haversine_km(*actual["start"][:2], *actual["end"][:2])
+        low, high = estimated["time_range"] or (None, None)
+        in_interval = low is not None and low <= actual["time_min"] <= high
+        database.save_estimate_error(
+            actual["mode"], straight,
+            estimated["time_min"], actual["time_min"],
+            estimated["distance_km"], actual["distance_km"],
+            in_interval,
+            start=actual["start"][:2],
+            end=actual["end"][:2],
+        )
+        tracing.incr("estimate_confirmations")
+        if not in_interval:
+            tracing.incr("estimate_interval_misses")
+
+    @staticmethod
+    def error_stats():
+        return database.get_estimate_error_stats()
@@ -0,0 +1,241 @@
+import math
+
+# NumPy необов'язковий і завантажується лише під час першого спрощення
+_np = None
+_np_checked = False
+
+# Відрізки, коротші за це, NumPy-версія віддає чистій Python-версії
+_NUMPY_MIN_SPAN = 64
+
+# Рівень масштабу, на якому спрощена лінія ще має виглядати як оригінал
+DETAIL_ZOOM = 12
+
+
+def tolerance_for_zoom(zoom, pixels=1.0):
+    """
+    Tolerance (in degrees) that corresponds to `pixels` screen pixels
+    at the given web-map zoom level (256 px tiles).
+    """
+    return pixels * 360.0 / (256 * 2 ** zoom)
+
+
+def _point_segment_dist(p, a, b):
+    # Точки можуть мати третю координату (висоту): відстань — у площині lon/lat
+    ax, ay = a[0], a[1]
+    bx, by = b[0], b[1]
+    px, py = p[0], p[1]
+    dx = bx - ax
+    dy = by - ay
+    if dx == 0 and dy == 0:
+        return math.hypot(px - ax, py - ay)
+    t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)
+    t = max(0.0, min(1.0, t))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def _rdp_keep_python(coords, tolerance):
+    keep = [False] * len(coords)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(coords) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        max_dist = 0.0
+        index = first
+        a, b = coords[first], coords[last]
+        for i in range(first + 1, last):
+            d = _point_segment_dist(coords[i], a, b)
+            if d > max_dist:
+                max_dist = d
+                index = i
+        if max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return keep
+
+
+def _numpy():
+    global _np, _np_checked
+    if not _np_checked:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = None
+        _np_checked = True
+    return _np
+
+
+def _rdp_keep_numpy(coords, tolerance):
+    np = _numpy()
+    pts = np.asarray(coords, dtype=float)[:, :2]
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(pts) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        if last - first < _NUMPY_MIN_SPAN:
+            # На коротких відрізках накладні витрати NumPy більші за виграш
+            sub = _rdp_keep_python(coords[first:last + 1], tolerance)
+            for i, k in enumerate(sub):
+                if k:
+                    keep[first + i] = True
+            continue
+        a, b = pts[first], pts[last]
+        seg = pts[first + 1:last]
+        d = b - a
+        seg_len2 = d[0] * d[0] + d[1] * d[1]
+        if seg_len2 == 0:
+            dists = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            t = ((seg[:, 0] - a[0]) * d[0] + (seg[:, 1] - a[1]) * d[1]) / seg_len2
+            t = np.clip(t, 0.0, 1.0)
+            dists = np.hypot(seg[:, 0] - (a[0] + t * d[0]), seg[:, 1] - (a[1] + t * d[1]))
+        i = int(np.argmax(dists))
+        if dists[i] > tolerance:
+            index = first + 1 + i
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return keep.tolist()
+
+
+def simplify_coords(coords, tolerance):
+    """
+    Ramer–Douglas–Peucker simplification of a [[lon, lat], ...] list
+    ([lon, lat, ele] points keep their elevation). Uses NumPy when it is installed. Endpoints are always kept.
+    """
+    if tolerance <= 0 or len(coords) < 3:
+        return list(coords)
+
+    if _numpy() is not None:
+        keep = _rdp_keep_numpy(coords, tolerance)
+    else:
+        keep = _rdp_keep_python(coords, tolerance)
+
+    return [c for c, k in zip(coords, keep) if k]
+
+
+def simplify_for_zoom(coords, zoom=DETAIL_ZOOM, pixels=1.0):
+    return simplify_coords(coords, tolerance_for_zoom(zoom, pixels))
+
+
+def great_circle_points(start_lonlat, end_lonlat, n_points=64):
+    """
+    Points along the great-circle arc between two (lon, lat) pairs,
+    returned as [[lon, lat], ...] including both endpoints.
+    """
+    lon1, lat1 = map(math.radians, start_lonlat[:2])
+    lon2, lat2 = map(math.radians, end_lonlat[:2])
+
+    p1 = (math.cos(lat1) * math.cos(lon1), math.cos(lat1) * math.sin(lon1), math.sin(lat1))
+    p2 = (math.cos(lat2) * math.cos(lon2), math.cos(lat2) * math.sin(lon2), math.sin(lat2))
+    dot = max(-1.0, min(1.0, sum(a * b for a, b in zip(p1, p2))))
+    omega = math.acos(dot)
+
+    if omega < 1e-9:
+        return [list(start_lonlat[:2]), list(end_lonlat[:2])]
+
+    points = []
+    sin_omega = math.sin(omega)
+    for i in range(n_points):
+        t = i / (n_points - 1)
+        a = math.sin((1 - t) * omega) / sin_omega
+        b = math.sin(t * omega) / sin_omega
+        x, y, z = (a * u + b * v for u, v in zip(p1, p2))
+        points.append([math.degrees(math.atan2(y, x)), math.degrees(math.atan2(z, math.hypot(x, y)))])
+    return points
+
+
+def _polyline_values_python(data):
+    values = []
+    append = values.append
+    result = shift = 0
+    for b in data:
+        b -= 63
+        result |= (b & 0x1F) << shift
+        if b < 0x20:
+            append(~(result >> 1) if result & 1 else result >> 1)
+            result = shift = 0
+        else:
+            shift += 5
+    return values
+
+
+def _polyline_values_numpy(data):
+    np = _numpy()
+    b = np.frombuffer(data, dtype=np.uint8).astype(np.int64) - 63
+    ends = np.flatnonzero(b < 0x20)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    # Зсув кожного 5-бітового фрагмента всередині свого значення
+    group_start = np.repeat(starts, ends - starts + 1)
+    shifts = 5 * (np.arange(len(b)) - group_start)
+    raw = np.add.reduceat((b & 0x1F) << shifts, starts)
+    return np.where(raw & 1, ~(raw >> 1), raw >> 1)
+
+
+def decode_polyline(encoded, precision=5, with_elevation=False):
+    """
+    Decode a Google encoded polyline (as returned by ORS with
+    geometry_format=encodedpolyline) into [[lon, lat], ...].
+    ORS appends elevation as a third value when it was requested.
+    """
+    factor = 10.0 ** precision
+    dims = 3 if with_elevation else 2
+    data = encoded.encode("ascii")
+    if not data:
+        return []
+
+    if _numpy() is not None and len(data) >= _NUMPY_MIN_SPAN:
+        np = _numpy()
+        values = _polyline_values_numpy(data)
+        values = values[:len(values) - len(values) % dims].reshape(-1, dims)
+        totals = np.cumsum(values, axis=0)
+        coords = np.empty(totals.shape, dtype=float)
+        coords[:, 0] = totals[:, 1] / factor
+        coords[:, 1] = totals[:, 0] / factor
+        if with_elevation:
+            coords[:, 2] = totals[:, 2] / 100.0
+        return coords.tolist()
+
+    values = _polyline_values_python(data)
+    coords = []
+    lat = lon = ele = 0
+    for i in range(0, len(values) - dims + 1, dims):
+        lat += values[i]
+        lon += values[i + 1]
+        if with_elevation:
+            ele += values[i + 2]
+            coords.append([lon / factor, lat / factor, ele / 100.0])
+        else:
+            coords.append([lon / factor, lat / factor])
+
+    return coords
+
+
+def encode_polyline(coords, precision=5):
+    """Inverse of decode_polyline for [[lon, lat], ...] (2D only)."""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+
+    for lon, lat, *_ in coords:
+        lat_i = int(round(lat * factor))
+        lon_i = int(round(lon * factor))
+        for delta in (lat_i - prev_lat, lon_i - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lon = lat_i, lon_i
+
+    return "".join(out)
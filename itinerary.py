@@ -0,0 +1,302 @@
+import heapq
+import json
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+import tracing
+from providers import get_provider
+from records import Mode, Route, Source
+from route_engine import (
+    TIMETABLES, approximate_route, bus_route, estimated_route, haversine_km, plane_route,
+    train_route, wait_minutes,
+)
+from tracing import traced
+
+# Локальний список вузлів (аеропорти, вокзали); MANDRUY_HUBS_FILE — свій список
+HUBS_FILE = os.getenv("MANDRUY_HUBS_FILE", str(Path(__file__).resolve().parent / "hubs.json"))
+
+# Дорогою до/від вузла — не далі за це
+ACCESS_MAX_KM = 150
+# Дорогою між двома вузлами (вокзал → аеропорт того ж міста)
+TRANSFER_MAX_KM = 40
+# Коротші дорожні ділянки — пішки, довші — авто
+WALK_MAX_KM = 3
+# Запас часу на кожну пересадку між ділянками, хв
+TRANSFER_MIN = 30
+MAX_LEGS = 4
+MAX_ITINERARIES = 3
+# Найшвидший режим (літак): нижня межа часу до мети
+MAX_SPEED_KMH = 700
+# Комбінований маршрут має бути хоч на стільки кращим за час чи ціну
+# (або мати менше пересадок), інакше різниця в центах — не варіант
+MIN_GAIN = 0.05
+
+# Тип вузла -> режим основної ділянки між вузлами цього типу
+MAIN_LEGS = {
+    "airport": (Mode.PLANE, plane_route),
+    "rail": (Mode.TRAIN, train_route),
+    "bus": (Mode.BUS, bus_route),
+}
+# Місто відправлення/призначення вважається станцією будь-якого типу,
+# як і в прямих маршрутах build_all_routes
+_ALL_KINDS = frozenset(MAIN_LEGS)
+
+
+@dataclass(frozen=True, slots=True)
+class Hub:
+    code: str
+    name: str
+    lon: float
+    lat: float
+    kinds: frozenset
+
+
+@dataclass(slots=True)
+class _Label:
+    node: int
+    time_min: int
+    price: float
+    transfers: int
+    legs: tuple
+
+
+_hubs = None
+
+
+def load_hubs(path=None):
+    global _hubs
+    if path is None and _hubs is not None:
+        return _hubs
+    with open(path or HUBS_FILE, encoding="utf-8") as f:
+        hubs = [
+            Hub(h["code"], h["name"], h["lon"], h["lat"], frozenset(h["kinds"]))
+            for h in json.load(f)
+        ]
+    if path is None:
+        _hubs = hubs
+    return hubs
+
+
+def weakly_dominates(a, b):
+    """a is no worse than b in every criterion (lower is better)."""
+    return all(x <= y for x, y in zip(a, b))
+
+
+def _dominated(key, front):
+    # Гаряче місце пошуку: критерії порівнюються без zip/all
+    t, p, c = key[0], key[1], key[2]
+    if len(key) == 3:
+        for k in front:
+            if k[0] <= t and k[1] <= p and k[2] <= c:
+                return True
+        return False
+    n = key[3]
+    for k in front:
+        if k[0] <= t and k[1] <= p and k[2] <= c and k[3] <= n:
+            return True
+    return False
+
+
+def _with_margin(key):
+    return key[0] * (1 + MIN_GAIN), key[1] * (1 + MIN_GAIN), key[2]
+
+
+def _add_to_front(front, key):
+    """Add a non-dominated key and drop the keys it dominates (in place)."""
+    front[:] = [k for k in front if not weakly_dominates(key, k)]
+    front.append(key)
+
+
+def pareto_front(routes):
+    """Routes not strictly dominated by another one on (time, price, transfers)."""
+    keys = [(r["time_min"], r["price"], r["transfers"]) for r in routes]
+    return [
+        r for r, key in zip(routes, keys)
+        if not any(k != key and weakly_dominates(k, key) for k in keys)
+    ]
+
+
+@traced()
+def find_itineraries(origin, destination, start, end, direct=(), estimator=None,
+                     hubs=None, max_results=MAX_ITINERARIES, departure=None):
+    """
+    Multi-leg routes origin → hub(s) → destination that no direct route and
+    no other itinerary beats on time, price and transfers at once.
+
+    Label-setting search from the origin, cheapest time bound first. A
+    partial itinerary is dropped when its lower bound (time so far plus
+    the straight line to the destination at MAX_SPEED_KMH) is dominated
+    by a complete route found so far (with the MIN_GAIN margin), or when
+    another partial itinerary at the same place is no worse in every
+    criterion.
+
+    With a departure, an itinerary's wait_min is the wait for its first
+    scheduled leg, reached after the road legs before it (the waits of
+    later legs are covered by TRANSFER_MIN), as for direct routes.
+    """
+    hubs = load_hubs() if hubs is None else hubs
+    points = [tuple(start[:2]), tuple(end[:2])] + [(h.lon, h.lat) for h in hubs]
+    names = [origin, destination] + [h.name for h in hubs]
+    kinds = [_ALL_KINDS, _ALL_KINDS] + [h.kinds for h in hubs]
+    to_end = [haversine_km(*p, *points[1]) for p in points]
+    plane_min_km = get_provider(Mode.PLANE).min_distance_km or 0
+
+    distances = {}
+    legs_cache = {}
+
+    def distance(a, b):
+        key = (a, b) if a < b else (b, a)
+        dist = distances.get(key)
+        if dist is None:
+            dist = distances[key] = haversine_km(*points[a], *points[b])
+        return dist
+
+    def leg(kind, a, b, dist):
+        # Ділянка між двома точками однакова для всіх часткових маршрутів
+        key = (kind, a, b)
+        route = legs_cache.get(key)
+        if route is None:
+            if kind == "road":
+                route = road_leg(a, b, dist)
+            else:
+                route = main_leg(MAIN_LEGS[kind][1], a, b)
+            legs_cache[key] = route
+        return route
+
+    def road_leg(a, b, dist):
+        provider = get_provider(Mode.WALK if dist <= WALK_MAX_KM else Mode.CAR)
+        estimate = estimator.estimate(provider.mode, points[a], points[b]) if estimator else None
+        if estimate is not None:
+            return estimated_route(provider, names[a], names[b], points[a], points[b], estimate)
+        return approximate_route(provider, names[a], names[b], points[a], points[b], dist)
+
+    def main_leg(build, a, b):
+        leg = build(points[a], points[b])
+        leg.description = f"{names[a]} → {names[b]}"
+        return leg
+
+    def expand(label):
+        u = label.node
+        last_road = bool(label.legs) and label.legs[-1]["mode"] in (Mode.CAR, Mode.WALK)
+        for v in range(1, len(points)):
+            # Повернення у вже пройдений вузол завжди гірше за попередній прихід
+            # туди, тож його відкидає перевірка домінування у вузлі
+            if v == u:
+                continue
+            dist = distance(u, v)
+            for kind in kinds[u] & kinds[v]:
+                if kind == "airport" and dist < plane_min_km:
+                    continue
+                yield leg(kind, u, v, dist), v
+            if last_road:
+                continue  # дві дорожні ділянки поспіль — це одна ділянка
+            if u == 0 or v == 1:
+                if dist <= ACCESS_MAX_KM and not (u == 0 and v == 1):
+                    yield leg("road", u, v, dist), v
+            elif dist <= TRANSFER_MAX_KM:
+                yield leg("road", u, v, dist), v
+
+    def lower_bound(label):
+        if label.node == 0:
+            return to_end[0] / MAX_SPEED_KMH * 60, label.price, label.transfers
+        return (
+            label.time_min + TRANSFER_MIN + to_end[label.node] / MAX_SPEED_KMH * 60,
+            label.price,
+            label.transfers + 1,
+        )
+
+    complete = [(r["time_min"], r["price"], r["transfers"]) for r in direct]
+    found = []
+    frontier = {}
+    heap = [(0.0, 0, _Label(0, 0, 0.0, 0, ()))]
+    counter = 1
+    expanded = pruned = 0
+
+    while heap:
+        _, _, label = heapq.heappop(heap)
+        if _dominated(_with_margin(lower_bound(label)), complete):
+            pruned += 1
+            continue
+        expanded += 1
+        change = 1 if label.legs else 0
+        extra_min = change * TRANSFER_MIN
+
+        for step, v in expand(label):
+            time_min = label.time_min + step.time_min + extra_min
+            price = label.price + step.price
+            transfers = label.transfers + step.transfers + change
+            n_legs = len(label.legs) + 1
+
+            if v == 1:
+                # Одна ділянка — це прямий маршрут, його будує build_all_routes
+                key = (time_min, price, transfers)
+                if n_legs > 1 and not _dominated(_with_margin(key), complete):
+                    _add_to_front(complete, key)
+                    found.append(_Label(v, time_min, price, transfers, label.legs + (step,)))
+                continue
+            if n_legs >= MAX_LEGS:
+                continue  # до мети потрібна ще хоча б одна ділянка
+
+            bound = (
+                time_min + TRANSFER_MIN + to_end[v] / MAX_SPEED_KMH * 60,
+                price,
+                transfers + 1,
+            )
+            at_node = frontier.setdefault(v, [])
+            node_key = (time_min, price, transfers, n_legs)
+            if _dominated(_with_margin(bound), complete) or _dominated(node_key, at_node):
+                pruned += 1
+                continue
+            _add_to_front(at_node, node_key)
+            heapq.heappush(
+                heap, (bound[0], counter, _Label(v, time_min, price, transfers, label.legs + (step,)))
+            )
+            counter += 1
+
+    tracing.incr("itinerary_labels", expanded)
+    tracing.incr("itinerary_pruned", pruned)
+
+    routes = [_as_route(label, names, start, end, departure) for label in found]
+    best = pareto_front(routes + list(direct))
+    routes = [r for r in routes if any(r is b for b in best)]
+    routes.sort(key=lambda r: (r["time_min"], r["price"]))
+    return routes[:max_results]
+
+
+def describe(legs):
+    """'Авто + Літак (через Бориспіль)' for legs described 'A → B'."""
+    via = [leg["description"].split(" → ")[0] for leg in legs[1:]]
+    return " + ".join(str(leg["mode"]) for leg in legs) + f" (через {', '.join(via)})"
+
+
+def first_wait(legs, departure):
+    """Minutes to wait for the first scheduled leg when setting off at `departure`."""
+    if departure is None:
+        return 0
+    elapsed = 0
+    for leg in legs:
+        if leg["mode"] in TIMETABLES:
+            return wait_minutes(leg["mode"], departure + timedelta(minutes=elapsed))
+        elapsed += leg["time_min"] + TRANSFER_MIN
+    return 0
+
+
+def _as_route(label, names, start, end, departure=None):
+    legs = label.legs
+    return Route(
+        mode=Mode.MULTI,
+        time_min=int(label.time_min),
+        price=round(label.price, 2),
+        distance_km=round(sum(leg["distance_km"] for leg in legs), 1),
+        transfers=label.transfers,
+        description=describe(legs),
+        geometry=None,
+        start=tuple(start[:2]),
+        end=tuple(end[:2]),
+        source=Source.ITINERARY,
+        legs=legs,
+        departure=departure,
+        wait_min=first_wait(legs, departure),
+    )
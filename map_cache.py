@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MAP_CACHE_DIR = Path("maps") / "cache"
+MAP_CACHE_MAX_FILES = 64
+MAP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def content_key(*parts):
+    """Stable hash of JSON-serialisable route content."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class MapCache:
+    """
+    Rendered HTML maps on disk, one file per content hash.
+    Recency is tracked with file mtime; the least recently used files are
+    removed once the file count or total size goes over the cap.
+    """
+
+    def __init__(self, directory=MAP_CACHE_DIR, max_files=MAP_CACHE_MAX_FILES,
+                 max_bytes=MAP_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        return self.directory / f"{key}.html"
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None  # ще не збережено або щойно витіснено іншим процесом
+        return path
+
+    def put(self, key, html):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(html, encoding="utf-8")
+        tmp.replace(path)
+        self.evict()
+        return path
+
+    def evict(self):
+        entries = []
+        for p in self.directory.glob("*.html"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        entries.sort(key=lambda e: e[0], reverse=True)
+        total = 0
+        for i, (_, size, p) in enumerate(entries):
+            total += size
+            if i >= self.max_files or total > self.max_bytes:
+                p.unlink(missing_ok=True)
+
+
+map_cache = MapCache()
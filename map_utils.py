@@ -1,18 +1,69 @@
-import folium
+import json
+from functools import lru_cache
+
+from geometry import DETAIL_ZOOM, great_circle_points, simplify_coords, tolerance_for_zoom
+from map_cache import content_key, map_cache
+from memcache import BoundedCache
+
 
 def _lonlat_to_latlon(lonlat):
     lon, lat = lonlat
     return (lat, lon)
 
-def build_route_map_html(start_lonlat, end_lonlat, geometry, title="MandruyUA Route"):
+
+# (ключ лінії, допуск) -> координати [(lat, lon), ...]; окремий ключ на кожен
+# допуск, тож зміна масштабу не витісняє вже спрощену лінію
+_SIMPLIFIED = BoundedCache("simplified")
+
+
+# Стільки рівномірно взятих точок лінії входить у її ключ
+LINE_KEY_POINTS = 64
+
+
+def _line_key(geometry):
+    # Ключ за вмістом: та сама лінія з іншого запиту (чи знімка) — той самий
+    # ключ. Хешувати всі точки на кожну карту дорого; різні маршрути ORS між
+    # тими самими містами розходяться і у вибірці точок
+    coords = geometry["coordinates"]
+    step = max(1, len(coords) // LINE_KEY_POINTS)
+    sample = coords[::step] + coords[-1:]
+    return len(coords), hash(tuple(map(tuple, sample)))
+
+
+COMPARISON_COLORS = ["#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2"]
+
+
+def _route_latlon(geometry, simplify, simplify_zoom, tolerance):
     # geometry: GeoJSON LineString => {"coordinates": [[lon,lat],...]}
-    coords_lonlat = geometry["coordinates"]
-    coords_latlon = [(lat, lon) for lon, lat in coords_lonlat]
+    # simplify_zoom: найбільший масштаб, на якому лінія має виглядати без змін;
+    # tolerance (у градусах) перекриває його напряму
+    if simplify and tolerance is None:
+        tolerance = tolerance_for_zoom(simplify_zoom)
+    if not simplify:
+        tolerance = 0
+
+    key = (_line_key(geometry), tolerance)
+    cached = _SIMPLIFIED.get(key)
+    if cached is not None:
+        return cached
+
+    coords_lonlat = simplify_coords(geometry["coordinates"], tolerance)
+    coords_latlon = [(lat, lon) for lon, lat, *_ in coords_lonlat]
+
+    _SIMPLIFIED[key] = coords_latlon
+    return coords_latlon
+
+
+def build_route_map_html(start_lonlat, end_lonlat, geometry, title="MandruyUA Route",
+                         zoom_start=6, simplify=True, simplify_zoom=DETAIL_ZOOM, tolerance=None):
+    import folium
+
+    coords_latlon = _route_latlon(geometry, simplify, simplify_zoom, tolerance)
 
     start_latlon = _lonlat_to_latlon(start_lonlat)
     end_latlon = _lonlat_to_latlon(end_lonlat)
 
-    m = folium.Map(location=start_latlon, zoom_start=6, control_scale=True)
+    m = folium.Map(location=start_latlon, zoom_start=zoom_start, control_scale=True)
 
     folium.Marker(start_latlon, tooltip="Start", popup="Start").add_to(m)
     folium.Marker(end_latlon, tooltip="End", popup="End").add_to(m)
@@ -22,3 +73,143 @@ def build_route_map_html(start_lonlat, end_lonlat, geometry, title="MandruyUA Ro
     folium.LayerControl().add_to(m)
 
     return m.get_root().render()
+
+
+@lru_cache(maxsize=8)
+def _route_map_shell(zoom_start):
+    import folium
+
+    # Порожня карта folium рендериться один раз; маршрут дописується скриптом
+    m = folium.Map(location=(0, 0), zoom_start=zoom_start, control_scale=True)
+    folium.LayerControl().add_to(m)
+    return m.get_root().render(), m.get_name()
+
+
+_ROUTE_SCRIPT = """<script>
+    (function(map) {{
+        var start = {start};
+        var end = {end};
+        L.marker(start).bindTooltip("Start").bindPopup("Start").addTo(map);
+        L.marker(end).bindTooltip("End").bindPopup("End").addTo(map);
+        L.polyline({coords}, {{"weight": 6}}).addTo(map);
+        map.setView(start, {zoom});
+    }})({map_name});
+</script>
+"""
+
+
+def render_route_map_template(start_lonlat, end_lonlat, geometry, zoom_start=6,
+                              simplify=True, simplify_zoom=DETAIL_ZOOM, tolerance=None):
+    """
+    Same map as build_route_map_html, but the markers and the polyline are
+    injected into a pre-rendered folium shell instead of building a new Map.
+    """
+    coords_latlon = _route_latlon(geometry, simplify, simplify_zoom, tolerance)
+    shell, map_name = _route_map_shell(zoom_start)
+
+    script = _ROUTE_SCRIPT.format(
+        start=json.dumps(_lonlat_to_latlon(start_lonlat)),
+        end=json.dumps(_lonlat_to_latlon(end_lonlat)),
+        coords=json.dumps(coords_latlon, separators=(",", ":")),
+        zoom=int(zoom_start),
+        map_name=map_name,
+    )
+
+    head, sep, tail = shell.rpartition("</html>")
+    return head + script + sep + tail
+
+
+def route_map_file(start_lonlat, end_lonlat, geometry, zoom_start=6, simplify=True,
+                   simplify_zoom=DETAIL_ZOOM, tolerance=None, cache=map_cache):
+    """
+    Path to the rendered map of a route. Maps are cached on disk by route
+    content hash, so re-selecting a route does not render it again.
+    """
+    key = content_key(
+        "route", start_lonlat, end_lonlat, geometry["coordinates"],
+        zoom_start, simplify, simplify_zoom, tolerance,
+    )
+
+    path = cache.get(key)
+    if path is None:
+        html = render_route_map_template(
+            start_lonlat, end_lonlat, geometry, zoom_start=zoom_start,
+            simplify=simplify, simplify_zoom=simplify_zoom, tolerance=tolerance,
+        )
+        path = cache.put(key, html)
+    return path
+
+
+def _comparison_routes(routes):
+    # Лише маршрути, які можна намалювати: з геометрією або з координатами кінців
+    return [r for r in routes if r.get("geometry") or (r.get("start") and r.get("end"))]
+
+
+def build_comparison_map_html(routes, zoom_start=6, simplify=True, simplify_zoom=DETAIL_ZOOM,
+                              tolerance=None):
+    """
+    All ranked routes on one map, each in its own toggleable layer.
+    Routes without geometry (mock plane/train/bus) are drawn as dashed
+    great-circle arcs between their endpoints; multi-leg itineraries as
+    one arc per leg through their hubs.
+    """
+    import folium
+
+    drawable = _comparison_routes(routes)
+    if not drawable:
+        raise ValueError("No routes with geometry or endpoints to draw")
+
+    start_latlon = _lonlat_to_latlon(drawable[0]["start"])
+    end_latlon = _lonlat_to_latlon(drawable[0]["end"])
+
+    m = folium.Map(location=start_latlon, zoom_start=zoom_start, control_scale=True)
+
+    folium.Marker(start_latlon, tooltip="Start", popup="Start").add_to(m)
+    folium.Marker(end_latlon, tooltip="End", popup="End").add_to(m)
+
+    bounds = [start_latlon, end_latlon]
+    for i, r in enumerate(drawable):
+        color = COMPARISON_COLORS[i % len(COMPARISON_COLORS)]
+        label = f"{i + 1}. {r['mode']} — {r['time_min']} хв, {r['price']} €"
+        layer = folium.FeatureGroup(name=label)
+
+        if r.get("geometry"):
+            coords_latlon = _route_latlon(r["geometry"], simplify, simplify_zoom, tolerance)
+            folium.PolyLine(coords_latlon, weight=6, color=color, tooltip=label).add_to(layer)
+        else:
+            arc = []
+            for leg in r.get("legs") or (r,):
+                arc.extend(great_circle_points(leg["start"], leg["end"]))
+            coords_latlon = [(lat, lon) for lon, lat in arc]
+            folium.PolyLine(
+                coords_latlon, weight=4, color=color, dash_array="8 8", tooltip=label
+            ).add_to(layer)
+
+        bounds.extend(coords_latlon[::max(1, len(coords_latlon) // 32)])
+        layer.add_to(m)
+
+    m.fit_bounds(bounds)
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    return m.get_root().render()
+
+
+def comparison_map_file(routes, zoom_start=6, simplify=True, simplify_zoom=DETAIL_ZOOM,
+                        tolerance=None, cache=map_cache):
+    drawable = _comparison_routes(routes)
+    key = content_key(
+        "comparison",
+        [(r["mode"], r["time_min"], r["price"], r.get("start"), r.get("end"),
+          r["geometry"]["coordinates"] if r.get("geometry") else None,
+          [(leg["start"], leg["end"]) for leg in r.get("legs") or ()]) for r in drawable],
+        zoom_start, simplify, simplify_zoom, tolerance,
+    )
+
+    path = cache.get(key)
+    if path is None:
+        html = build_comparison_map_html(
+            drawable, zoom_start=zoom_start, simplify=simplify,
+            simplify_zoom=simplify_zoom, tolerance=tolerance,
+        )
+        path = cache.put(key, html)
+    return path
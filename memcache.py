@@ -0,0 +1,226 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import tracing
+
+MB = 1024 * 1024
+
+# Бюджет пам'яті кожного простору імен, байти. MANDRUY_CACHE_BUDGETS
+# перекриває їх у мегабайтах: "directions=64,simplified=8"
+CACHE_BUDGETS = {
+    "geocode": 4 * MB,
+    "directions": 128 * MB,
+    "summaries": 16 * MB,
+    # Спрощені для карти лінії маршрутів (map_utils)
+    "simplified": 32 * MB,
+}
+# Витіснення: LFU лишає популярні міста, LRU — решта (маршрути, лінії карт)
+CACHE_POLICIES = {"geocode": "lfu"}
+POLICIES = ("lru", "lfu")
+
+# Довгі списки (координати) оцінюються за стількома першими елементами
+SIZE_SAMPLE = 8
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _budgets_from_env(text):
+    budgets = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, mb = item.partition("=")
+        budgets[name.strip()] = int(float(mb) * MB)
+    return budgets
+
+
+CACHE_BUDGETS.update(_budgets_from_env(os.getenv("MANDRUY_CACHE_BUDGETS", "")))
+
+
+def approx_size(obj):
+    """Approximate deep size in bytes of JSON-like data (dicts, lists, tuples, scalars)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += approx_size(key) + approx_size(value)
+    elif isinstance(obj, (list, tuple)):
+        if len(obj) > SIZE_SAMPLE:
+            sample = sum(approx_size(item) for item in obj[:SIZE_SAMPLE])
+            size += sample * len(obj) // SIZE_SAMPLE
+        else:
+            size += sum(approx_size(item) for item in obj)
+    return size
+
+
+class BoundedCache:
+    """
+    In-memory cache limited by the approximate size of its values in bytes
+    (approx_size), not by the number of entries. Evicts the least recently
+    (lru) or least frequently (lfu, oldest first among equals) used entries
+    once max_bytes is exceeded; a value larger than the whole budget is not
+    stored. Thread-safe; registered by name for stats() and tracing gauges.
+    """
+
+    def __init__(self, name, max_bytes=None, policy=None, sizeof=approx_size):
+        policy = policy or CACHE_POLICIES.get(name, "lru")
+        if policy not in POLICIES:
+            raise ValueError(f"Невідома політика кешу: {policy} ({', '.join(POLICIES)})")
+        self.name = name
+        self.max_bytes = CACHE_BUDGETS.get(name, 16 * MB) if max_bytes is None else max_bytes
+        self.policy = policy
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        # key -> [value, nbytes, uses]; порядок — від найдавніше використаного
+        self._entries = OrderedDict()
+        # lfu: uses -> OrderedDict ключів із такою кількістю звернень
+        self._by_uses = {}
+        self._min_uses = 0
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.rejected = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _touch(self, key, entry):
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+            return
+        uses = entry[2]
+        bucket = self._by_uses[uses]
+        del bucket[key]
+        if not bucket:
+            del self._by_uses[uses]
+            if self._min_uses == uses:
+                self._min_uses = uses + 1
+        entry[2] = uses + 1
+        self._by_uses.setdefault(uses + 1, OrderedDict())[key] = None
+
+    def _remove(self, key):
+        value, nbytes, uses = self._entries.pop(key)
+        self.bytes -= nbytes
+        if self.policy == "lfu":
+            bucket = self._by_uses[uses]
+            del bucket[key]
+            if not bucket:
+                del self._by_uses[uses]
+                if self._min_uses == uses:
+                    self._min_uses = min(self._by_uses, default=0)
+        return value
+
+    def _victim(self):
+        if self.policy == "lru":
+            return next(iter(self._entries))
+        return next(iter(self._by_uses[self._min_uses]))
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touch(key, entry)
+            return entry[0]
+
+    def peek(self, key, default=None):
+        """Value without counting a lookup or changing the eviction order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        nbytes = self.sizeof(key) + self.sizeof(value)
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if nbytes > self.max_bytes:
+                self.rejected += 1
+                return
+            while self._entries and self.bytes + nbytes > self.max_bytes:
+                self._remove(self._victim())
+                evicted += 1
+            self._entries[key] = [value, nbytes, 1]
+            self.bytes += nbytes
+            if self.policy == "lfu":
+                self._by_uses.setdefault(1, OrderedDict())[key] = None
+                self._min_uses = 1
+            self.evictions += evicted
+        if evicted:
+            tracing.incr(f"{self.name}_cache_evictions", evicted)
+
+    __setitem__ = put
+
+    def update(self, items):
+        for key, value in (items.items() if hasattr(items, "items") else items):
+            self.put(key, value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_uses.clear()
+            self._min_uses = 0
+            self.bytes = 0
+
+    def items(self):
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def values(self):
+        with self._lock:
+            return [entry[0] for entry in self._entries.values()]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "policy": self.policy,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+        }
+
+
+def stats():
+    """{namespace: BoundedCache.stats()} for every cache in this process."""
+    with _registry_lock:
+        caches = list(_registry.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+def _gauges():
+    values = {}
+    for name, s in stats().items():
+        for field in ("entries", "bytes", "max_bytes", "hit_rate"):
+            values[f"{name}_cache_{field}"] = s[field]
+    return values
+
+
+tracing.register_gauges(_gauges)
+
+
+def format_stats():
+    lines = []
+    for name, s in sorted(stats().items()):
+        lines.append(
+            f"{name:<11} {s['policy']}  {s['entries']:>6} зап.  "
+            f"{s['bytes'] / MB:7.1f} / {s['max_bytes'] / MB:.0f} МБ  "
+            f"влучань {s['hit_rate']:.0%}  витіснено {s['evictions']}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+
+import database
+import tracing
+from providers import all_providers
+from records import Route
+from tracing import traced
+
+# Скільки найпопулярніших пар тримати готовими
+POPULAR_PAIRS = 300
+
+# Після цього запис перераховується фоновим планувальником...
+REFRESH_AFTER_S = 24 * 3600
+# ...а після цього вже не видається користувачу
+MAX_SERVE_AGE_S = 7 * 24 * 3600
+
+# Бюджет ORS-запитів на один прохід планувальника
+REFRESH_QUOTA = 200
+REFRESH_INTERVAL_S = 15 * 60
+
+# Геометрія не зберігається: карта завантажується при виборі маршруту
+_STORED_FIELDS = (
+    "mode", "time_min", "price", "distance_km", "transfers",
+    "description", "source", "profile", "start", "end", "score",
+)
+
+
+def _route_dict(route):
+    data = {name: route.get(name) for name in _STORED_FIELDS}
+    if route.get("legs"):
+        data["legs"] = [_route_dict(leg) for leg in route["legs"]]
+    return data
+
+
+def _route_from_dict(data):
+    route = Route.from_dict(data)
+    route.start = tuple(route.start) if route.start else None
+    route.end = tuple(route.end) if route.end else None
+    if route.legs:
+        route.legs = tuple(_route_from_dict(leg) for leg in route.legs)
+    return route
+
+
+def _dump(plan):
+    return json.dumps({
+        "routes": [_route_dict(r) for r in plan],
+        "pruned": plan.pruned,
+        "distance_km": plan.distance_km,
+    }, ensure_ascii=False)
+
+
+def _load(payload):
+    from route_engine import RoutePlan
+
+    data = json.loads(payload)
+    routes = [_route_from_dict(item) for item in data["routes"]]
+    return RoutePlan(routes, pruned=data["pruned"], distance_km=data["distance_km"])
+
+
+def lookup(origin, destination, max_age_s=MAX_SERVE_AGE_S, reverse=False):
+    """
+    Stored RoutePlan for the pair (fresh Route objects) or None.
+    reverse=True: if only destination → origin is stored, return that plan
+    reversed (route_engine.reverse_route), unless some route cannot be.
+    """
+    row = database.get_precomputed(origin, destination)
+    reversed_row = row is None and reverse
+    if reversed_row:
+        row = database.get_precomputed(destination, origin)
+    if row is None:
+        tracing.incr("precomputed_misses")
+        return None
+    payload, updated_at = row
+    if time.time() - updated_at > max_age_s:
+        tracing.incr("precomputed_stale")
+        return None
+    plan = _load(payload)
+    if reversed_row:
+        from route_engine import reverse_route
+
+        routes = [reverse_route(r) for r in plan]
+        if None in routes:
+            tracing.incr("precomputed_misses")
+            return None
+        plan[:] = routes
+        tracing.incr("precomputed_reversed")
+    tracing.incr("precomputed_hits")
+    return plan
+
+
+def ors_requests_per_pair():
+    """Upper bound of ORS requests one pair costs (directions + 2 geocodes)."""
+    return 2 + sum(p.cost.ors_requests for p in all_providers() if p.needs_network)
+
+
+@traced()
+def precompute_pair(origin, destination):
+    from route_engine import build_all_routes, rank_routes
+
+    plan = build_all_routes(origin, destination, with_geometry=False, use_precomputed=False,
+                            reuse_reverse=False)
+    ranked = rank_routes(plan)
+    plan[:] = ranked
+    database.save_precomputed(origin, destination, _dump(plan), time.time())
+    return plan
+
+
+def due_pairs(limit=POPULAR_PAIRS, refresh_after_s=REFRESH_AFTER_S, now=None):
+    """Popular pairs that are missing or older than refresh_after_s, most popular first."""
+    now = time.time() if now is None else now
+    ages = database.get_precomputed_ages()
+    due = []
+    for origin, destination, _ in database.get_popular_pairs(limit):
+        key = (database.place_key(origin), database.place_key(destination))
+        updated_at = ages.get(key)
+        if updated_at is None or now - updated_at > refresh_after_s:
+            due.append((origin, destination))
+    return due
+
+
+def refresh(limit=POPULAR_PAIRS, quota=REFRESH_QUOTA, refresh_after_s=REFRESH_AFTER_S,
+            stop_event=None):
+    """
+    Build missing/stale popular pairs until `quota` ORS requests are spent.
+    Returns (pairs refreshed, pairs left for the next run).
+    """
+    cost = ors_requests_per_pair()
+    due = due_pairs(limit, refresh_after_s)
+    done = 0
+    spent = 0
+    for origin, destination in due:
+        if spent + cost > quota or (stop_event is not None and stop_event.is_set()):
+            break
+        try:
+            precompute_pair(origin, destination)
+        except Exception:
+            tracing.incr("precompute_errors")  # місто зникло з геокодера тощо
+        else:
+            done += 1
+        spent += cost
+    tracing.incr("precomputed_pairs", done)
+    return done, len(due) - done
+
+
+class RefreshScheduler:
+    """Daemon thread that calls refresh() every `interval_s` seconds."""
+
+    def __init__(self, interval_s=REFRESH_INTERVAL_S, quota=REFRESH_QUOTA, limit=POPULAR_PAIRS):
+        self.interval_s = interval_s
+        self.quota = quota
+        self.limit = limit
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="precompute", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                refresh(self.limit, self.quota, stop_event=self._stop)
+            except Exception:
+                tracing.incr("precompute_errors")
+            self._stop.wait(self.interval_s)
@@ -0,0 +1,207 @@
+import cProfile
+import itertools
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+PROFILES_DIR = Path("profiles")
+SAMPLE_INTERVAL_S = 0.005
+DEFAULT_STALL_MS = 100
+
+# Увімкнений профайлер (None, якщо режим профілювання вимкнено)
+profiler = None
+
+
+def _slug(text):
+    return re.sub(r"[^\w]+", "_", text, flags=re.UNICODE).strip("_")[:60] or "search"
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread, and of every thread started after the
+    sampler (ThreadPoolExecutor workers of the search), every `interval`
+    seconds and keeps the counts in flamegraph.pl / speedscope collapsed
+    format.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        # Потоки, що вже працювали до пошуку (крім самого потоку пошуку), не його
+        self._ignored = set(sys._current_frames()) - {thread_id}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        self._ignored.add(threading.get_ident())
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in self._ignored:
+                    self.samples[";".join(_frame_stack(frame))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class _ThreadProfiles:
+    # cProfile бачить лише потік, що його ввімкнув: кожен новий потік під час
+    # пошуку отримує власний Profile (threading.setprofile), потім вони зливаються
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def hook(self, frame, event, arg):
+        prof = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(prof)
+        prof.enable()  # замінює цей хук у потоці
+
+    def stats(self, main):
+        stats = pstats.Stats(main)
+        with self._lock:
+            profiles = list(self.profiles)
+        for prof in profiles:
+            prof.disable()
+            stats.add(prof)
+        return stats
+
+
+class Profiler:
+    """
+    Per-search cProfile (the calling thread and the threads it starts)
+    and sampled stacks written to `out_dir`.
+    """
+
+    def __init__(self, out_dir=PROFILES_DIR, interval=SAMPLE_INTERVAL_S):
+        self.out_dir = Path(out_dir)
+        self.interval = interval
+        self._counter = itertools.count(1)
+
+    @contextmanager
+    def search(self, name):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        # Мілісекунди й лічильник: пошуки підряд не перезаписують профілі один одного
+        now = datetime.now()
+        stem = self.out_dir / (f"{now:%Y%m%d-%H%M%S}-{now.microsecond // 1000:03d}"
+                               f"-{next(self._counter)}_{_slug(name)}")
+
+        sampler = StackSampler(threading.get_ident(), self.interval).start()
+        workers = _ThreadProfiles()
+        threading.setprofile(workers.hook)
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield stem
+        finally:
+            prof.disable()
+            threading.setprofile(None)
+            sampler.stop()
+            workers.stats(prof).dump_stats(f"{stem}.prof")
+            Path(f"{stem}.collapsed").write_text(sampler.collapsed(), encoding="utf-8")
+
+
+def enable(out_dir=PROFILES_DIR, interval=SAMPLE_INTERVAL_S):
+    global profiler
+    profiler = Profiler(out_dir, interval)
+    return profiler
+
+
+def profile_search(name):
+    """Profile the enclosed block when profiling is on; no-op otherwise."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.search(name)
+
+
+class StallDetector:
+    """
+    Times every Tk callback (commands, bindings, `after` jobs) by wrapping
+    tkinter.CallWrapper. Callbacks that block the UI thread for more than
+    `threshold_ms` are logged together with the main-thread stack sampled
+    while the callback was still running.
+    """
+
+    def __init__(self, threshold_ms=DEFAULT_STALL_MS, log_path=PROFILES_DIR / "stalls.log"):
+        self.threshold = threshold_ms / 1000
+        self.log_path = Path(log_path)
+        self.main_thread_id = threading.get_ident()
+        self._running = None  # (func, started_at)
+        self._stack = None
+        self._stop = threading.Event()
+        self._original_call = None
+
+    def install(self):
+        import tkinter
+
+        detector = self
+        original = tkinter.CallWrapper.__call__
+        self._original_call = original
+
+        def timed_call(wrapper, *args):
+            # Вкладені колбеки (update_idletasks тощо) звітуються як частина зовнішнього
+            outer = detector._running
+            started = time.perf_counter()
+            detector._running = (wrapper.func, started)
+            if outer is None:
+                detector._stack = None
+            try:
+                return original(wrapper, *args)
+            finally:
+                detector._running = outer
+                elapsed = time.perf_counter() - started
+                if outer is None and elapsed > detector.threshold:
+                    detector._report(wrapper.func, elapsed)
+
+        tkinter.CallWrapper.__call__ = timed_call
+        threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+        return self
+
+    def uninstall(self):
+        import tkinter
+
+        self._stop.set()
+        if self._original_call is not None:
+            tkinter.CallWrapper.__call__ = self._original_call
+
+    def _watch(self):
+        # Стек знімається, поки колбек ще блокує UI, інакше видно лише вихід із нього
+        while not self._stop.wait(self.threshold / 2):
+            running = self._running
+            if running and self._stack is None and time.perf_counter() - running[1] > self.threshold:
+                frame = sys._current_frames().get(self.main_thread_id)
+                if frame is not None:
+                    self._stack = _frame_stack(frame)
+
+    def _report(self, func, elapsed):
+        name = getattr(func, "__qualname__", repr(func))
+        lines = [f"{datetime.now().isoformat()} stall {elapsed * 1000:.0f} ms in {name}"]
+        if self._stack:
+            lines.extend(f"    {entry}" for entry in self._stack)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+
+from records import Mode
+
+# Єдине джерело профілів ORS для режимів з реальною дорожньою мережею
+ORS_PROFILES = {
+    Mode.CAR: "driving-car",
+    Mode.BIKE: "cycling-regular",
+    Mode.WALK: "foot-walking",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class CostModel:
+    """Ticket/fuel price of a route and ORS quota it consumes."""
+
+    price_per_km: float = 0.0
+    base_price: float = 0.0
+    ors_requests: int = 0
+
+    def price(self, distance_km):
+        return round(self.base_price + distance_km * self.price_per_km, 2)
+
+
+@dataclass(frozen=True, slots=True)
+class Provider:
+    """
+    A transport mode the planner can build routes for.
+
+    build(origin, destination, **options) returns a Route. The planner uses
+    the capability metadata to decide which providers to call and in
+    which order; min/max_distance_km are the default straight-line
+    distance range at which the mode is worth trying at all (see
+    pruning.py), speed_kmh is used for haversine estimates. A symmetric
+    provider's route B→A is its route A→B reversed (route_engine.reverse_route).
+    """
+
+    mode: Mode
+    build: object
+    needs_network: bool
+    has_geometry: bool
+    typical_latency_s: float
+    cost: CostModel
+    profile: str = None
+    min_distance_km: float = None
+    max_distance_km: float = None
+    speed_kmh: float = None
+    symmetric: bool = False
+
+
+_registry = {}
+
+
+def register(provider):
+    _registry[provider.mode] = provider
+    return provider
+
+
+def register_provider(mode, **metadata):
+    """Decorator form of register() for route builder functions."""
+    def decorator(build):
+        register(Provider(mode=mode, build=build, **metadata))
+        return build
+    return decorator
+
+
+def unregister(mode):
+    return _registry.pop(mode, None)
+
+
+def get_provider(mode):
+    return _registry[Mode(mode)]
+
+
+def all_providers():
+    """Registered providers in registration order."""
+    return list(_registry.values())
+
+
+def execution_order(providers):
+    # Спершу дешеві (без мережі), далі мережеві — найповільніші першими,
+    # щоб вони стартували якомога раніше
+    local = [p for p in providers if not p.needs_network]
+    remote = sorted((p for p in providers if p.needs_network),
+                    key=lambda p: p.typical_latency_s, reverse=True)
+    return local + remote
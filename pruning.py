@@ -0,0 +1,128 @@
+import json
+import os
+import statistics
+from dataclasses import dataclass
+
+from records import Mode
+
+DROP = "drop"
+APPROXIMATE = "approximate"
+
+# Коефіцієнт звивистості дороги відносно прямої (для наближених маршрутів)
+ROAD_DETOUR = 1.3
+
+# Довше за це в дорозі режим вважається безглуздим (для навчання порогів)
+MAX_REASONABLE_MINUTES = {
+    Mode.WALK: 10 * 60,
+    Mode.BIKE: 2 * 10 * 60,
+}
+MIN_SAMPLES = 20
+
+# Необов'язковий JSON з правилами: {"Пішки": {"max_km": 60, "action": "approximate"}}
+RULES_FILE = os.getenv("MANDRUY_PRUNING_FILE")
+
+
+@dataclass(slots=True)
+class PruneRule:
+    min_km: float = None
+    max_km: float = None
+    action: str = DROP
+
+
+_overrides = {}
+_rules_file_loaded = False
+
+
+def configure(mode, min_km=None, max_km=None, action=DROP):
+    """Override the distance range of a mode (None = no bound)."""
+    if action not in (DROP, APPROXIMATE):
+        raise ValueError(f"Unknown pruning action: {action}")
+    _overrides[Mode(mode)] = PruneRule(min_km, max_km, action)
+
+
+def reset():
+    global _rules_file_loaded
+    _overrides.clear()
+    _rules_file_loaded = False
+
+
+def load_rules(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for mode, rule in data.items():
+        configure(mode, rule.get("min_km"), rule.get("max_km"), rule.get("action", DROP))
+
+
+def rule_for(provider):
+    global _rules_file_loaded
+    if RULES_FILE and not _rules_file_loaded:
+        _rules_file_loaded = True
+        load_rules(RULES_FILE)
+
+    rule = _overrides.get(provider.mode)
+    if rule is None:
+        rule = PruneRule(provider.min_distance_km, provider.max_distance_km, DROP)
+    return rule
+
+
+def check(provider, distance_km):
+    """None if the mode should be built, else (action, reason)."""
+    rule = rule_for(provider)
+    if rule.max_km is not None and distance_km > rule.max_km:
+        return rule.action, f"{distance_km:.0f} км > {rule.max_km:.0f} км"
+    if rule.min_km is not None and distance_km < rule.min_km:
+        # Наближення коротшого за мінімум маршруту (літак на 50 км) не має сенсу
+        return DROP, f"{distance_km:.0f} км < {rule.min_km:.0f} км"
+    return None
+
+
+def split_providers(providers, distance_km):
+    """
+    Returns (build, approximate, pruned): providers to build normally,
+    providers to replace with a haversine estimate, and report entries
+    {"mode", "action", "reason"} for everything not built normally.
+    """
+    build, approximate, pruned = [], [], []
+    for p in providers:
+        verdict = check(p, distance_km)
+        if verdict is None:
+            build.append(p)
+            continue
+        action, reason = verdict
+        if action == APPROXIMATE and p.speed_kmh:
+            approximate.append(p)
+        else:
+            action = DROP
+        pruned.append({"mode": p.mode, "action": action, "reason": reason})
+    return build, approximate, pruned
+
+
+def learn_thresholds(samples, max_minutes=None, min_samples=MIN_SAMPLES):
+    """
+    samples: (mode, distance_km, time_min) rows, e.g. from
+    database.get_mode_distance_samples(). For every mode with a
+    reasonable-time limit and enough data, the threshold is the distance
+    that median pace covers within that limit.
+    """
+    max_minutes = max_minutes or MAX_REASONABLE_MINUTES
+    paces = {}
+    for mode, distance_km, time_min in samples:
+        if distance_km and time_min:
+            paces.setdefault(mode, []).append(time_min / distance_km)
+
+    learned = {}
+    for mode, limit in max_minutes.items():
+        values = paces.get(str(mode), [])
+        if len(values) >= min_samples:
+            learned[Mode(mode)] = round(limit / statistics.median(values), 1)
+    return learned
+
+
+def learn_from_history(action=DROP, min_samples=MIN_SAMPLES):
+    """Fit max_km thresholds on saved routes and apply them."""
+    from database import get_mode_distance_samples
+
+    learned = learn_thresholds(get_mode_distance_samples(), min_samples=min_samples)
+    for mode, max_km in learned.items():
+        configure(mode, max_km=max_km, action=action)
+    return learned
@@ -0,0 +1,290 @@
+import csv
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import api
+import database
+import pruning
+import tracing
+from providers import all_providers
+from records import Mode
+from route_engine import (
+    BUS_SPEED_KMH, PLANE_OVERHEAD_MIN, PLANE_SPEED_KMH, TRAIN_SPEED_KMH,
+    bus_route, haversine_km, plane_route, train_route,
+)
+from tracing import traced
+
+# Локальний список міст: CSV "назва,lon,lat"; MANDRUY_PLACES_FILE — свій список
+PLACES_FILE = os.getenv("MANDRUY_PLACES_FILE", str(Path(__file__).resolve().parent / "places.csv"))
+
+# Дорогою можна їхати швидше за типову швидкість режиму: у матрицю ORS
+# ідуть лише міста, до яких з таким запасом швидкості вкладаємося в бюджет
+ROAD_SPEED_MARGIN = 1.6
+# Ближче за це — те саме місто, що й відправлення
+SAME_PLACE_KM = 1.0
+
+# Mock-режими: (швидкість по прямій, фіксовані хвилини) — як у route_engine
+MOCK_MODELS = {
+    Mode.PLANE: (PLANE_SPEED_KMH, PLANE_OVERHEAD_MIN),
+    Mode.TRAIN: (TRAIN_SPEED_KMH, 0),
+    Mode.BUS: (BUS_SPEED_KMH, 0),
+}
+_MOCK_ROUTES = {Mode.PLANE: plane_route, Mode.TRAIN: train_route, Mode.BUS: bus_route}
+
+_places = None
+
+
+@dataclass(frozen=True, slots=True)
+class Place:
+    name: str
+    lon: float
+    lat: float
+
+
+@dataclass(slots=True)
+class Reachable:
+    """Best way to get to one place within the budgets."""
+
+    place: Place
+    mode: Mode
+    time_min: int
+    price: float
+    distance_km: float
+    # True — дорожній час оцінено по прямій (ORS недоступний або вимкнений)
+    estimated: bool = False
+
+
+class ReachResult(list):
+    """
+    Reachable places plus `ors_errors`: {profile: error} of the road
+    profiles that were estimated from straight lines because ORS failed.
+    """
+
+    def __init__(self, items=(), ors_errors=None):
+        super().__init__(items)
+        self.ors_errors = ors_errors or {}
+
+
+def load_places(path=None):
+    """
+    Places from the CSV list plus everything geocoded in this process,
+    deduplicated by name.
+    """
+    global _places
+    if path is not None or _places is None:
+        places = []
+        with open(path or PLACES_FILE, encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if not row or row[0].lstrip().startswith("#"):
+                    continue
+                places.append(Place(row[0].strip(), float(row[1]), float(row[2])))
+        if path is not None:
+            return places
+        _places = places
+
+    seen = {database.place_key(p.name) for p in _places}
+    places = list(_places)
+    for lon, lat, label in api.cached_locations():
+        # "Kyiv, Ukraine" -> "Kyiv"
+        name = label.split(",")[0].strip()
+        if database.place_key(name) not in seen:
+            seen.add(database.place_key(name))
+            places.append(Place(name, lon, lat))
+    return places
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _prices(np, cost, distance_km):
+    # CostModel.price для масиву відстаней
+    return np.round(cost.base_price + distance_km * cost.price_per_km, 2)
+
+
+def _road_bound(provider, straight_km):
+    # Нижні межі часу й ціни дорожнього маршруту: дорога не коротша за пряму
+    return (straight_km / (provider.speed_kmh * ROAD_SPEED_MARGIN) * 60,
+            provider.cost.base_price + straight_km * provider.cost.price_per_km)
+
+
+def _road_summaries(provider, start, ends, use_ors, errors):
+    """
+    [(duration_min, distance_km) | None] per end and whether they are
+    estimates; an ORS failure is recorded in errors[profile].
+    """
+    if use_ors:
+        try:
+            summaries = api.get_route_summaries(start, ends, provider.profile)
+        except (RuntimeError, OSError) as e:
+            tracing.incr("reachability_ors_failures")
+            errors[provider.profile] = e
+        else:
+            return [
+                None if s is None else (s["duration_s"] / 60, s["distance_m"] / 1000)
+                for s in summaries
+            ], False
+
+    tracing.incr("reachability_estimated", len(ends))
+    result = []
+    for lon, lat in ends:
+        road_km = haversine_km(*start, lon, lat) * pruning.ROAD_DETOUR
+        result.append((road_km / provider.speed_kmh * 60, road_km))
+    return result, True
+
+
+def _mode_in_range(provider, straight_km):
+    rule = pruning.rule_for(provider)
+    return ((rule.min_km is None or straight_km >= rule.min_km)
+            and (rule.max_km is None or straight_km <= rule.max_km))
+
+
+def _reachable_numpy(np, start, places, providers, max_time, max_price, use_ors, errors):
+    lons = np.fromiter((p.lon for p in places), float, len(places))
+    lats = np.fromiter((p.lat for p in places), float, len(places))
+    lon1, lat1 = np.radians(start[0]), np.radians(start[1])
+    lon2, lat2 = np.radians(lons), np.radians(lats)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    straight = 2 * 6371 * np.arcsin(np.sqrt(a))
+
+    shape = (len(providers), len(places))
+    times = np.full(shape, np.inf)
+    prices = np.full(shape, np.inf)
+    distances = np.zeros(shape)
+    estimated = np.zeros(shape, dtype=bool)
+    usable = straight >= SAME_PLACE_KM
+
+    for k, provider in enumerate(providers):
+        rule = pruning.rule_for(provider)
+        mask = usable.copy()
+        if rule.min_km is not None:
+            mask &= straight >= rule.min_km
+        if rule.max_km is not None:
+            mask &= straight <= rule.max_km
+
+        if provider.mode in MOCK_MODELS:
+            speed, overhead = MOCK_MODELS[provider.mode]
+            idx = np.flatnonzero(mask)
+            times[k, idx] = np.floor(straight[idx] / speed * 60 + overhead)
+            prices[k, idx] = _prices(np, provider.cost, straight[idx])
+            distances[k, idx] = straight[idx]
+        elif provider.profile:
+            low_time, low_price = _road_bound(provider, straight)
+            idx = np.flatnonzero(mask & (low_time <= max_time) & (low_price <= max_price))
+            if not len(idx):
+                continue
+            summaries, approx = _road_summaries(
+                provider, start, list(zip(lons[idx].tolist(), lats[idx].tolist())), use_ors,
+                errors,
+            )
+            found = [(i, s) for i, s in zip(idx.tolist(), summaries) if s is not None]
+            if not found:
+                continue
+            found_idx = np.fromiter((i for i, _ in found), int, len(found))
+            road_km = np.fromiter((s[1] for _, s in found), float, len(found))
+            times[k, found_idx] = np.floor([s[0] for _, s in found])
+            prices[k, found_idx] = _prices(np, provider.cost, road_km)
+            distances[k, found_idx] = road_km
+            estimated[k, found_idx] = approx
+
+    times[(times > max_time) | (prices > max_price)] = np.inf
+    # Найшвидший режим для кожного міста, за рівного часу — дешевший
+    order = np.lexsort((prices, times), axis=0)[0]
+    cols = np.arange(len(places))
+    best_time = times[order, cols]
+
+    result = []
+    for i in np.flatnonzero(np.isfinite(best_time)).tolist():
+        k = order[i]
+        result.append(Reachable(
+            place=places[i],
+            mode=providers[k].mode,
+            time_min=int(times[k, i]),
+            price=float(prices[k, i]),
+            distance_km=round(float(distances[k, i]), 1),
+            estimated=bool(estimated[k, i]),
+        ))
+    return result
+
+
+def _reachable_python(start, places, providers, max_time, max_price, use_ors, errors):
+    straight = [haversine_km(*start, p.lon, p.lat) for p in places]
+    best = {}
+
+    def offer(i, option):
+        if option.time_min <= max_time and option.price <= max_price:
+            current = best.get(i)
+            if current is None or (option.time_min, option.price) < (current.time_min, current.price):
+                best[i] = option
+
+    for provider in providers:
+        idx = [
+            i for i, km in enumerate(straight)
+            if km >= SAME_PLACE_KM and _mode_in_range(provider, km)
+        ]
+        if provider.mode in _MOCK_ROUTES:
+            build = _MOCK_ROUTES[provider.mode]
+            for i in idx:
+                route = build(start, (places[i].lon, places[i].lat))
+                offer(i, Reachable(places[i], provider.mode, route.time_min, route.price,
+                                   route.distance_km))
+        elif provider.profile:
+            idx = [
+                i for i in idx
+                if all(b <= limit for b, limit in
+                       zip(_road_bound(provider, straight[i]), (max_time, max_price)))
+            ]
+            if not idx:
+                continue
+            summaries, approx = _road_summaries(
+                provider, start, [(places[i].lon, places[i].lat) for i in idx], use_ors, errors,
+            )
+            for i, summary in zip(idx, summaries):
+                if summary is not None:
+                    time_min, road_km = summary
+                    offer(i, Reachable(places[i], provider.mode, int(time_min),
+                                       provider.cost.price(road_km), round(road_km, 1), approx))
+    return list(best.values())
+
+
+@traced()
+def reachable(origin, max_time_min=None, max_price=None, places=None, modes=None,
+              limit=None, use_ors=True):
+    """
+    Places from the local list reachable from `origin` within the time
+    (minutes) and price (€) budgets: the best mode for each, fastest first.
+    Plane/train/bus are evaluated from straight-line distances; each road
+    profile costs one ORS matrix request, only for places it can reach
+    within the budgets at all (use_ors=False: haversine estimates).
+    Returns a ReachResult; profiles ORS failed for are in its ors_errors.
+    """
+    places = load_places() if places is None else places
+    key = database.place_key(origin)
+    known = next((p for p in places if database.place_key(p.name) == key), None)
+    slon, slat = (known.lon, known.lat) if known else api.geocode(origin)[:2]
+    providers = [
+        p for p in all_providers()
+        if (modes is None or p.mode in modes) and (p.mode in MOCK_MODELS or p.profile)
+    ]
+    max_time = math.inf if max_time_min is None else max_time_min
+    max_price = math.inf if max_price is None else max_price
+
+    errors = {}
+    np = _numpy()
+    with tracing.span("reachability", places=len(places), vectorized=np is not None):
+        if np is not None and places:
+            result = _reachable_numpy(np, (slon, slat), places, providers,
+                                      max_time, max_price, use_ors, errors)
+        else:
+            result = _reachable_python((slon, slat), places, providers,
+                                       max_time, max_price, use_ors, errors)
+
+    result.sort(key=lambda r: (r.time_min, r.price, r.place.name))
+    return ReachResult(result[:limit] if limit else result, ors_errors=errors)
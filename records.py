@@ -0,0 +1,172 @@
+import sys
+from array import array
+from dataclasses import dataclass, fields
+from enum import Enum
+
+
+class _StrEnum(str, Enum):
+    # Поводиться як звичайний рядок у f-рядках, SQLite і JSON
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+
+class Mode(_StrEnum):
+    CAR = "Авто"
+    BIKE = "Велосипед"
+    WALK = "Пішки"
+    TRAIN = "Потяг"
+    BUS = "Автобус"
+    PLANE = "Літак"
+    MULTI = "Комбінований"
+
+
+class Source(_StrEnum):
+    ORS = "OpenRouteService"
+    AVIATION = "Mock Aviation API"
+    RAIL = "Mock Rail API"
+    BUS = "Mock Bus API"
+    ESTIMATE = "Haversine estimate"
+    REVERSE = "Reverse of cached route"
+    ITINERARY = "Multi-leg itinerary"
+
+
+def _as_enum(enum_cls, value):
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return sys.intern(str(value))
+
+
+@dataclass(slots=True)
+class Route:
+    """
+    One route option. Supports the dict-style access the rest of the app
+    uses (route["mode"], route.get("geometry"), route["score"] = ...).
+    """
+
+    mode: Mode
+    time_min: int
+    price: float
+    distance_km: float
+    transfers: int
+    description: str
+    source: Source
+    geometry: dict = None
+    profile: str = None
+    start: tuple = None
+    end: tuple = None
+    score: float = None
+    # (low, high) хвилин, якщо час — оцінка моделі, а не відповідь ORS
+    time_range: tuple = None
+    # Ділянки комбінованого маршруту (itinerary.py), кожна — окремий Route
+    legs: tuple = None
+    # Запитаний час відправлення (datetime) і очікування рейсу за розкладом, хв
+    departure: object = None
+    wait_min: int = 0
+
+    # ===== dict adapters =====
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        # Як у словнику маршруту: поле без значення (None) — відсутній ключ
+        return getattr(self, key, None) is not None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return ROUTE_FIELDS
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in ROUTE_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        kwargs = {name: data[name] for name in ROUTE_FIELDS if name in data}
+        kwargs["mode"] = _as_enum(Mode, kwargs["mode"])
+        kwargs["source"] = _as_enum(Source, kwargs.get("source", ""))
+        return cls(**kwargs)
+
+
+ROUTE_FIELDS = tuple(f.name for f in fields(Route))
+
+
+class RouteBatch:
+    """
+    Columnar container for many routes (memory footprint, see
+    benchmarks/bench_memory.py): one typed array per numeric field and
+    small integer codes for mode and source. Values outside the enums are
+    coded like the enum members, so anything Route.from_dict accepts fits.
+    Geometry is not stored; descriptions are optional.
+    """
+
+    def __init__(self, keep_descriptions=False):
+        # Коди режимів і джерел: спершу члени enum, далі довільні рядки в порядку появи
+        self.modes = list(Mode)
+        self.sources = list(Source)
+        self._codes = {
+            "mode": {v: i for i, v in enumerate(self.modes)},
+            "source": {v: i for i, v in enumerate(self.sources)},
+        }
+        self.mode = array("B")
+        self.source = array("B")
+        self.time_min = array("i")
+        self.price = array("d")
+        self.distance_km = array("d")
+        self.transfers = array("b")
+        self.score = array("d")
+        self.descriptions = [] if keep_descriptions else None
+
+    def __len__(self):
+        return len(self.mode)
+
+    def _code(self, name, values, enum_cls, value):
+        codes = self._codes[name]
+        value = _as_enum(enum_cls, value)
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, route):
+        self.mode.append(self._code("mode", self.modes, Mode, route["mode"]))
+        self.source.append(self._code("source", self.sources, Source, route.get("source", "")))
+        self.time_min.append(int(route["time_min"]))
+        self.price.append(float(route["price"]))
+        self.distance_km.append(float(route["distance_km"]))
+        self.transfers.append(int(route["transfers"]))
+        score = route.get("score")
+        self.score.append(float("nan") if score is None else float(score))
+        if self.descriptions is not None:
+            self.descriptions.append(route["description"])
+
+    def extend(self, routes):
+        for r in routes:
+            self.append(r)
+
+    @classmethod
+    def from_routes(cls, routes, keep_descriptions=False):
+        batch = cls(keep_descriptions)
+        batch.extend(routes)
+        return batch
+
+    def nbytes(self):
+        total = sum(
+            col.itemsize * len(col)
+            for col in (self.mode, self.source, self.time_min, self.price,
+                        self.distance_km, self.transfers, self.score)
+        )
+        if self.descriptions is not None:
+            total += sys.getsizeof(self.descriptions)
+        return total
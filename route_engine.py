@@ -1,5 +1,51 @@
 import math
-from api import geocode, get_route
+import threading
+
+import api
+import pruning
+import tracing
+from api import geocode, get_route, get_route_summary
+from providers import (
+    ORS_PROFILES, CostModel, all_providers, execution_order, get_provider, register_provider,
+)
+from records import Mode, Route, Source
+from tracing import traced
+
+CAR_COST = CostModel(price_per_km=0.10, ors_requests=1)
+BIKE_COST = CostModel(ors_requests=1)
+WALK_COST = CostModel(ors_requests=1)
+PLANE_COST = CostModel(price_per_km=0.12)
+TRAIN_COST = CostModel(price_per_km=0.08)
+BUS_COST = CostModel(price_per_km=0.05)
+
+# Моделі mock API: швидкість по прямій (+ реєстрація й посадка для літака)
+PLANE_SPEED_KMH = 700
+PLANE_OVERHEAD_MIN = 90
+TRAIN_SPEED_KMH = 130
+TRAIN_DIRECT_MAX_KM = 600
+BUS_SPEED_KMH = 80
+# Розклад mock-режимів: перше відправлення (хв від півночі) та інтервал, хв
+TIMETABLES = {
+    Mode.PLANE: (6 * 60, 180),
+    Mode.TRAIN: (5 * 60, 120),
+    Mode.BUS: (6 * 60, 60),
+}
+
+# Скільки ORS-запитів build_all_routes робить паралельно
+MAX_PARALLEL_REQUESTS = 4
+
+# Геометрія завантажується по одній, щоб попереднє завантаження
+# і вибір тієї ж картки не робили два однакові запити
+_geometry_lock = threading.Lock()
+
+# Позначка в описі маршруту, час якого оцінено моделлю (estimator.py)
+ESTIMATE_SUFFIX = " (≈ за історією)"
+# ... оцінено по прямій (pruning.py)
+APPROXIMATE_SUFFIX = " (орієнтовно)"
+# ... взято з маршруту у зворотному напрямку, поки ORS не підтвердить
+REVERSE_SUFFIX = " (≈ як у зворотному напрямку)"
+# Дорога назад буває довшою (одностороння забудова, розв'язки): ± до часу
+REVERSE_MARGIN = 0.15
 
 def haversine_km(lon1, lat1, lon2, lat2):
     R = 6371  # км
@@ -14,127 +60,555 @@ def haversine_km(lon1, lat1, lon2, lat2):
     )
     return 2 * R * math.asin(math.sqrt(a))
 
-def build_ors_route(origin, destination, profile, mode_name, speed_kmh, price_per_km):
+def wait_minutes(mode, departure):
+    """Minutes from `departure` until the next scheduled run of a mock mode."""
+    if departure is None or mode not in TIMETABLES:
+        return 0
+    first, headway = TIMETABLES[mode]
+    now = departure.hour * 60 + departure.minute + departure.second / 60
+    if now <= first:
+        return math.ceil(first - now)
+    following = first + math.ceil((now - first) / headway) * headway
+    if following >= 24 * 60:
+        following = 24 * 60 + first  # останній рейс уже пішов: перший завтрашній
+    return math.ceil(following - now)
+
+class RoutePlan(list):
+    """
+    List of built routes plus `pruned`: the modes that were skipped or
+    replaced by an estimate before any directions request, and why.
+    """
+
+    def __init__(self, routes=(), pruned=None, distance_km=None):
+        super().__init__(routes)
+        self.pruned = pruned or []
+        self.distance_km = distance_km
+
+
+def approximate_route(provider, origin, destination, start, end, dist):
+    # Оцінка без ORS: пряма × звивистість дороги на типовій швидкості режиму
+    road_km = dist * pruning.ROAD_DETOUR
+    return Route(
+        mode=provider.mode,
+        time_min=int(road_km / provider.speed_kmh * 60),
+        price=provider.cost.price(road_km),
+        distance_km=round(road_km, 1),
+        transfers=0,
+        description=f"{origin} → {destination}{APPROXIMATE_SUFFIX}",
+        geometry=None,
+        start=start,
+        end=end,
+        source=Source.ESTIMATE
+    )
+
+
+def estimated_route(provider, origin, destination, start, end, estimate):
+    # Оцінка навченої моделі (estimator.py): ORS підтвердить, якщо маршрут оберуть
+    return Route(
+        mode=provider.mode,
+        time_min=estimate.time_min,
+        price=provider.cost.price(estimate.distance_km),
+        distance_km=estimate.distance_km,
+        transfers=0,
+        description=f"{origin} → {destination}{ESTIMATE_SUFFIX}",
+        geometry=None,
+        profile=provider.profile,
+        start=start,
+        end=end,
+        source=Source.ESTIMATE,
+        time_range=(estimate.time_low, estimate.time_high)
+    )
+
+
+def _split_suffix(description):
+    for suffix in (ESTIMATE_SUFFIX, APPROXIMATE_SUFFIX, REVERSE_SUFFIX):
+        if description.endswith(suffix):
+            return description.removesuffix(suffix), suffix
+    return description, ""
+
+
+def _reverse_description(description, suffix=None):
+    # "A → B (…)" -> "B → A (…)"; описи без напрямку ("Прямий поїзд") не змінюються
+    text, old_suffix = _split_suffix(description)
+    parts = text.split(" → ")
+    if len(parts) == 2:
+        text = f"{parts[1]} → {parts[0]}"
+    return text + (old_suffix if suffix is None else suffix)
+
+
+def _reverse_margin(time_min):
+    return int(time_min * (1 - REVERSE_MARGIN)), math.ceil(time_min * (1 + REVERSE_MARGIN))
+
+
+def reverse_route(route):
+    """
+    The route B→A built from a stored route A→B, or None if it cannot be
+    reused. Symmetric providers (plane, train, bus) and estimates are
+    reversed as is; an ORS road route becomes a REVERSE placeholder with
+    time_range ±REVERSE_MARGIN that confirm_route() replaces.
+    """
+    source = route["source"]
+    changes = {
+        "start": route["end"],
+        "end": route["start"],
+        "description": _reverse_description(route["description"]),
+    }
+    if route.get("geometry"):
+        geometry = route["geometry"]
+        changes["geometry"] = {
+            **geometry, "coordinates": list(reversed(geometry.get("coordinates") or [])),
+        }
+
+    if route.get("legs"):
+        from itinerary import describe
+
+        legs = [reverse_route(leg) for leg in reversed(route["legs"])]
+        if None in legs:
+            return None
+        approximate = any(leg["source"] == Source.REVERSE for leg in legs)
+        changes["legs"] = tuple(legs)
+        changes["description"] = describe(legs) + (REVERSE_SUFFIX if approximate else "")
+    elif source == Source.ORS and route.get("profile"):
+        changes["source"] = Source.REVERSE
+        changes["description"] = _reverse_description(route["description"], REVERSE_SUFFIX)
+        changes["time_range"] = _reverse_margin(route["time_min"])
+    elif source not in (Source.ESTIMATE, Source.REVERSE):
+        try:
+            if not get_provider(route["mode"]).symmetric:
+                return None
+        except (KeyError, ValueError):
+            return None
+
+    reversed_route = Route.from_dict(route.to_dict() if isinstance(route, Route) else route)
+    for name, value in changes.items():
+        reversed_route[name] = value
+    return reversed_route
+
+
+def reverse_placeholder(provider, origin, destination, start, end, departure=None):
+    """
+    REVERSE placeholder for a road mode whose route end→start is in the
+    api caches while start→end is not; None otherwise.
+    """
+    if (not provider.profile
+            or api.cached_route(start, end, provider.profile, departure) is not None):
+        return None
+    cached = api.cached_route(end, start, provider.profile, departure)
+    if cached is None:
+        return None
+    dist_km = cached["distance_m"] / 1000
+    time_min = int(cached["duration_s"] / 60)
+    return Route(
+        mode=provider.mode,
+        time_min=time_min,
+        price=provider.cost.price(dist_km),
+        distance_km=round(dist_km, 1),
+        transfers=0,
+        description=f"{origin} → {destination}{REVERSE_SUFFIX}",
+        geometry=None,
+        profile=provider.profile,
+        start=start,
+        end=end,
+        source=Source.REVERSE,
+        time_range=_reverse_margin(time_min),
+        departure=departure
+    )
+
+
+def build_ors_route(origin, destination, profile, mode_name, speed_kmh, cost,
+                    with_geometry=True, departure=None):
     slon, slat, _ = geocode(origin)
     elon, elat, _ = geocode(destination)
 
-    result = get_route((slon, slat), (elon, elat), profile)
+    if with_geometry:
+        result = get_route((slon, slat), (elon, elat), profile, departure)
+    else:
+        result = {**get_route_summary((slon, slat), (elon, elat), profile, departure),
+                  "geometry": None}
 
     dist_km = result["distance_m"] / 1000
     time_min = int(result["duration_s"] / 60)
 
-    return {
-        "mode": mode_name,
-        "time_min": time_min,
-        "price": round(dist_km * price_per_km, 2),
-        "distance_km": round(dist_km, 1),
-        "transfers": 0,
-        "description": f"{origin} → {destination}",
-        "geometry": result["geometry"],
-        "start": (slon, slat),
-        "end": (elon, elat),
-        "source": "OpenRouteService"
-    }
+    return Route(
+        mode=mode_name,
+        time_min=time_min,
+        price=cost.price(dist_km),
+        distance_km=round(dist_km, 1),
+        transfers=0,
+        description=f"{origin} → {destination}",
+        geometry=result["geometry"],
+        profile=profile,
+        start=(slon, slat),
+        end=(elon, elat),
+        source=Source.ORS,
+        departure=departure
+    )
 
-def build_car_route(origin, destination):
+@register_provider(
+    Mode.CAR, needs_network=True, has_geometry=True, typical_latency_s=1.0,
+    cost=CAR_COST, profile=ORS_PROFILES[Mode.CAR], speed_kmh=80,
+)
+@traced()
+def build_car_route(origin, destination, with_geometry=True, departure=None):
     return build_ors_route(
         origin,
         destination,
-        profile="driving-car",
-        mode_name="Авто",
+        profile=ORS_PROFILES[Mode.CAR],
+        mode_name=Mode.CAR,
         speed_kmh=80,
-        price_per_km=0.10
+        cost=CAR_COST,
+        with_geometry=with_geometry,
+        departure=departure
     )
 
-def build_bike_route(origin, destination):
+@register_provider(
+    Mode.BIKE, needs_network=True, has_geometry=True, typical_latency_s=1.5,
+    cost=BIKE_COST, profile=ORS_PROFILES[Mode.BIKE], max_distance_km=500, speed_kmh=15,
+)
+@traced()
+def build_bike_route(origin, destination, with_geometry=True, departure=None):
     return build_ors_route(
         origin,
         destination,
-        profile="cycling-regular",
-        mode_name="Велосипед",
+        profile=ORS_PROFILES[Mode.BIKE],
+        mode_name=Mode.BIKE,
         speed_kmh=15,
-        price_per_km=0.0
+        cost=BIKE_COST,
+        with_geometry=with_geometry,
+        departure=departure
     )
 
-def build_walk_route(origin, destination):
+@register_provider(
+    Mode.WALK, needs_network=True, has_geometry=True, typical_latency_s=2.0,
+    cost=WALK_COST, profile=ORS_PROFILES[Mode.WALK], max_distance_km=100, speed_kmh=5,
+)
+@traced()
+def build_walk_route(origin, destination, with_geometry=True, departure=None):
     return build_ors_route(
         origin,
         destination,
-        profile="foot-walking",
-        mode_name="Пішки",
+        profile=ORS_PROFILES[Mode.WALK],
+        mode_name=Mode.WALK,
         speed_kmh=5,
-        price_per_km=0.0
+        cost=WALK_COST,
+        with_geometry=with_geometry,
+        departure=departure
+    )
+
+def plane_route(start, end, departure=None):
+    """Direct flight between two (lon, lat) points (mock aviation API)."""
+    dist = haversine_km(*start[:2], *end[:2])
+    return Route(
+        mode=Mode.PLANE,
+        time_min=int(dist / PLANE_SPEED_KMH * 60 + PLANE_OVERHEAD_MIN),
+        price=PLANE_COST.price(dist),
+        distance_km=round(dist, 1),
+        transfers=0,
+        description="Прямий авіарейс",
+        geometry=None,
+        start=start,
+        end=end,
+        source=Source.AVIATION,
+        departure=departure,
+        wait_min=wait_minutes(Mode.PLANE, departure)
+    )
+
+
+def train_route(start, end, departure=None):
+    """Train between two (lon, lat) points (mock rail API)."""
+    dist = haversine_km(*start[:2], *end[:2])
+    transfers = 0 if dist < TRAIN_DIRECT_MAX_KM else 1
+
+    return Route(
+        mode=Mode.TRAIN,
+        time_min=int(dist / TRAIN_SPEED_KMH * 60),
+        price=TRAIN_COST.price(dist),
+        distance_km=round(dist, 1),
+        transfers=transfers,
+        description="Прямий поїзд" if transfers == 0 else "Маршрут з пересадкою",
+        geometry=None,
+        start=start,
+        end=end,
+        source=Source.RAIL,
+        departure=departure,
+        wait_min=wait_minutes(Mode.TRAIN, departure)
     )
 
-def build_plane_route(origin, destination):
+
+def bus_route(start, end, departure=None):
+    """Bus between two (lon, lat) points (mock bus API)."""
+    dist = haversine_km(*start[:2], *end[:2])
+
+    return Route(
+        mode=Mode.BUS,
+        time_min=int(dist / BUS_SPEED_KMH * 60),
+        price=BUS_COST.price(dist),
+        distance_km=round(dist, 1),
+        transfers=1,
+        description="Маршрут з пересадкою",
+        geometry=None,
+        start=start,
+        end=end,
+        source=Source.BUS,
+        departure=departure,
+        wait_min=wait_minutes(Mode.BUS, departure)
+    )
+
+
+@register_provider(
+    Mode.PLANE, needs_network=False, has_geometry=False, typical_latency_s=0.0,
+    cost=PLANE_COST, min_distance_km=150, symmetric=True,
+)
+@traced()
+def build_plane_route(origin, destination, departure=None):
     slon, slat, _ = geocode(origin)
     elon, elat, _ = geocode(destination)
-    dist = haversine_km(slon, slat, elon, elat)
+    return plane_route((slon, slat), (elon, elat), departure)
 
-    return {
-        "mode": "Літак",
-        "time_min": int(dist / 700 * 60 + 90),
-        "price": round(dist * 0.12, 2),
-        "distance_km": round(dist, 1),
-        "transfers": 0,
-        "description": "Прямий авіарейс",
-        "geometry": None,
-        "source": "Mock Aviation API"
-    }
+@register_provider(
+    Mode.TRAIN, needs_network=False, has_geometry=False, typical_latency_s=0.0,
+    cost=TRAIN_COST, symmetric=True,
+)
+@traced()
+def build_train_route(origin, destination, departure=None):
+    slon, slat, _ = geocode(origin)
+    elon, elat, _ = geocode(destination)
+    return train_route((slon, slat), (elon, elat), departure)
 
-def build_train_route(origin, destination):
+@register_provider(
+    Mode.BUS, needs_network=False, has_geometry=False, typical_latency_s=0.0,
+    cost=BUS_COST, symmetric=True,
+)
+@traced()
+def build_bus_route(origin, destination, departure=None):
     slon, slat, _ = geocode(origin)
     elon, elat, _ = geocode(destination)
-    dist = haversine_km(slon, slat, elon, elat)
+    return bus_route((slon, slat), (elon, elat), departure)
 
-    transfers = 0 if dist < 600 else 1
-
-    return {
-        "mode": "Потяг",
-        "time_min": int(dist / 130 * 60),
-        "price": round(dist * 0.08, 2),
-        "distance_km": round(dist, 1),
-        "transfers": transfers,
-        "description": "Прямий поїзд" if transfers == 0 else "Маршрут з пересадкою",
-        "geometry": None,
-        "source": "Mock Rail API"
-    }
+@traced()
+def build_all_routes(origin, destination, with_geometry=True, estimator=None,
+                     use_precomputed=True, with_itineraries=True, departure=None,
+                     reuse_reverse=True):
+    """
+    Builds a route for every registered provider that makes sense for the
+    straight-line distance between the cities (see pruning.py); modes out
+    of range are dropped or replaced by a haversine estimate, and the
+    returned RoutePlan lists them in `pruned`. Local (mock) providers run
+    first; network providers run in parallel, slowest submitted first.
+
+    with_geometry=False: summary-only planning. Car, bike and walk routes
+    get distance/duration from the ORS matrix and geometry=None; call
+    ensure_geometry() when the map of a route is actually needed.
+
+    estimator: a fitted estimator.TravelTimeEstimator. Network modes it has
+    a model for are estimated locally (source ESTIMATE, time_range set)
+    instead of calling ORS; confirm_route() replaces the estimate.
+
+    use_precomputed: popular pairs kept by precompute.py are returned from
+    mandruy.db as is (already ranked, no geometry) without network calls.
+
+    with_itineraries: also add multi-leg routes through airports and
+    stations (itinerary.py) that no direct route beats outright.
+
+    departure: datetime of departure. Car times come from ORS for that
+    time (api.DEPARTURE_BUCKET_S buckets), timetable modes get wait_min
+    until their next run, and rank_routes() counts the wait. Precomputed
+    plans are time-independent and are not used then.
+
+    reuse_reverse: a return trip reuses the opposite direction — the
+    precomputed plan B→A reversed, and road routes B→A from the api caches
+    as REVERSE placeholders (time_range ±REVERSE_MARGIN) instead of
+    directions requests; confirm_route() fetches the real route.
+    """
+    if use_precomputed and departure is None:
+        import precompute
+
+        plan = precompute.lookup(origin, destination, reverse=reuse_reverse)
+        if plan is not None:
+            if with_geometry:
+                for route in plan:
+                    ensure_geometry(route)
+            return plan
 
-def build_bus_route(origin, destination):
     slon, slat, _ = geocode(origin)
     elon, elat, _ = geocode(destination)
     dist = haversine_km(slon, slat, elon, elat)
 
-    return {
-        "mode": "Автобус",
-        "time_min": int(dist / 80 * 60),
-        "price": round(dist * 0.05, 2),
-        "distance_km": round(dist, 1),
-        "transfers": 1,
-        "description": "Маршрут з пересадкою",
-        "geometry": None,
-        "source": "Mock Bus API"
-    }
+    providers = all_providers()
+    to_build, to_approximate, pruned = pruning.split_providers(providers, dist)
+    ordered = execution_order(to_build)
+
+    options = {} if departure is None else {"departure": departure}
+
+    def build(p):
+        if p.has_geometry:
+            return p.build(origin, destination, with_geometry=with_geometry, **options)
+        return p.build(origin, destination, **options)
+
+    results = {p.mode: build(p) for p in ordered if not p.needs_network}
+    for p in to_approximate:
+        results[p.mode] = approximate_route(p, origin, destination, (slon, slat), (elon, elat), dist)
+
+    remote = [p for p in ordered if p.needs_network]
+    if reuse_reverse:
+        pending = []
+        for p in remote:
+            route = reverse_placeholder(p, origin, destination, (slon, slat), (elon, elat), departure)
+            if route is None:
+                pending.append(p)
+            else:
+                results[p.mode] = route
+        if len(pending) < len(remote):
+            tracing.incr("modes_reversed", len(remote) - len(pending))
+        remote = pending
+
+    if estimator is not None:
+        pending = []
+        for p in remote:
+            estimate = estimator.estimate(p.mode, (slon, slat), (elon, elat))
+            if estimate is None:
+                pending.append(p)
+            else:
+                results[p.mode] = estimated_route(
+                    p, origin, destination, (slon, slat), (elon, elat), estimate
+                )
+        if len(pending) < len(remote):
+            tracing.incr("modes_estimated", len(remote) - len(pending))
+        remote = pending
+
+    if remote:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_REQUESTS, len(remote))) as pool:
+            futures = {p.mode: pool.submit(build, p) for p in remote}
+            for mode, future in futures.items():
+                results[mode] = future.result()
+
+    if pruned:
+        tracing.incr("modes_pruned", len(pruned))
+    routes = [results[p.mode] for p in providers if p.mode in results]
+
+    if with_itineraries:
+        from itinerary import find_itineraries
+
+        routes += find_itineraries(
+            origin, destination, (slon, slat), (elon, elat), direct=routes, estimator=estimator,
+            departure=departure,
+        )
+    if departure is not None:
+        # Оцінки й комбіновані маршрути підтверджуються/довантажуються на той самий час
+        for route in routes:
+            route["departure"] = departure
+
+    return RoutePlan(routes, pruned=pruned, distance_km=round(dist, 1))
+
+
+def has_map(route):
+    """True if the route has a map now or its geometry can be fetched."""
+    return bool(route.get("geometry") or route.get("profile"))
+
+
+def needs_confirmation(route):
+    """True for a model estimate that ORS can replace with a real route."""
+    return route.get("time_range") is not None and bool(route.get("profile"))
+
+
+@traced()
+def confirm_route(route, estimator=None, with_geometry=True):
+    """
+    Replace a model estimate or a REVERSE placeholder by the ORS route (in
+    place) and, with an estimator, record the estimate error. Other routes
+    are returned as is.
+    """
+    if not needs_confirmation(route):
+        return route
+    with _geometry_lock:
+        if not needs_confirmation(route):
+            return route  # уже підтверджено паралельним потоком
+        departure = route.get("departure")
+        if with_geometry:
+            result = get_route(route["start"], route["end"], route["profile"], departure)
+        else:
+            result = {**get_route_summary(route["start"], route["end"], route["profile"], departure),
+                      "geometry": None}
+
+        dist_km = result["distance_m"] / 1000
+        actual = Route(
+            mode=route["mode"],
+            time_min=int(result["duration_s"] / 60),
+            price=get_provider(route["mode"]).cost.price(dist_km),
+            distance_km=round(dist_km, 1),
+            transfers=route["transfers"],
+            description=_split_suffix(route["description"])[0],
+            geometry=result["geometry"],
+            profile=route["profile"],
+            start=route["start"],
+            end=route["end"],
+            source=Source.ORS,
+            departure=departure
+        )
+        if estimator is not None and route["source"] == Source.ESTIMATE:
+            estimator.record_error(route, actual)
+        for name in ("time_min", "price", "distance_km", "description", "geometry", "source"):
+            route[name] = actual[name]
+        route["time_range"] = None
+        return route
+
+
+@traced()
+def ensure_geometry(route):
+    """Fetch and attach the geometry of a summary-only route (in place)."""
+    if route.get("source") == Source.REVERSE and needs_confirmation(route):
+        return confirm_route(route)
+    if route.get("geometry") or not route.get("profile"):
+        return route
+    with _geometry_lock:
+        if not route.get("geometry"):
+            result = get_route(route["start"], route["end"], route["profile"],
+                               route.get("departure"))
+            route["geometry"] = result["geometry"]
+    return route
+
+
+def confirm_in_background(routes, on_done=None, with_geometry=False):
+    """
+    Confirm the REVERSE placeholders among `routes` in a daemon thread,
+    then call on_done(failed) with [(route, error)] of those ORS could not
+    confirm (they stay placeholders). Returns the thread or None.
+    """
+    pending = [r for r in routes if r.get("source") == Source.REVERSE and needs_confirmation(r)]
+    if not pending:
+        return None
+
+    def worker():
+        failed = []
+        for route in pending:
+            try:
+                confirm_route(route, with_geometry=with_geometry)
+            except (RuntimeError, OSError) as e:
+                failed.append((route, e))
+        tracing.incr("reverse_confirmations", len(pending) - len(failed))
+        if failed:
+            tracing.incr("reverse_confirmation_failures", len(failed))
+        if on_done is not None:
+            on_done(failed)
 
-def build_all_routes(origin, destination):
-    return [
-        build_car_route(origin, destination),
-        build_bike_route(origin, destination),
-        build_walk_route(origin, destination),
-        build_train_route(origin, destination),
-        build_bus_route(origin, destination),
-        build_plane_route(origin, destination),
-    ]
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
 
 
+@traced()
 def rank_routes(routes, w_time=0.5, w_price=0.3, w_comfort=0.2):
-    max_time = max(r["time_min"] for r in routes)
+    # Час — від запитаного відправлення до прибуття, разом з очікуванням рейсу
+    total_time = [r["time_min"] + (r.get("wait_min") or 0) for r in routes]
+    max_time = max(total_time) or 1
     max_price = max(r["price"] for r in routes) or 1
     max_transfers = max(r["transfers"] for r in routes) or 1
 
-    for r in routes:
+    for r, time_min in zip(routes, total_time):
         r["score"] = (
-            w_time * (r["time_min"] / max_time) +
+            w_time * (time_min / max_time) +
             w_price * (r["price"] / max_price) +
             w_comfort * (r["transfers"] / max_transfers)
         )
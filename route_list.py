@@ -0,0 +1,153 @@
+import math
+
+import customtkinter as ctk
+
+
+class VirtualRouteList(ctk.CTkFrame):
+    """
+    Scrollable list of route cards that only creates widgets for the
+    visible rows. The row widgets are kept and re-bound to other routes on
+    scroll and when the list is replaced, instead of being destroyed.
+
+    format_row(index, route) -> (title, info); on_select(route) is called
+    by the row button.
+    """
+
+    def __init__(self, master, format_row, on_select, label_text=None, row_height=96,
+                 height=390, **kwargs):
+        super().__init__(master, **kwargs)
+
+        self.format_row = format_row
+        self.on_select = on_select
+        self.row_height = row_height
+
+        self._items = []
+        self._rows = []
+        self._offset = 0
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        if label_text:
+            ctk.CTkLabel(self, text=label_text).grid(
+                row=0, column=0, columnspan=2, padx=8, pady=(6, 0), sticky="ew"
+            )
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent", height=height)
+        self.viewport.grid(row=1, column=0, sticky="nsew")
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.viewport.bind("<Configure>", lambda e: self._layout())
+        self._bind_wheel(self.viewport)
+
+    # ===== PUBLIC =====
+    def set_items(self, items):
+        self._items = list(items)
+        self._offset = 0
+        for card in self._rows:
+            card.bound_index = None
+        self._layout()
+
+    def refresh(self):
+        """Re-format the visible rows (the routes changed in place)."""
+        for card in self._rows:
+            card.bound_index = None
+        self._layout()
+
+    # ===== LAYOUT =====
+    def _content_height(self):
+        return len(self._items) * self.row_height
+
+    def _max_offset(self):
+        return max(0, self._content_height() - self.viewport.winfo_height())
+
+    def _ensure_rows(self):
+        visible = math.ceil(max(self.viewport.winfo_height(), 1) / self.row_height) + 1
+        needed = min(visible, len(self._items))
+        while len(self._rows) < needed:
+            self._rows.append(self._make_row())
+
+    def _make_row(self):
+        # CTk не приймає розмір у place(): він задається віджету, а вміст
+        # картки не повинен його змінювати
+        card = ctk.CTkFrame(self.viewport, corner_radius=12, height=self.row_height - 12)
+        card.pack_propagate(False)
+        card.card_width = None
+        card.title_label = ctk.CTkLabel(card, text="", font=ctk.CTkFont(weight="bold"))
+        card.title_label.pack(anchor="w", padx=10)
+        card.info_label = ctk.CTkLabel(card, text="")
+        card.info_label.pack(anchor="w", padx=10)
+        card.button = ctk.CTkButton(card, text="Обрати маршрут")
+        card.button.pack(anchor="e", padx=10, pady=6)
+        card.bound_index = None
+
+        for w in (card, card.title_label, card.info_label):
+            self._bind_wheel(w)
+        return card
+
+    def _bind_row(self, card, index):
+        if card.bound_index == index:
+            return
+        route = self._items[index]
+        title, info = self.format_row(index, route)
+        card.title_label.configure(text=title)
+        card.info_label.configure(text=info)
+        card.button.configure(command=lambda r=route: self.on_select(r))
+        card.bound_index = index
+
+    def _layout(self):
+        self._offset = min(self._offset, self._max_offset())
+        self._ensure_rows()
+
+        first = self._offset // self.row_height
+        shift = self._offset % self.row_height
+        width = max(self.viewport.winfo_width() - 16, 1)
+
+        for i, card in enumerate(self._rows):
+            index = first + i
+            if index >= len(self._items):
+                card.place_forget()
+                card.bound_index = None
+                continue
+            self._bind_row(card, index)
+            if card.card_width != width:
+                card.configure(width=width)
+                card.card_width = width
+            card.place(x=8, y=i * self.row_height - shift + 6)
+
+        total = self._content_height()
+        if total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            view = self.viewport.winfo_height()
+            self.scrollbar.set(self._offset / total, min(1.0, (self._offset + view) / total))
+
+    # ===== SCROLLING =====
+    def _scroll_to(self, offset):
+        offset = int(max(0, min(offset, self._max_offset())))
+        if offset != self._offset:
+            self._offset = offset
+            self._layout()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(value) * self._content_height())
+        elif action == "scroll":
+            step = self.viewport.winfo_height() if unit == "pages" else self.row_height
+            self._scroll_to(self._offset + int(value) * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            delta = -1
+        elif getattr(event, "num", None) == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self._scroll_to(self._offset + delta * self.row_height // 2)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel)
+        widget.bind("<Button-5>", self._on_wheel)
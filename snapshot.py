@@ -0,0 +1,99 @@
+import hashlib
+import json
+import struct
+import time
+import zlib
+
+import api
+import database
+from geometry import decode_polyline, encode_polyline
+
+# Формат файлу: MAGIC, версія (uint16), sha256 стиснутих даних, zlib(JSON)
+MAGIC = b"MANDRUYSNAP"
+# 2: ключі маршрутів мають кошик часу відправлення (api.departure_bucket)
+VERSION = 2
+_HEADER = struct.Struct(f"<{len(MAGIC)}sH32s")
+
+# Геометрія зберігається як encoded polyline (5 знаків, без висот)
+POLYLINE_PRECISION = 5
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _pack_route(result):
+    geometry = result.get("geometry")
+    packed = {"distance_m": result["distance_m"], "duration_s": result["duration_s"]}
+    if geometry:
+        packed["polyline"] = encode_polyline(geometry["coordinates"], POLYLINE_PRECISION)
+    return packed
+
+
+def _unpack_route(packed):
+    result = {"distance_m": packed["distance_m"], "duration_s": packed["duration_s"]}
+    polyline = packed.get("polyline")
+    # Без полілінії маршрут лишається без геометрії: її довантажить ensure_geometry
+    result["geometry"] = {
+        "type": "LineString",
+        "coordinates": decode_polyline(polyline, POLYLINE_PRECISION),
+    } if polyline else None
+    return result
+
+
+def build_snapshot(include_precomputed=True):
+    caches = api.cache_snapshot()
+    return {
+        "version": VERSION,
+        "created_at": time.time(),
+        "geocode": [[key, list(value)] for key, value in caches["geocode"].items()],
+        "route": [[list(key), _pack_route(value)] for key, value in caches["route"].items()],
+        "summary": [[list(key), value] for key, value in caches["summary"].items()],
+        "precomputed": [list(row) for row in database.get_precomputed_rows()]
+        if include_precomputed else [],
+    }
+
+
+def export_snapshot(path, include_precomputed=True, level=6):
+    """Write the geocode/directions/summary caches and precomputed routes to `path`."""
+    data = build_snapshot(include_precomputed)
+    payload = zlib.compress(
+        json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), level
+    )
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, hashlib.sha256(payload).digest()))
+        f.write(payload)
+    return {name: len(data[name]) for name in ("geocode", "route", "summary", "precomputed")}
+
+
+def read_snapshot(path):
+    """Verify the header and checksum and return the decoded snapshot dict."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if len(raw) < _HEADER.size:
+        raise SnapshotError(f"{path}: файл знімка обрізаний")
+    magic, version, digest = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path}: це не знімок кешу MandruyUA")
+    if version != VERSION:
+        raise SnapshotError(f"{path}: непідтримувана версія знімка {version} (потрібна {VERSION})")
+    payload = memoryview(raw)[_HEADER.size:]
+    if hashlib.sha256(payload).digest() != digest:
+        raise SnapshotError(f"{path}: контрольна сума не збігається")
+    return json.loads(zlib.decompress(payload))
+
+
+def import_snapshot(path, include_precomputed=True):
+    """
+    Bulk-load a snapshot: caches go into this process's api caches,
+    precomputed routes are merged into mandruy.db (newer entries win).
+    """
+    data = read_snapshot(path)
+    api.load_cache_snapshot({
+        "geocode": {key: tuple(value) for key, value in data["geocode"]},
+        "route": {tuple(key): _unpack_route(value) for key, value in data["route"]},
+        "summary": {tuple(key): value for key, value in data["summary"]},
+    })
+    if include_precomputed and data["precomputed"]:
+        database.merge_precomputed_rows([tuple(row) for row in data["precomputed"]])
+    return {name: len(data[name]) for name in ("geocode", "route", "summary", "precomputed")}
@@ -0,0 +1,201 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Куди автоматично експортувати кожен завершений трейс / лічильники (необов'язково)
+TRACE_FILE = os.getenv("MANDRUY_TRACE_FILE")
+METRICS_FILE = os.getenv("MANDRUY_METRICS_FILE")
+
+_lock = threading.Lock()
+_local = threading.local()
+
+_current = None
+last_trace = None
+
+counters = {}
+span_totals = {}  # name -> [count, total_seconds]
+# Функції, що повертають поточні значення {назва: число}, напр. розміри кешів
+_gauge_sources = []
+
+
+class Trace:
+    """Spans and counters collected for one planning request."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self.counters = {}
+
+    def to_dict(self):
+        return {
+            "trace": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "counters": dict(self.counters),
+            "spans": [dict(s) for s in self.spans],
+        }
+
+
+def begin(name):
+    global _current
+    trace = Trace(name)
+    with _lock:
+        _current = trace
+    return trace
+
+
+def end(trace=None):
+    global _current, last_trace
+    with _lock:
+        trace = trace or _current
+        if trace is None:
+            return None
+        trace.duration = time.perf_counter() - trace.t0
+        if _current is trace:
+            _current = None
+        last_trace = trace
+
+    if TRACE_FILE:
+        export_jsonl(TRACE_FILE, trace)
+    if METRICS_FILE:
+        export_prometheus(METRICS_FILE)
+    return trace
+
+
+def incr(name, value=1):
+    with _lock:
+        counters[name] = counters.get(name, 0) + value
+        if _current is not None:
+            _current.counters[name] = _current.counters.get(name, 0) + value
+
+
+def register_gauges(fn):
+    """Add a function returning {name: value} to gauges() and the metrics export."""
+    with _lock:
+        _gauge_sources.append(fn)
+    return fn
+
+
+def gauges():
+    with _lock:
+        sources = list(_gauge_sources)
+    values = {}
+    for fn in sources:
+        values.update(fn())
+    return values
+
+
+@contextmanager
+def span(name, **attrs):
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    trace = _current
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _local.depth = depth
+        with _lock:
+            total = span_totals.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += elapsed
+            if trace is not None:
+                record = {
+                    "name": name,
+                    "start_ms": round((start - trace.t0) * 1000, 3),
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "thread": threading.current_thread().name,
+                    "depth": depth,
+                }
+                if attrs:
+                    record["attrs"] = attrs
+                if error:
+                    record["error"] = error
+                trace.spans.append(record)
+
+
+def traced(name=None):
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ===== EXPORT =====
+def export_jsonl(path, trace=None):
+    trace = trace or last_trace
+    if trace is None:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name).lower()
+
+
+def prometheus_text():
+    lines = []
+    for name, value in sorted(gauges().items()):
+        metric = f"mandruy_{_metric_name(name)}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    with _lock:
+        for name, value in sorted(counters.items()):
+            metric = f"mandruy_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        if span_totals:
+            lines.append("# TYPE mandruy_span_seconds summary")
+            for name, (count, total) in sorted(span_totals.items()):
+                lines.append(f'mandruy_span_seconds_count{{span="{name}"}} {count}')
+                lines.append(f'mandruy_span_seconds_sum{{span="{name}"}} {total:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path):
+    # Запис через тимчасовий файл, щоб node_exporter не прочитав половину
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def format_waterfall(trace=None, width=40):
+    trace = trace or last_trace
+    if trace is None:
+        return "Ще не було жодного пошуку."
+
+    total_ms = max((trace.duration or 0) * 1000,
+                   max((s["start_ms"] + s["duration_ms"] for s in trace.spans), default=0), 1e-6)
+    lines = [f"{trace.name}: {total_ms:.1f} мс"]
+
+    for s in sorted(trace.spans, key=lambda s: s["start_ms"]):
+        offset = int(s["start_ms"] / total_ms * width)
+        length = max(1, int(s["duration_ms"] / total_ms * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = "  " * s["depth"] + s["name"]
+        lines.append(f"{label:<28} |{bar:<{width}}| {s['duration_ms']:8.1f} мс")
+
+    if trace.counters:
+        lines.append("")
+        for name, value in sorted(trace.counters.items()):
+            lines.append(f"{name}: {value}")
+    return "\n".join(lines)
@@ -1,5 +1,8 @@
+from providers import ORS_PROFILES
+from records import Mode
+
 PROFILES = {
-    "Car": "driving-car",
-    "Bicycle": "cycling-regular",
-    "Walking": "foot-walking"
+    "Car": ORS_PROFILES[Mode.CAR],
+    "Bicycle": ORS_PROFILES[Mode.BIKE],
+    "Walking": ORS_PROFILES[Mode.WALK]
 }